@@ -0,0 +1,162 @@
+"""
+Background analysis for the window: a worker process searches the viewed position in rounds of
+doubling size and reports score, depth and the top lines after every round. The UI only polls a pipe,
+so it stays responsive however long the search runs.
+"""
+import os
+import math
+import multiprocessing
+from collections import OrderedDict
+from settings import *
+from headless import HeadlessGame, decode_action
+
+MATE_SCORE = 20  # Reported for a forced King capture; also the eval bar's full scale
+
+
+def line_scores(tree, turn, multipv, pv_length=ANALYSIS_PV_LENGTH):
+    """
+    [(score for White, [actions])] of the `multipv` most visited root plies, best first.
+    Only the best duck square of each piece move is listed, so the lines show different moves.
+    """
+    fc = tree.first_child[0]
+    if fc == -1: return []
+    children = sorted(range(fc, fc + tree.num_children[0]), key=lambda ch: -tree.visits[ch])
+    lines, moves = [], set()
+    for child in children:
+        if len(lines) == multipv or not tree.visits[child]: break
+        move = tree.action[child] >> 6  # Start and end squares without the duck
+        if move in moves: continue
+        moves.add(move)
+        q = max(-0.999, min(0.999, tree.value_sum[child] / tree.visits[child]))
+        score = max(-MATE_SCORE, min(MATE_SCORE, 5.0 * math.atanh(q)))  # Inverse of MaterialEvaluator's squash
+        pv, node = [], child
+        while node != -1 and len(pv) < pv_length:
+            pv.append(decode_action(tree.action[node]))
+            first, n = tree.first_child[node], tree.num_children[node]
+            if first == -1 or n == 0: break
+            node = max(range(first, first + n), key=lambda ch: tree.visits[ch])
+            if not tree.visits[node]: break
+        lines.append((score if turn == 'w' else -score, pv))
+    return lines
+
+
+def pv_text(game, pv):
+    """'Nf3@d4 Nc6@f6 ...' by playing the line on a copy of `game`."""
+    game = game.clone()
+    words = []
+    for action in pv:
+        if game.game_over: break
+        logged = len(game.move_log)
+        game.apply_action(action)
+        entry = game.move_log[-1].split(' ', 1)[1] if len(game.move_log) > logged else game.current_move_str
+        words.append(entry.replace(' @ ', '@'))
+    return " ".join(words)
+
+
+def analysis_worker(conn, multipv, max_nodes):
+    """Worker process: ('analyse', fen) replaces the position, ('stop', None) idles, ('quit', None) exits."""
+    from mcts import MCTSEngine
+    if hasattr(os, 'nice'): os.nice(ANALYSIS_NICE)
+    engine = MCTSEngine(max_nodes=max_nodes)
+    game, rounds = None, 0
+    while True:
+        if game is None or conn.poll():
+            kind, fen = conn.recv()
+            if kind == 'quit': return
+            game, rounds = (HeadlessGame.from_fen(fen), 0) if kind == 'analyse' else (None, 0)
+            if game is None or game.game_over:
+                game = None
+                continue
+            key = fen
+
+        rounds += 1
+        engine.search(game, move_time=0, max_iterations=ANALYSIS_FIRST_ROUND << (rounds - 1))
+        lines = [(score, pv_text(game, pv)) for score, pv in line_scores(engine.tree, game.turn, multipv)]
+        done = engine.tree.full or len(engine.tree) >= max_nodes
+        depth = max((len(line[1].split()) for line in lines), default=0)
+        conn.send((key, {'depth': depth, 'nodes': len(engine.tree), 'lines': lines, 'done': done}))
+        if done: game = None
+
+
+class BackgroundAnalysis:
+    """
+    UI side of the worker. follow(fen) points it at a position; poll() collects finished rounds.
+    Results are kept per position (LRU), so revisiting one shows its analysis at once and only
+    positions without a finished result are searched again.
+    """
+
+    def __init__(self, multipv=ANALYSIS_MULTIPV, max_nodes=ANALYSIS_MAX_NODES, cache_size=ANALYSIS_CACHE_SIZE):
+        self.multipv = multipv
+        self.max_nodes = max_nodes
+        self.cache_size = cache_size
+        self.results = OrderedDict()  # fen -> latest info dict
+        self.fen = None
+        self.conn = None
+        self.process = None
+
+    def _start(self):
+        # spawn: a forked child would inherit the window and audio device
+        ctx = multiprocessing.get_context('spawn')
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=analysis_worker, args=(child, self.multipv, self.max_nodes), daemon=True)
+        self.process.start()
+
+    @property
+    def searching(self):
+        info = self.results.get(self.fen)
+        return self.fen is not None and not (info and info['done'])
+
+    def follow(self, fen):
+        if fen == self.fen and self.process is not None: return
+        self.fen = fen
+        if self.process is None: self._start()
+        if fen in self.results: self.results.move_to_end(fen)
+        message = ('analyse', fen) if self.searching else ('stop', None)
+        if not self._send(message):
+            # Worker died since the last poll: start a new one (a second failure waits for the next follow)
+            self._start()
+            self._send(message)
+
+    def _send(self, message):
+        """False if the worker is gone; it is forgotten then, as in poll()."""
+        try:
+            self.conn.send(message)
+            return True
+        except OSError:  # BrokenPipeError, ConnectionResetError
+            self.process = self.conn = None
+            return False
+
+    def poll(self):
+        """Stores every round reported since the last call. Returns True if the followed position's info changed."""
+        changed = False
+        while self.conn is not None and self.conn.poll():
+            try:
+                fen, info = self.conn.recv()
+            except (EOFError, OSError):
+                # Worker died: forget it, the next follow() starts a new one
+                self.process = self.conn = self.fen = None
+                break
+            old = self.results.get(fen)
+            if old and old['nodes'] > info['nodes'] and not info['done']: continue  # Keep a deeper stored result
+            self.results[fen] = info
+            self.results.move_to_end(fen)
+            if len(self.results) > self.cache_size: self.results.popitem(last=False)
+            changed |= fen == self.fen
+        return changed
+
+    def info(self):
+        return self.results.get(self.fen)
+
+    def stop(self):
+        if self.conn is not None and self.fen is not None: self._send(('stop', None))
+        self.fen = None
+
+    def close(self):
+        if self.process is None: return
+        try:
+            self.conn.send(('quit', None))
+        except OSError:
+            pass
+        self.process.join(1.0)
+        if self.process.is_alive(): self.process.terminate()
+        self.process = self.conn = None
@@ -0,0 +1,69 @@
+class AnalysisNode:
+    """One ply: move with duck square, promotion, notation and clock time. Everything before it is shared via parent."""
+    __slots__ = ('parent', 'children', 'action', 'promotion', 'label', 'spent')
+
+    def __init__(self, parent=None, action=None, promotion=None, label=""):
+        self.parent = parent
+        self.children = []  # children[0] continues the main line
+        self.action = action  # (start, end, duck), duck == end for a game-ending King capture
+        self.promotion = promotion
+        self.label = label
+        self.spent = 0  # ms the mover took, charged to the clock whenever this line is loaded
+
+
+class AnalysisTree:
+    """
+    Game tree with variations. Positions are not stored: a line is rebuilt by replaying its
+    actions from the root, so a side line costs one small node per ply however many there are.
+    """
+
+    def __init__(self):
+        self.root = AnalysisNode()
+        self.size = 1
+
+    def add(self, parent, action, promotion, label):
+        """Child of parent for this move; an existing one is reused, otherwise a new variation is appended."""
+        for child in parent.children:
+            if child.action == action and child.promotion == promotion: return child
+        node = AnalysisNode(parent, action, promotion, label)
+        parent.children.append(node)
+        self.size += 1
+        return node
+
+    @staticmethod
+    def path(node):
+        """Nodes from the root down to node."""
+        out = []
+        while node is not None:
+            out.append(node)
+            node = node.parent
+        out.reverse()
+        return out
+
+    def line_through(self, node):
+        """Root .. node, continued along the main line (first children) to a leaf."""
+        line = self.path(node)
+        while line[-1].children: line.append(line[-1].children[0])
+        return line
+
+    @staticmethod
+    def siblings(node):
+        return node.parent.children if node.parent else [node]
+
+    def promote(self, node):
+        """Makes the line through node the main line: at every ancestor its branch moves to the front."""
+        while node.parent is not None:
+            kids = node.parent.children
+            kids.remove(node)
+            kids.insert(0, node)
+            node = node.parent
+
+    def remove(self, node):
+        """Deletes node and everything after it. The root cannot be removed."""
+        if node.parent is None: return
+        node.parent.children.remove(node)
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            self.size -= 1
+            stack.extend(n.children)
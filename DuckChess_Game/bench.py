@@ -0,0 +1,251 @@
+"""
+Microbenchmarks for the rules, rendering and search hot paths on fixed position sets.
+
+    python bench.py                        run everything and compare with the stored baseline
+    python bench.py --only legal_moves draw_game --sets endgame
+    python bench.py --save-baseline        store this run as the baseline for later comparisons
+
+Every benchmark is timed on every position set: BENCH_SAMPLES samples, each long enough to
+be measured reliably, reported as median µs per call with the spread between samples.
+Results are also written as JSON lines to bench_output.txt at the repository root. A median that is
+more than BENCH_TOLERANCE slower than the baseline, and further off than the noise of both runs,
+is flagged as a regression and the exit status is 1.
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # draw_game is timed off screen
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+from settings import *
+from headless import HeadlessGame
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_PATH = os.path.join(os.path.dirname(HERE), "bench_output.txt")
+
+POSITION_SETS = {
+    'opening': [
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "rnbqkbnr/pppp1ppp/8/4p3/4P3/4*3/PPPP1PPP/RNBQKBNR w KQkq e6 0 2",
+        "rnbqkb1r/pppppppp/5n2/8/5*2/5N2/PPPPPPPP/RNBQKB1R w KQkq - 2 2",
+        "rnbqkbnr/pp1ppppp/8/2p5/4P3/2*5/PPPP1PPP/RNBQKBNR w KQkq c6 0 2",
+    ],
+    'middlegame': [
+        "r1b2bnr/1q1npk2/*ppp2pp/p5p1/P2PP3/2N2KP1/1PP2PBP/R2Q2NR w - - 4 16",
+        "rnk3nr/1p3ppp/2pbp3/P2Nq2b/3PB3/P5P1/2P*PP1P/R1BQK2R w KQ - 1 16",
+        "rnb1qk1r/1ppp2p1/3bQn1p/4P3/p4p2/N1P1B1PP/PP1*PP2/R3KBNR w Q - 1 16",
+        "r1b2k1r/ppppqp1p/n3p3/4b3/3PN2P/N1PQ1PP1/P1P1*1B1/R1B2K1R w - - 1 16",
+    ],
+    'endgame': [
+        "k7/8/8/2b5/4B3/2*5/2RK3P/4QN2 w - - 24 51",
+        "8/5k1n/6rp/6np/8/1K3b1*/8/8 w - - 8 51",
+        "r1k5/6b1/3p3p/p4r1p/4p3/4*3/6K1/8 w - - 4 51",
+        "3kb3/8/2p4p/1*P1P3/P3p2P/8/4R3/5KN1 w - - 0 51",
+    ],
+    # The duck stands on the open lines of Queens, Rooks and Bishops
+    'duck_blocking': [
+        "r3k2r/ppp2ppp/2n1bn2/3q4/3*4/2N1BN2/PPP2PPP/R2QK2R w KQkq - 0 10",
+        "3qk3/8/8/8/3*4/8/8/3QK3 w - - 0 30",
+        "r1b1k2r/pp3ppp/2*5/8/8/2B5/PP3PPP/R3K2R b KQkq - 0 15",
+        "r3k3/1p4b1/8/4*3/8/8/1B4P1/4K2R w Kq - 0 22",
+    ],
+}
+
+
+def sample_action(game):
+    """A fixed, ordinary ply of the position (the middle of the sorted legal actions)."""
+    actions = sorted(game.legal_actions())
+    return actions[len(actions) // 2]
+
+
+_window = None
+
+
+def window_game(fen):
+    """The one off-screen DuckChess window, set up on `fen` as a fresh game."""
+    global _window
+    if _window is None:
+        from main import DuckChess
+        _window = DuckChess(autosave=False)
+    w = _window
+    w.reset_game_state()
+    w.load_fen(fen)
+    w.history.clear()
+    w.save_snapshot()
+    w.state, w.game_mode = 'game', 'pvp'
+    return w
+
+
+# --- BENCHMARKS: each builds (untimed) the call to time for one position ---
+def bench_legal_moves(fen):
+    game = HeadlessGame.from_fen(fen)
+    squares = [(r, c) for r in range(8) for c in range(8) if game.board[r][c] and game.board[r][c].color == game.turn]
+
+    def run():
+        for r, c in squares: game.get_piece_legal_moves(r, c)
+    return run
+
+
+def bench_is_in_check(fen):
+    game = HeadlessGame.from_fen(fen)
+
+    def run():
+        game.is_in_check('w')
+        game.is_in_check('b')
+    return run
+
+
+def bench_fen_signature(fen):
+    return HeadlessGame.from_fen(fen).generate_fen_signature
+
+
+def bench_material(fen):
+    game = HeadlessGame.from_fen(fen)
+    return lambda: game.calculate_material_score(game.board)
+
+
+def bench_clone(fen):
+    return HeadlessGame.from_fen(fen).clone
+
+
+def bench_move_and_duck(fen):
+    """clone + execute_move + place_duck; subtract 'clone' for the two rule calls alone."""
+    game = HeadlessGame.from_fen(fen)
+    start, end, duck = sample_action(game)
+
+    def run():
+        g = game.clone()
+        g.execute_move(start, end, animated=False)
+        if g.promotion_pending: g.promote_pawn(QUEEN)
+        if not g.game_over: g.place_duck(duck, animated=False)
+    return run
+
+
+def bench_save_snapshot(fen):
+    w = window_game(fen)
+    start, end, duck = sample_action(HeadlessGame.from_fen(fen))
+    w.execute_move(start, end, animated=False)
+    if w.promotion_pending: w.promote_pawn(QUEEN)
+    if not w.game_over: w.place_duck(duck, animated=False)
+    return w.save_snapshot
+
+
+def bench_draw_game(fen):
+    return window_game(fen).draw_game
+
+
+def bench_search(fen):
+    """One MCTS search of BENCH_SEARCH_ITERATIONS iterations from an empty tree; also reported as NPS."""
+    from mcts import MCTSEngine
+    game = HeadlessGame.from_fen(fen)
+    engine = MCTSEngine()
+
+    def run():
+        engine.tree = None
+        engine.search(game, move_time=0, max_iterations=BENCH_SEARCH_ITERATIONS)
+    return run
+
+
+BENCHMARKS = {
+    'legal_moves': bench_legal_moves,  # get_piece_legal_moves for every piece of the side to move
+    'is_in_check': bench_is_in_check,  # both colors
+    'fen_signature': bench_fen_signature,
+    'material': bench_material,
+    'clone': bench_clone,
+    'move_and_duck': bench_move_and_duck,
+    'save_snapshot': bench_save_snapshot,
+    'draw_game': bench_draw_game,
+    'search': bench_search,
+}
+
+
+# --- TIMING ---
+def time_calls(calls, loops):
+    """Seconds to run every call `loops` times, with the garbage collector held off."""
+    gc.collect()
+    gc.disable()
+    try:
+        t0 = time.perf_counter()
+        for call in calls:
+            for _ in range(loops): call()
+        return time.perf_counter() - t0
+    finally:
+        gc.enable()
+
+
+def measure(name, fens, samples=BENCH_SAMPLES, min_sample_ms=BENCH_MIN_SAMPLE_MS):
+    """{'median', 'stdev', 'min', 'max', 'loops'} in µs per call over the positions."""
+    calls = [BENCHMARKS[name](fen) for fen in fens]
+    # One pass also warms caches; then size the loops so a sample is long enough to time
+    once = time_calls(calls, 1)
+    loops = max(1, int(min_sample_ms / 1000.0 / max(once, 1e-9)))
+    per_call = [1e6 * time_calls(calls, loops) / (loops * len(calls)) for _ in range(samples)]
+    return {'median': statistics.median(per_call), 'stdev': statistics.stdev(per_call) if samples > 1 else 0.0,
+            'min': min(per_call), 'max': max(per_call), 'loops': loops}
+
+
+# --- BASELINE ---
+def load_baseline(path):
+    try:
+        with open(path, encoding='utf-8') as f: return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def compare(result, base, tolerance=BENCH_TOLERANCE):
+    """'regression', 'faster' or 'ok' against the baseline entry of the same benchmark."""
+    if base is None: return 'new'
+    noise = 3 * max(result['stdev'], base['stdev'])
+    diff = result['median'] - base['median']
+    if diff > base['median'] * tolerance and diff > noise: return 'regression'
+    if -diff > base['median'] * tolerance and -diff > noise: return 'faster'
+    return 'ok'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Duck Chess microbenchmarks")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="benchmarks to run (default: all)")
+    parser.add_argument('--sets', nargs='+', choices=list(POSITION_SETS), help="position sets (default: all)")
+    parser.add_argument('--samples', type=int, default=BENCH_SAMPLES)
+    parser.add_argument('--baseline', default=os.path.join(HERE, BENCH_BASELINE))
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the baseline")
+    parser.add_argument('--tolerance', type=float, default=BENCH_TOLERANCE, help="allowed slowdown, 0.1 = 10%%")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    baseline_results = (baseline or {}).get('results', {})
+    results, regressions = {}, 0
+    print(f"{'benchmark':<15}{'set':<15}{'median µs':>12}{'± stdev':>10}{'  vs baseline':<30}")
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as out:
+        for name in args.only or BENCHMARKS:
+            for set_name in args.sets or POSITION_SETS:
+                key = f"{name}/{set_name}"
+                result = results[key] = measure(name, POSITION_SETS[set_name], args.samples)
+                base = baseline_results.get(key)
+                verdict = compare(result, base, args.tolerance)
+                regressions += verdict == 'regression'
+                change = f"{verdict} ({100 * (result['median'] / base['median'] - 1):+.1f}%)" if base else verdict
+                extra = f"  {BENCH_SEARCH_ITERATIONS / result['median'] * 1e6:.0f} nps" if name == 'search' else ""
+                print(f"{name:<15}{set_name:<15}{result['median']:>12.2f}{result['stdev']:>10.2f}  {change}{extra}")
+                out.write(json.dumps(dict(result, benchmark=name, set=set_name, verdict=verdict,
+                                          baseline=base and base['median'])) + "\n")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'machine': platform.machine(),
+                       'processor': platform.processor(), 'saved': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'results': results}, f, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+    if regressions:
+        print(f"{regressions} regression(s) against the baseline")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from settings import *
+
+
+class ChessClock:
+    """
+    Time control of one game: base + increment ("5+3", minutes + seconds) or a fixed limit per move
+    ("10/move", seconds). Purely arithmetic: the host measures how long the side to move has been
+    thinking and passes it in, so the same clock works for the window, matches and replays.
+    """
+
+    def __init__(self, base_ms=None, increment_ms=0, move_limit_ms=None):
+        self.base = base_ms
+        self.increment = increment_ms
+        self.move_limit = move_limit_ms
+        start = move_limit_ms if move_limit_ms is not None else base_ms
+        self.remaining = {'w': start, 'b': start}
+
+    @classmethod
+    def parse(cls, spec):
+        """ChessClock from a time-control string; None or "" gives an untimed clock."""
+        if not spec: return cls()
+        try:
+            if spec.endswith('/move'): return cls(move_limit_ms=int(float(spec[:-5]) * 1000))
+            base, _, inc = spec.partition('+')
+            return cls(int(float(base) * 60000), int(float(inc or 0) * 1000))
+        except ValueError:
+            raise ValueError(f"Bad time control: {spec!r} (use e.g. '5+3' or '10/move')") from None
+
+    @property
+    def spec(self):
+        if self.move_limit is not None: return f"{self.move_limit / 1000:g}/move"
+        if self.base is None: return None
+        return f"{self.base / 60000:g}+{self.increment / 1000:g}"
+
+    @property
+    def timed(self):
+        return self.base is not None or self.move_limit is not None
+
+    def time_left(self, color, thinking=0):
+        """ms left for `color` after `thinking` ms on the current move (None when untimed)."""
+        if not self.timed: return None
+        return self.remaining[color] - thinking
+
+    def charge(self, color, spent):
+        """Ends `color`'s move after `spent` ms."""
+        if not self.timed: return
+        if self.move_limit is not None:
+            self.remaining[color] = self.move_limit
+        else:
+            self.remaining[color] += self.increment - spent
+
+
+def format_clock(ms):
+    """'4:05' normally, '8.3' under ten seconds."""
+    ms = max(0, ms)
+    if ms < 10000: return f"{ms / 1000:.1f}"
+    s = int(ms // 1000)
+    return f"{s // 60}:{s % 60:02d}"
+
+
+class TimeManager:
+    """
+    Turns a clock into search budgets. budget() gives (soft, hard) ms for one move: soft is the
+    normal target, hard is never exceeded. should_stop() lets a search end early once the best
+    move has stopped changing, or run past soft while it still flips, but never past hard.
+    """
+
+    def __init__(self, safety_ms=TM_SAFETY_MS, moves_to_go=TM_MOVES_TO_GO, min_moves_to_go=TM_MIN_MOVES_TO_GO):
+        self.safety = safety_ms
+        self.moves_to_go = moves_to_go
+        self.min_moves_to_go = min_moves_to_go
+
+    def budget(self, time_left, increment=0, move_limit=None, move_number=1, choices=2):
+        """(soft, hard) ms for the next search. `choices` is the number of legal piece moves."""
+        if move_limit is not None:
+            hard = max(0, min(time_left, move_limit) - self.safety)
+            soft = hard * TM_MOVE_LIMIT_SHARE
+        else:
+            usable = max(0, time_left - self.safety)
+            # Spread the clock over the moves still expected; early moves get a smaller share
+            moves_to_go = max(self.min_moves_to_go, self.moves_to_go - move_number // 2)
+            soft = usable / moves_to_go + increment * TM_INCREMENT_SHARE
+            # The increment is only credited after the move, so neither limit may pass what is left now
+            hard = min(soft * TM_MAX_STRETCH, usable * TM_MAX_SHARE + increment, usable)
+            soft = min(soft, hard)
+        if choices <= 1: soft = hard = min(hard, TM_FORCED_MS)  # Only the duck square left to choose
+        return soft, hard
+
+    def should_stop(self, elapsed, soft, hard, stable_checks):
+        """`stable_checks`: consecutive progress checks with the same best move."""
+        if elapsed >= hard: return True
+        scale = TM_STABLE_SCALE if stable_checks >= TM_STABLE_CHECKS else TM_UNSTABLE_SCALE
+        return elapsed >= min(hard, soft * scale)
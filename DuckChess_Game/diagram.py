@@ -0,0 +1,162 @@
+"""
+Offscreen diagrams with the game's own art: PNG per position, or a numbered frame sequence per game.
+
+    python diagram.py fens positions.txt --out diagrams/
+    python diagram.py games archive.pgn --out frames/ --size 48
+
+Frame sequences can be joined into a GIF/video with any external tool (e.g. ffmpeg -i ply_%04d.png).
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')  # SDL would turn the pool's SIGTERM into a QUIT event
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import zlib
+import struct
+import argparse
+from multiprocessing import Pool
+import pygame
+from settings import *
+from main import DuckChess
+from headless import HeadlessGame
+from game_record import parse_game, iter_replay, iter_raw_games
+
+
+def write_png(surface, path, level=1):
+    """RGB PNG at a fast zlib level; pygame.image.save always compresses hard and dominates batch time."""
+    w, h = surface.get_size()
+    raw = pygame.image.tobytes(surface, 'RGB')
+    stride = w * 3
+    rows = b"".join(b"\0" + raw[y * stride:(y + 1) * stride] for y in range(h))  # Filter byte 0 per row
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    with open(path, 'wb') as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(rows, level)))
+        f.write(chunk(b'IEND', b''))
+
+
+class DiagramRenderer(DuckChess):
+    """
+    DuckChess drawing into a dummy-driver window sized to the board.
+    One instance renders any number of diagrams; board layer, overlays and sprites stay cached between them.
+    """
+
+    def __init__(self, square_size=DIAGRAM_SQUARE_SIZE, flipped=False):
+        super().__init__(autosave=False)
+        self.sounds = {}
+        self.state, self.game_mode = 'game', 'pvp'
+        self.show_eval = False
+        self.show_explorer = False
+        self.player_side = 'b' if flipped else 'w'
+
+        # Inverse of resize_layout's sizing, so the board comes out at exactly square_size
+        w = self.panel_width + self.side_margin * 3 + self.eval_bar_width + square_size * 8
+        h = 90 + self.side_margin + square_size * 8
+        self.screen = pygame.display.set_mode((w, h))
+        self.resize_layout(w, h)
+        self.board_rect = pygame.Rect(self.board_x - 20, self.board_y - 20, self.sq_size * 8 + 40, self.sq_size * 8 + 40)
+
+    def render(self, game):
+        """Draws the position of any GameLogicMixin host (highlights included) and returns the board surface."""
+        self.board, self.duck_pos, self.prev_duck_pos = game.board, game.duck_pos, game.prev_duck_pos
+        self.last_move_arrow, self.turn, self.phase = game.last_move_arrow, game.turn, game.phase
+        self.game_over, self.winner = game.game_over, game.winner
+        self.promotion_pending, self.selected_square, self.valid_moves = False, None, []
+        self.history, self.view_index, self.move_log = [], -1, []
+
+        self.screen.set_clip(self.board_rect)
+        self.draw_game()
+        self.screen.set_clip(None)
+        return self.screen.subsurface(self.board_rect)
+
+    def save_fen(self, fen, path):
+        write_png(self.render(HeadlessGame.from_fen(fen)), path)
+
+    def save_game(self, text, directory):
+        """Writes ply_0000.png (start) .. ply_NNNN.png for one game record. Returns the number of frames."""
+        os.makedirs(directory, exist_ok=True)
+        record = parse_game(text)
+        start = HeadlessGame.from_fen(record.headers['FEN']) if 'FEN' in record.headers else HeadlessGame()
+        write_png(self.render(start), os.path.join(directory, "ply_0000.png"))
+        frames = 1
+        for ply, game in iter_replay(record):
+            write_png(self.render(game), os.path.join(directory, f"ply_{ply:04d}.png"))
+            frames += 1
+        return frames
+
+
+# --- BATCH JOBS ---
+_renderer = None
+
+
+def _init_worker(square_size, flipped):
+    global _renderer
+    _renderer = DiagramRenderer(square_size, flipped)
+
+
+def _render_job(job):
+    """('fen', fen, png path) or ('game', record text, frame directory). Returns (images written, error)."""
+    kind, source, target = job
+    try:
+        if kind == 'fen':
+            _renderer.save_fen(source, target)
+            return 1, None
+        return _renderer.save_game(source, target), None
+    except Exception as e:  # Unwritable targets and renderer errors too: one bad job must not end the batch
+        return 0, f"{target}: {e}"
+
+
+def render_jobs(jobs, workers=None, square_size=DIAGRAM_SQUARE_SIZE, flipped=False, on_error=None):
+    """Renders jobs in a process pool, one DiagramRenderer per worker. Returns (images written, errors)."""
+    images, errors = 0, []
+    with Pool(workers or os.cpu_count(), _init_worker, (square_size, flipped)) as pool:
+        for n, err in pool.imap_unordered(_render_job, jobs, chunksize=16):
+            images += n
+            if err:
+                errors.append(err)
+                if on_error: on_error(err)
+    return images, errors
+
+
+def fen_jobs(path, out_dir):
+    with open(path) as f:
+        fens = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    for i, fen in enumerate(fens, 1):
+        yield 'fen', fen, os.path.join(out_dir, f"position_{i:05d}.png")
+
+
+def game_jobs(paths, out_dir):
+    index = 0
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for text in iter_raw_games(f):
+                index += 1
+                yield 'game', text, os.path.join(out_dir, f"game_{index:05d}")
+
+
+if __name__ == "__main__":
+    import time
+    parser = argparse.ArgumentParser(description="Render Duck Chess positions or games to PNG")
+    parser.add_argument('command', choices=['fens', 'games'])
+    parser.add_argument('files', nargs='+', help="FEN list (one per line) or game-record files")
+    parser.add_argument('--out', default='diagrams')
+    parser.add_argument('--size', type=int, default=DIAGRAM_SQUARE_SIZE, help="square size in pixels")
+    parser.add_argument('--flip', action='store_true', help="Black at the bottom")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    if args.command == 'fens':
+        jobs = (job for path in args.files for job in fen_jobs(path, args.out))
+    else:
+        jobs = game_jobs(args.files, args.out)
+
+    t0 = time.perf_counter()
+    total, failed = render_jobs(jobs, args.workers, args.size, args.flip, on_error=print)
+    elapsed = time.perf_counter() - t0
+    print(f"{total} images in {elapsed:.1f} s ({total / elapsed:.0f}/s), {len(failed)} failed")
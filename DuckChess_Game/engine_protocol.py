@@ -0,0 +1,415 @@
+"""
+UCI-style text protocol, so an engine can run as its own process (any language) and be swapped
+without touching the UI. One command per line on stdin, replies on stdout:
+
+    uci / isready / ucinewgame / quit -> id ..., uciok / readyok
+    setoption name MultiPV value 3
+    position startpos moves e2e4@e6 e7e5@d3     <- piece move, '@', duck square
+    position fen <duck FEN, '*' = duck> moves e7e8q@d5 d1e8
+    go movetime 500 | nodes 20000 | depth 6 | infinite | wtime 60000 btime 60000 winc 2000 binc 2000
+    stop
+                                      -> info depth 5 multipv 1 nodes 4096 nps 8120 time 504 score cp 38 pv ...
+                                      -> bestmove e2e4@e6
+
+A move that captures the King ends the game before the duck moves, so it has no '@' part.
+Scores are centipawns from the side to move. 'go softtime S movetime H' passes a (soft, hard)
+TimeManager budget: the search may end at S once the best move is stable, never after H.
+
+    python engine_protocol.py --engine '{"engine": "mcts", "batch_size": 32}'
+"""
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')  # stdout carries the protocol
+
+import re
+import sys
+import json
+import time
+import queue
+import random
+import shlex
+import argparse
+import threading
+import subprocess
+from settings import *
+from headless import HeadlessGame
+from clock import TimeManager
+from analysis import line_scores
+
+MOVE_RE = re.compile(r'^([a-h][1-8])([a-h][1-8])([qrbn])?(?:@([a-h][1-8]))?$')
+
+
+class EngineError(RuntimeError):
+    pass
+
+
+# --- MOVE TEXT ---
+def square_text(pos):
+    return f"{'abcdefgh'[pos[1]]}{'87654321'[pos[0]]}"
+
+
+def parse_square(text):
+    return '87654321'.index(text[1]), 'abcdefgh'.index(text[0])
+
+
+def format_move(action, promotion=None):
+    """'e2e4@e6' for (start, end, duck); 'e7e8q@d5' with a promotion; no duck for a King capture (duck == end)."""
+    start, end, duck = action
+    text = square_text(start) + square_text(end) + (promotion.lower() if promotion else "")
+    return text if duck == end else f"{text}@{square_text(duck)}"
+
+
+def parse_move(text):
+    """(action, promotion or None) of a move string. Raises ValueError on bad syntax (legality is not checked)."""
+    m = MOVE_RE.match(text)
+    if not m: raise ValueError(f"Bad move: {text!r}")
+    start, end = parse_square(m.group(1)), parse_square(m.group(2))
+    duck = parse_square(m.group(4)) if m.group(4) else end
+    return (start, end, duck), m.group(3).upper() if m.group(3) else None
+
+
+def position_command(game):
+    """
+    'position ...' for the host's current position. A window game sends its start and the moves of
+    the live line, so the engine sees the repetition history; any other game sends its duck FEN.
+    """
+    line = getattr(game, 'line', None)
+    if not line: return f"position fen {game.generate_fen()}"
+    start = f"fen {game.start_fen}" if game.start_fen else "startpos"
+    # A node stores the piece on the end square; it only names a promotion if the move notation has one
+    moves = [format_move(n.action, n.promotion if '=' in n.label else None) for n in line[1:]]
+    return f"position {start}" + (" moves " + " ".join(moves) if moves else "")
+
+
+# --- ENGINE SIDE ---
+class EngineServer:
+    """
+    Serves the protocol for one engine built by match.build_engine. Searches run in a thread, so
+    'stop' and 'isready' are answered while the engine thinks. Engines without search() (DuckAI)
+    play their ply on a copy of the position and report it with a single info line.
+    """
+
+    def __init__(self, engine, out=None, name="Duck Chess"):
+        self.engine = engine
+        self.out = out or sys.stdout
+        self.name = name
+        self.game = HeadlessGame()
+        self.multipv = 1
+        self.time_manager = getattr(engine, 'time_manager', None) or TimeManager()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def send(self, line):
+        with self.lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def run(self, stream=None):
+        for line in stream or sys.stdin:
+            if not self.handle(line): break
+        self.stop()
+
+    def handle(self, line):
+        """Runs one command line. Returns False on 'quit'."""
+        words = line.split()
+        if not words: return True
+        cmd, args = words[0], words[1:]
+        if cmd == 'uci':
+            self.send(f"id name {self.name} ({type(self.engine).__name__})")
+            self.send("id author Duck Chess")
+            self.send("option name MultiPV type spin default 1 min 1 max 8")
+            self.send("uciok")
+        elif cmd == 'isready':
+            self.send("readyok")
+        elif cmd == 'setoption':
+            self.set_option(args)
+        elif cmd == 'ucinewgame':
+            self.stop()
+            self.game = HeadlessGame()
+        elif cmd == 'position':
+            self.stop()
+            try:
+                self.game = self.parse_position(args)
+            except (ValueError, KeyError) as e:
+                self.game = None  # 'go' must not search the previous position instead
+                self.send(f"info string {e}")
+        elif cmd == 'go':
+            self.stop()
+            try:
+                limits = self.parse_go(args)
+            except (ValueError, TypeError):
+                self.send(f"info string Bad go command: {' '.join(args)}")
+                return True
+            if self.game is None:
+                self.send("info string No valid position")
+                self.send("bestmove (none)")
+                return True
+            if hasattr(self.engine, 'stop_requested'): self.engine.stop_requested = False
+            self.thread = threading.Thread(target=self.search, args=(self.game.clone(), limits), daemon=True)
+            self.thread.start()
+        elif cmd == 'stop':
+            self.stop()
+        elif cmd == 'quit':
+            return False
+        else:
+            self.send(f"info string Unknown command: {cmd}")
+        return True
+
+    def set_option(self, args):
+        text = " ".join(args)
+        name, _, value = text.partition(" value ")
+        if name.replace("name", "", 1).strip().lower() == 'multipv':
+            self.multipv = max(1, min(8, int(value)))
+
+    def stop(self):
+        """Ends the running search; its bestmove is sent before this returns."""
+        if self.thread is None: return
+        if hasattr(self.engine, 'stop_requested'): self.engine.stop_requested = True
+        self.thread.join()
+        self.thread = None
+
+    @staticmethod
+    def parse_position(args):
+        if args[:1] == ['startpos']:
+            game, rest = HeadlessGame(), args[1:]
+        elif args[:1] == ['fen']:
+            end = args.index('moves') if 'moves' in args else len(args)  # FENs may leave out trailing fields
+            game, rest = HeadlessGame.from_fen(" ".join(args[1:end])), args[end:]
+        else:
+            raise ValueError("position needs 'startpos' or 'fen'")
+        if rest[:1] == ['moves']:
+            for text in rest[1:]:
+                action, promotion = parse_move(text)
+                try:
+                    game.apply_checked_action(action, promotion or QUEEN)
+                except ValueError as e:
+                    raise ValueError(f"{text}: {e}") from None
+        return game
+
+    @staticmethod
+    def parse_go(args):
+        limits = {}
+        for key, value in zip(args, args[1:] + [None]):
+            if key in ('movetime', 'softtime', 'nodes', 'depth', 'wtime', 'btime', 'winc', 'binc'):
+                limits[key] = int(value)
+            elif key == 'infinite':
+                limits['infinite'] = True
+        return limits
+
+    # --- SEARCH THREAD ---
+    def search(self, game, limits):
+        if game.game_over:
+            self.send("bestmove (none)")
+            return
+        if not hasattr(self.engine, 'search'):
+            self.play_simple(game)
+            return
+
+        move_time, budget = limits.get('movetime'), None
+        clock = limits.get('wtime' if game.turn == 'w' else 'btime')
+        if 'softtime' in limits and move_time:
+            budget = (limits['softtime'], move_time)
+        elif clock is not None:
+            choices = sum(map(len, game.legal_move_map().values()))
+            budget = self.time_manager.budget(clock, limits.get('winc' if game.turn == 'w' else 'binc', 0),
+                                              move_time, game.turn_number, choices)
+        if budget is None and move_time is None and (limits.keys() & {'infinite', 'nodes', 'depth'}):
+            move_time = 0  # No time limit: only nodes / depth / stop end the search
+        max_depth = limits.get('depth')
+
+        def on_info(iterations, elapsed):
+            depth = self.send_info(game, iterations, elapsed)
+            return max_depth is not None and depth >= max_depth
+
+        action = self.engine.search(game, move_time=move_time, max_iterations=limits.get('nodes'), budget=budget,
+                                    on_info=on_info)
+        info = self.engine.last_info
+        self.send_info(game, info.get('iterations', 0), 1000 * info.get('time', 0))
+        self.send(f"bestmove {format_move(action) if action else '(none)'}")
+
+    def send_info(self, game, iterations, elapsed):
+        """info lines for the current tree; returns the depth (longest principal variation) reported."""
+        lines = line_scores(self.engine.tree, game.turn, self.multipv)
+        nps = int(iterations * 1000 / elapsed) if elapsed > 0 else 0
+        depth = max((len(pv) for _, pv in lines), default=0)
+        for k, (score, pv) in enumerate(lines, 1):
+            cp = round(100 * (score if game.turn == 'w' else -score))
+            self.send(f"info depth {depth} multipv {k} nodes {iterations} nps {nps} time {int(elapsed)} "
+                      f"score cp {cp} pv {' '.join(format_move(a) for a in pv)}")
+        return depth
+
+    def play_simple(self, game):
+        from match import choose_action
+        t0 = time.perf_counter()
+        result = choose_action(self.engine, game)
+        self.send(f"info depth 1 nodes 1 time {int(1000 * (time.perf_counter() - t0))}")
+        self.send(f"bestmove {format_move(*result) if result else '(none)'}")
+
+
+# --- UI SIDE ---
+def default_command(config=ENGINE_CONFIG):
+    """Command line of the built-in engine server for an engine config dict."""
+    return [sys.executable, '-u', os.path.abspath(__file__), '--engine', json.dumps(config)]
+
+
+class EngineClient:
+    """
+    Runs an engine process and speaks the protocol to it. The process gets its own priority (nice)
+    and CPU set, so a busy engine cannot starve the window. Lines are read by a thread into a queue.
+    """
+
+    def __init__(self, command=None, nice=ENGINE_NICE, cores=ENGINE_CORES, multipv=1):
+        if isinstance(command, str): command = shlex.split(command)
+        self.command = command or default_command()
+        env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                                        bufsize=1, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.set_priority(nice, cores)
+        self.lines = queue.Queue()
+        threading.Thread(target=self._reader, daemon=True).start()
+        self.name = None
+        self.last_info = {}
+
+        self.send("uci")
+        for line in self.read_until('uciok', ENGINE_START_TIMEOUT_MS):
+            if line.startswith('id name '): self.name = line[8:]
+        if multipv > 1: self.send(f"setoption name MultiPV value {multipv}")
+        self.send("isready")
+        self.read_until('readyok', ENGINE_START_TIMEOUT_MS)
+
+    def set_priority(self, nice, cores):
+        pid = self.process.pid
+        try:
+            if nice and hasattr(os, 'setpriority'): os.setpriority(os.PRIO_PROCESS, pid, nice)
+            if cores and hasattr(os, 'sched_setaffinity'): os.sched_setaffinity(pid, cores)
+        except OSError:
+            pass  # Not permitted here: the engine simply runs with default scheduling
+
+    def _reader(self):
+        for line in self.process.stdout: self.lines.put(line.strip())
+        self.lines.put(None)
+
+    def send(self, line):
+        try:
+            self.process.stdin.write(line + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            raise EngineError("Engine process has exited") from None
+
+    def read_until(self, prefix, timeout_ms):
+        """Lines up to and including the first one starting with prefix. Raises EngineError on timeout or exit."""
+        deadline = time.perf_counter() + timeout_ms / 1000.0
+        out = []
+        while True:
+            try:
+                line = self.lines.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                raise EngineError(f"No '{prefix}' from the engine within {timeout_ms} ms") from None
+            if line is None:
+                self.lines.put(None)  # Later reads fail at once too
+                raise EngineError("Engine process has exited")
+            out.append(line)
+            if line.startswith('info ') and ' pv ' in line: self._store_info(line)
+            if line.startswith(prefix): return out
+
+    def _store_info(self, line):
+        words, _, pv = line.partition(' pv ')
+        words = words.split()
+        if words[words.index('multipv') + 1] != '1': return
+        info = {key: int(words[words.index(key) + 1]) for key in ('depth', 'nodes', 'time', 'nps', 'cp')
+                if key in words}
+        info['pv'] = pv.split()
+        self.last_info = info
+
+    def go(self, position, limits, timeout_ms):
+        """Sends a position and 'go', waits for bestmove. Returns (action, promotion), or None for '(none)'."""
+        self.last_info = {}
+        self.send(position)
+        self.send("go " + " ".join(f"{k} {v}" for k, v in limits.items()))
+        try:
+            lines = self.read_until('bestmove', timeout_ms)
+        except EngineError:
+            if self.process.poll() is not None: raise
+            self.send("stop")  # Over time: take whatever the engine has found so far
+            lines = self.read_until('bestmove', ENGINE_START_TIMEOUT_MS)
+        move = lines[-1].split()[1]
+        return None if move in ('(none)', '0000') else parse_move(move)
+
+    def close(self):
+        if self.process.poll() is None:
+            try:
+                self.send("quit")
+                self.process.wait(1.0)
+            except (EngineError, subprocess.TimeoutExpired):
+                self.process.kill()
+
+
+class RemoteEngine:
+    """
+    Engine process behind the interface GameLogicMixin.ai_turn and match.play_ply already use
+    (search / get_piece_move / get_duck_move, time_manager, time_budget), so AI_ENGINE = 'external'
+    swaps it in without UI changes. The duck square comes with the best move and is played next.
+    """
+
+    def __init__(self, game=None, command=ENGINE_COMMAND, move_time=MCTS_MOVE_TIME, **client_options):
+        self.game = game
+        self.move_time = move_time
+        self.client = EngineClient(command, **client_options)
+        self.time_manager = TimeManager()
+        self.time_budget = None
+        self.planned_duck = None
+        self.planned_promotion = None
+        self.last_info = {}
+
+    def search(self, game, move_time=None, max_iterations=None, budget=None):
+        """
+        Best (start, end, duck) action for the side to move, or None. The piece a promotion names is left
+        in planned_promotion (None: a Queen). Raises EngineError if the engine fails.
+        """
+        self.planned_promotion = None
+        if game.game_over: return None
+        if budget is not None:
+            limits = {'softtime': int(budget[0]), 'movetime': int(budget[1])}
+        else:
+            limits = {'movetime': self.move_time if move_time is None else move_time}
+            if max_iterations: limits['nodes'] = max_iterations
+            if not limits['movetime']: del limits['movetime']
+        timeout = limits.get('movetime', ENGINE_START_TIMEOUT_MS) + ENGINE_GRACE_MS
+        t0 = time.perf_counter()
+        result = self.client.go(position_command(game), limits, timeout)
+        elapsed = time.perf_counter() - t0
+        self.last_info = dict(self.client.last_info, time=elapsed,
+                              iterations=self.client.last_info.get('nodes', 0))
+        if result is None: return None
+        action, self.planned_promotion = result
+        return action
+
+    # --- DuckAI-COMPATIBLE INTERFACE (used by GameLogicMixin.ai_turn) ---
+    def get_piece_move(self, board, turn_color, legal_moves_generator):
+        """(start, end) of the engine's move, or None. EngineError propagates, so the host can replace the engine."""
+        action = self.search(self.game, budget=self.time_budget)
+        if not action: return None
+        self.planned_duck = action[2]
+        return action[0], action[1]
+
+    def get_duck_move(self, board, current_duck_pos, prev_duck_pos):
+        duck, self.planned_duck = self.planned_duck, None
+        if duck and not board[duck[0]][duck[1]] and duck != prev_duck_pos: return duck
+        empties = [(r, c) for r in range(8) for c in range(8) if not board[r][c] and (r, c) != prev_duck_pos]
+        return random.choice(empties) if empties else None
+
+    def close(self):
+        self.client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a Duck Chess engine over the UCI-style text protocol")
+    parser.add_argument('--engine', default=None,
+                        help='engine config as JSON, e.g. \'{"engine": "mcts", "batch_size": 32}\'')
+    args = parser.parse_args()
+    from match import build_engine
+    config = json.loads(args.engine) if args.engine else ENGINE_CONFIG
+    EngineServer(build_engine(config)).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from settings import *
+from pieces import Piece
+
+
+class GameHistory:
+    """
+    The positions of one game, stored as per-ply square deltas with a full keyframe every
+    HISTORY_KEYFRAME_INTERVAL plies. history[i] rebuilds position i on demand as the dict the
+    renderer reads ('board', 'duck_pos', 'turn', 'prev_duck', 'last_move'); the most recently
+    viewed positions stay in a small LRU. Rebuilt boards are for display only.
+    """
+
+    def __init__(self, keyframe_interval=HISTORY_KEYFRAME_INTERVAL, cache_size=HISTORY_CACHE_SIZE):
+        self.keyframe_interval = keyframe_interval
+        self.cache_size = cache_size
+        self.keyframes = {}  # ply -> 64 piece codes ('wP', None, ...)
+        self.records = []  # per ply: (changed (square, code) pairs, duck_pos, turn, prev_duck, last_move)
+        self.codes = None  # Codes of the newest position, diffed against by the next append
+        self.cache = OrderedDict()
+
+    def __len__(self):
+        return len(self.records)
+
+    def append(self, board, duck_pos, turn, prev_duck, last_move):
+        codes = tuple(p.color + p.type if p else None for row in board for p in row)
+        ply = len(self.records)
+        if ply % self.keyframe_interval == 0:
+            self.keyframes[ply] = codes
+            changes = ()
+        else:
+            changes = tuple((sq, code) for sq, (old, code) in enumerate(zip(self.codes, codes)) if old != code)
+        self.records.append((changes, duck_pos, turn, prev_duck, last_move))
+        self.codes = codes
+
+    def clear(self):
+        self.keyframes.clear()
+        self.records.clear()
+        self.codes = None
+        self.cache.clear()
+
+    def codes_at(self, ply):
+        base = ply - ply % self.keyframe_interval
+        codes = list(self.keyframes[base])
+        for changes, *_ in self.records[base + 1:ply + 1]:
+            for sq, code in changes: codes[sq] = code
+        return codes
+
+    def __getitem__(self, ply):
+        if ply < 0: ply += len(self.records)
+        if not 0 <= ply < len(self.records): raise IndexError(ply)
+        if ply in self.cache:
+            self.cache.move_to_end(ply)
+            return self.cache[ply]
+
+        codes = self.codes_at(ply)
+        _, duck_pos, turn, prev_duck, last_move = self.records[ply]
+        snap = {'board': [[Piece(code[0], code[1]) if code else None for code in codes[r * 8:r * 8 + 8]]
+                          for r in range(8)],
+                'duck_pos': duck_pos, 'turn': turn, 'prev_duck': prev_duck, 'last_move': last_move}
+        self.cache[ply] = snap
+        if len(self.cache) > self.cache_size: self.cache.popitem(last=False)
+        return snap
@@ -0,0 +1,252 @@
+"""
+Duck Chess game records: PGN with a Variant tag and the duck square appended to every ply.
+
+    [Event "Casual"]
+    [Variant "Duck"]
+    [Result "1-0"]
+
+    1. e4@e6 e5@e3 2. Nf3@d4 Nc6@f6 ... 1-0
+
+A ply is SAN + '@' + duck square. A King capture ends the game before the duck moves,
+so the last ply of a decisive game may have no '@'. A non-standard start is given by a [FEN] tag.
+"""
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import re
+import sys
+import argparse
+from itertools import islice
+from multiprocessing import Pool
+from settings import *
+from headless import HeadlessGame
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+SAN_RE = re.compile(r"^([KQRBN])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([QRBN]))?$")
+HEADER_RE = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+COMMENT_RE = re.compile(r"\{[^}]*\}|;[^\n]*")
+MOVE_NUMBER_RE = re.compile(r"^\d+\.+$")
+
+
+class GameRecordError(ValueError):
+    pass
+
+
+class GameRecord:
+    def __init__(self, headers=None, moves=None):
+        self.headers = headers if headers is not None else {}
+        self.moves = moves if moves is not None else []  # [(san, duck_square or None)]
+
+    @classmethod
+    def from_game(cls, game, headers=None):
+        """Builds a record from any GameLogicMixin host (uses its move_log)."""
+        record = cls(dict(headers or {}))
+        record.headers.setdefault('Event', 'Duck Chess')
+        record.headers.setdefault('Variant', 'Duck')
+        record.headers['Result'] = result_of(game)
+        start_fen = getattr(game, 'start_fen', None)
+        if start_fen and start_fen != START_FEN: record.headers['FEN'] = start_fen
+        for entry in game.move_log:
+            ply = entry.split(' ', 1)[1] if MOVE_NUMBER_RE.match(entry.split(' ', 1)[0]) else entry
+            san, _, duck = ply.partition(' @ ')
+            record.moves.append((san, duck or None))
+        return record
+
+    def to_text(self):
+        lines = [f'[{key} "{value}"]' for key, value in self.headers.items()]
+        fields = self.headers.get('FEN', START_FEN).split()
+        turn = fields[1]
+        number = int(fields[5]) if len(fields) > 5 else 1
+
+        tokens = []
+        for i, (san, duck) in enumerate(self.moves):
+            if turn == 'w':
+                tokens.append(f"{number}.")
+            elif i == 0:
+                tokens.append(f"{number}...")
+            tokens.append(f"{san}@{duck}" if duck else san)
+            if turn == 'b': number += 1
+            turn = 'b' if turn == 'w' else 'w'
+        tokens.append(self.headers.get('Result', '*'))
+
+        movetext, line = [], ""
+        for token in tokens:
+            if line and len(line) + 1 + len(token) > 79:
+                movetext.append(line)
+                line = token
+            else:
+                line = f"{line} {token}" if line else token
+        movetext.append(line)
+        return "\n".join(lines) + "\n\n" + "\n".join(movetext) + "\n"
+
+
+def result_of(game):
+    if not game.game_over: return "*"
+    if game.winner == 'draw': return "1/2-1/2"
+    return "1-0" if game.winner == 'w' else "0-1"
+
+
+def write_game(stream, game, headers=None):
+    """Appends one game (a GameLogicMixin host or a GameRecord) to an open text stream."""
+    record = game if isinstance(game, GameRecord) else GameRecord.from_game(game, headers)
+    stream.write(record.to_text())
+    stream.write("\n")
+
+
+# --- STREAMING PARSER ---
+def iter_raw_games(stream):
+    """Yields the raw text of each game without parsing moves, so memory stays O(one game)."""
+    lines, in_moves = [], False
+    for line in stream:
+        stripped = line.strip()
+        if stripped.startswith('[') and in_moves:
+            yield "".join(lines)
+            lines, in_moves = [], False
+        if stripped and not stripped.startswith('['): in_moves = True
+        if stripped or lines: lines.append(line)
+    if any(l.strip() for l in lines): yield "".join(lines)
+
+
+def parse_game(text):
+    headers, movetext = {}, []
+    for line in text.splitlines():
+        m = HEADER_RE.match(line.strip())
+        if m:
+            headers[m.group(1)] = m.group(2)
+        else:
+            movetext.append(line)
+
+    moves = []
+    body = COMMENT_RE.sub(" ", "\n".join(movetext)).replace(" @ ", "@")
+    for token in body.split():
+        if MOVE_NUMBER_RE.match(token): continue
+        if token in RESULTS:
+            headers.setdefault('Result', token)
+            continue
+        token = re.sub(r"^\d+\.+", "", token)
+        san, _, duck = token.partition('@')
+        moves.append((san, duck or None))
+    return GameRecord(headers, moves)
+
+
+def read_games(stream):
+    """Generator over GameRecords of a (possibly huge) file."""
+    for text in iter_raw_games(stream):
+        yield parse_game(text)
+
+
+# --- REPLAY ---
+def parse_square(text):
+    if len(text) != 2 or text[0] not in "abcdefgh" or text[1] not in "12345678":
+        raise GameRecordError(f"Bad square: {text!r}")
+    return "87654321".index(text[1]), "abcdefgh".index(text[0])
+
+
+def resolve_san(game, san):
+    """Finds the (start, end, promotion) piece move that `san` denotes in the current position."""
+    clean = san.rstrip('+#!?').replace('+', '')
+    if clean in ("O-O", "O-O-O", "0-0", "0-0-0"):
+        r = 7 if game.turn == 'w' else 0
+        end = (r, 6 if clean.count('O') + clean.count('0') == 2 else 2)
+        if end in game.get_piece_legal_moves(r, 4) and game.board[r][4] and game.board[r][4].type == KING:
+            return (r, 4), end, None
+        raise GameRecordError(f"Illegal castling: {san}")
+
+    m = SAN_RE.match(clean)
+    if not m: raise GameRecordError(f"Unreadable move: {san!r}")
+    p_type = m.group(1) or PAWN
+    from_file, from_rank = m.group(2), m.group(3)
+    end = parse_square(m.group(4))
+
+    candidates = []
+    for start, dest in game.get_all_legal_moves(game.turn):
+        if dest != end or game.board[start[0]][start[1]].type != p_type: continue
+        rank, file = game.get_rank_file(*start)
+        if from_file and file != from_file: continue
+        if from_rank and rank != from_rank: continue
+        candidates.append(start)
+    if len(candidates) != 1:
+        raise GameRecordError(f"{'Ambiguous' if candidates else 'Illegal'} move: {san}")
+    return candidates[0], end, m.group(5)
+
+
+def iter_replay(record):
+    """Plays the record through the rules, yielding (ply, game) after every ply. Raises GameRecordError."""
+    try:
+        game = HeadlessGame.from_fen(record.headers['FEN']) if 'FEN' in record.headers else HeadlessGame()
+    except ValueError as e:
+        raise GameRecordError(f"Bad FEN header: {e}") from None
+    for ply, (san, duck) in enumerate(record.moves, 1):
+        if game.game_over: raise GameRecordError(f"Ply {ply} ({san}) after the game ended")
+        start, end, promotion = resolve_san(game, san)
+        game.execute_move(start, end, animated=False)
+        if game.promotion_pending: game.promote_pawn(promotion or QUEEN)
+        if not game.game_over:
+            if duck is None: raise GameRecordError(f"Ply {ply} ({san}) has no duck square")
+            square = parse_square(duck)
+            if game.board[square[0]][square[1]] or square == game.prev_duck_pos:
+                raise GameRecordError(f"Ply {ply} ({san}) has an illegal duck square {duck}")
+            game.place_duck(square, animated=False)
+        yield ply, game
+
+    claimed = record.headers.get('Result', '*')
+    if game.game_over and claimed != '*' and claimed != result_of(game):
+        raise GameRecordError(f"Result {claimed} does not match the final position ({result_of(game)})")
+
+
+def replay(record):
+    game = None
+    for _, game in iter_replay(record): pass
+    return game
+
+
+# --- BULK VALIDATION ---
+def _validate_chunk(chunk):
+    errors, plies = [], 0
+    for index, text in chunk:
+        try:
+            record = parse_game(text)
+            for ply, _ in iter_replay(record): plies += 1
+        except GameRecordError as e:
+            errors.append((index, str(e)))
+    return len(chunk), plies, errors
+
+
+def _chunks(paths, size):
+    index = 0
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            raw = iter_raw_games(f)
+            while True:
+                chunk = [(index + i, text) for i, text in enumerate(islice(raw, size))]
+                if not chunk: break
+                index += len(chunk)
+                yield chunk
+
+
+def validate_files(paths, workers=None, chunk_size=RECORD_CHUNK_SIZE, on_error=None):
+    """Replays every game of every file in a process pool. Returns (games, plies, errors)."""
+    games = plies = 0
+    errors = []
+    with Pool(workers or os.cpu_count()) as pool:
+        for n, p, errs in pool.imap(_validate_chunk, _chunks(paths, chunk_size)):
+            games += n
+            plies += p
+            errors.extend(errs)
+            if on_error:
+                for err in errs: on_error(*err)
+    return games, plies, errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Duck Chess game-record tools")
+    parser.add_argument('command', choices=['validate'])
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    total, total_plies, failed = validate_files(args.files, args.workers,
+                                                on_error=lambda i, msg: print(f"Game {i + 1}: {msg}"))
+    print(f"{total} games, {total_plies} plies replayed, {len(failed)} invalid")
+    sys.exit(1 if failed else 0)
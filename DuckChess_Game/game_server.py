@@ -0,0 +1,354 @@
+"""
+Many human-vs-AI games in one process: an asyncio server speaking JSON lines over TCP or a Unix
+socket. Every request may carry an "id" that is echoed in its reply, so a client can pipeline.
+
+    {"id": 1, "op": "new", "side": "w"}                     -> {"id": 1, "ok": true, "session": "s1", "fen": ...}
+    {"id": 2, "op": "move", "session": "s1", "move": "e2e4@e6"}
+                                                            -> {"id": 2, "ok": true, "reply": "b8c6@b8", "fen": ...}
+    {"op": "state" | "close", "session": "s1"}, {"op": "stats"}
+
+Moves use engine_protocol's text form. Sessions only hold a HeadlessGame; AI plies are searched
+by a process pool from the FEN. Each session has at most one AI job queued and the queue is
+first-in first-out, so a busy session cannot delay the others. A long queue shortens the search
+time per job, and new games are refused while AI replies run slower than SERVER_LATENCY_TARGET_MS,
+so move latency stays bounded under load.
+
+    python game_server.py serve --port 8765 --workers 4
+    python game_server.py load --sessions 200 --plies 20      (stand-in clients; prints latencies)
+"""
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from settings import *
+from headless import HeadlessGame
+from engine_protocol import format_move, parse_move
+
+_engine = None  # One engine per pool worker, built by the initializer
+
+
+def _init_worker(config):
+    global _engine
+    from match import build_engine
+    if hasattr(os, 'nice'): os.nice(SERVER_WORKER_NICE)
+    _engine = build_engine(config)
+
+
+def ai_move(fen, move_time):
+    """Pool job: the engine's ply for a FEN as move text, or None if it has none."""
+    from match import choose_action
+    result = choose_action(_engine, HeadlessGame.from_fen(fen), move_time=move_time)
+    return format_move(*result) if result else None
+
+
+def percentile(values, p):
+    """p-th percentile (0-100) by nearest rank; 0.0 for no values."""
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+
+
+class GameSession:
+    """One game: the position and whose side the human plays. The lock keeps its requests in order."""
+    __slots__ = ('id', 'game', 'human', 'last_active', 'lock')
+
+    def __init__(self, session_id, game, human):
+        self.id = session_id
+        self.game = game
+        self.human = human
+        self.last_active = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def result(self):
+        return self.game.winner if self.game.game_over else None
+
+
+class GameServer:
+    """Holds the sessions, answers requests and runs the AI job queue on one event loop."""
+
+    def __init__(self, engine_config=SERVER_ENGINE, workers=None, max_sessions=SERVER_MAX_SESSIONS,
+                 move_ms=SERVER_AI_MOVE_MS, max_plies=SERVER_MAX_PLIES):
+        self.engine_config = engine_config
+        self.workers = workers or os.cpu_count()
+        self.max_sessions = max_sessions
+        self.move_ms = move_ms
+        self.max_plies = max_plies
+        self.sessions = {}
+        self.next_id = 0
+        self.jobs = None  # asyncio.Queue of (fen, future), created on the server's loop
+        self.busy = 0
+        self.pool = None
+        self.latency = deque(maxlen=SERVER_LATENCY_WINDOW)  # ms from a move request to its reply
+        self.ai_latency = deque(maxlen=SERVER_LATENCY_WINDOW)  # ms an AI ply spent queued and searching
+        self.ai_average = 0.0  # Moving average of ai_latency, for admission
+        self.counts = {'moves': 0, 'rejected': 0, 'expired': 0}
+
+    # --- LIFECYCLE ---
+    async def serve(self, host=SERVER_HOST, port=SERVER_PORT, unix_path=None, ready=None):
+        self.jobs = asyncio.Queue()
+        self._start_pool()
+        tasks = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        tasks.append(asyncio.create_task(self._expire_loop()))
+        if unix_path:
+            server = await asyncio.start_unix_server(self._client, unix_path, limit=SERVER_LINE_LIMIT)
+        else:
+            server = await asyncio.start_server(self._client, host, port, limit=SERVER_LINE_LIMIT)
+        print(f"Game server on {unix_path or f'{host}:{port}'} with {self.workers} AI workers")
+        if ready: ready.set()
+        try:
+            async with server: await server.serve_forever()
+        finally:
+            for task in tasks: task.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+    def _start_pool(self):
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.engine_config,))
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(SERVER_IDLE_TIMEOUT_S / 10)
+            cutoff = time.monotonic() - SERVER_IDLE_TIMEOUT_S
+            for sid in [sid for sid, s in self.sessions.items() if s.last_active < cutoff and not s.lock.locked()]:
+                del self.sessions[sid]
+                self.counts['expired'] += 1
+
+    # --- CONNECTIONS ---
+    async def _client(self, reader, writer):
+        inflight = asyncio.Semaphore(SERVER_MAX_INFLIGHT)  # Stops reading when one client floods the server
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # Line over SERVER_LINE_LIMIT
+                    break
+                if not line: break
+                await inflight.acquire()
+                task = asyncio.create_task(self._respond(line, writer, inflight))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending: await asyncio.wait(pending)
+        finally:
+            writer.close()
+
+    async def _respond(self, line, writer, inflight):
+        try:
+            request = {}
+            try:
+                request = json.loads(line)
+                reply = await self.handle(request)
+            except Exception as e:  # Every request gets a reply, or its client waits forever
+                reply = {'ok': False, 'error': str(e) or type(e).__name__}
+            if isinstance(request, dict) and 'id' in request: reply['id'] = request['id']
+            writer.write((json.dumps(reply) + "\n").encode())
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            inflight.release()
+
+    # --- REQUESTS ---
+    async def handle(self, request):
+        op = request.get('op')
+        if op == 'stats': return self.stats()
+        if op == 'new': return await self.new_session(request.get('side', 'w'), request.get('fen'))
+        session = self.sessions.get(request.get('session'))
+        if session is None: return {'ok': False, 'error': "Unknown session"}
+        session.last_active = time.monotonic()
+        if op == 'move': return await self.move(session, request['move'])
+        if op == 'state': return self.state(session)
+        if op == 'close':
+            self.sessions.pop(session.id, None)
+            return {'ok': True}
+        return {'ok': False, 'error': f"Unknown op: {op!r}"}
+
+    async def new_session(self, side, fen=None):
+        if len(self.sessions) >= self.max_sessions:
+            self.counts['rejected'] += 1
+            return {'ok': False, 'error': "Server full"}
+        backlog = self.jobs.qsize()
+        if backlog >= SERVER_MAX_QUEUE * self.workers or (backlog and self.ai_average > SERVER_LATENCY_TARGET_MS):
+            # Shedding new games keeps the latency of the running ones bounded
+            self.counts['rejected'] += 1
+            return {'ok': False, 'error': "Server busy"}
+        if side not in ('w', 'b'): return {'ok': False, 'error': "side must be 'w' or 'b'"}
+        game = HeadlessGame.from_fen(fen) if fen else HeadlessGame()
+        game.derived_cache_size = SERVER_DERIVED_CACHE_SIZE
+        self.next_id += 1
+        session = GameSession(f"s{self.next_id}", game, side)
+        self.sessions[session.id] = session
+        async with session.lock:
+            reply = await self.ai_reply(session) if game.turn != side and not game.game_over else None
+        return dict(self.state(session), session=session.id, reply=reply)
+
+    async def move(self, session, text):
+        t0 = time.perf_counter()
+        async with session.lock:
+            game = session.game
+            if game.game_over: return {'ok': False, 'error': "The game is over"}
+            if game.turn != session.human: return {'ok': False, 'error': "Not your turn"}
+            try:
+                action, promotion = parse_move(text)
+                game.apply_checked_action(action, promotion or QUEEN)  # A rejected ply changes nothing
+            except ValueError as e:
+                return {'ok': False, 'error': str(e)}
+            self.adjudicate(game)
+            reply = await self.ai_reply(session) if not game.game_over else None
+        self.counts['moves'] += 1
+        self.latency.append(1000 * (time.perf_counter() - t0))
+        return dict(self.state(session), reply=reply)
+
+    async def ai_reply(self, session):
+        """Queues the AI's ply for the session, plays it and returns its text."""
+        game = session.game
+        t0 = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        await self.jobs.put((game.generate_fen(), future))
+        try:
+            text = await future
+        except ValueError:
+            game.game_over, game.winner = True, 'draw'  # Aborted: the position can no longer be answered
+            raise
+        ms = 1000 * (time.perf_counter() - t0)
+        self.ai_latency.append(ms)
+        self.ai_average += (ms - self.ai_average) * 0.1
+        if text is None:
+            # Engine found nothing: the rules already ended the game, or the engine forfeits
+            if not game.game_over: game.game_over, game.winner = True, session.human
+            return None
+        try:
+            action, promotion = parse_move(text)
+            game.apply_checked_action(action, promotion or QUEEN)
+        except ValueError:
+            # An illegal engine reply forfeits; the position stays as the human left it
+            game.game_over, game.winner = True, session.human
+            return None
+        self.adjudicate(game)
+        return text
+
+    def adjudicate(self, game):
+        """Bounds a session's memory: very long games are drawn."""
+        if not game.game_over and len(game.history) > self.max_plies:
+            game.game_over, game.winner = True, 'draw'
+
+    async def _dispatch(self):
+        """One per pool worker: feeds AI jobs first-in first-out."""
+        loop = asyncio.get_running_loop()
+        while True:
+            fen, future = await self.jobs.get()
+            # Search less while a queue builds up, so latency stays near move_ms instead of growing with load
+            backlog = self.jobs.qsize() + self.busy + 1
+            move_time = max(SERVER_AI_MIN_MS, self.move_ms * self.workers // max(self.workers, backlog))
+            self.busy += 1
+            pool = self.pool
+            try:
+                result = await loop.run_in_executor(pool, ai_move, fen, move_time)
+            except Exception as e:  # Worker crashed: the session gets an error, the server keeps running
+                if isinstance(e, BrokenProcessPool) and pool is self.pool: self._start_pool()
+                if not future.done(): future.set_exception(ValueError(f"AI failed: {e}"))
+            else:
+                if not future.done(): future.set_result(result)
+            finally:
+                self.busy -= 1
+
+    def state(self, session):
+        game = session.game
+        return {'ok': True, 'fen': game.generate_fen(), 'turn': game.turn, 'plies': len(game.history) - 1,
+                'result': session.result()}
+
+    def stats(self):
+        latency, ai_latency = list(self.latency), list(self.ai_latency)
+        return {'ok': True, 'sessions': len(self.sessions), 'queued': self.jobs.qsize() if self.jobs else 0,
+                'busy': self.busy, **self.counts,
+                'move_ms': {'p50': percentile(latency, 50), 'p99': percentile(latency, 99)},
+                'ai_ms': {'p50': percentile(ai_latency, 50), 'p99': percentile(ai_latency, 99)}}
+
+
+# --- STAND-IN CLIENTS ---
+async def load_test(sessions, plies, host=SERVER_HOST, port=SERVER_PORT, unix_path=None, connections=4):
+    """
+    Plays `sessions` games at once (random legal moves) spread over a few connections, and
+    returns the client-side move latencies in ms plus the server's stats.
+    """
+    async def connect():
+        if unix_path: return await asyncio.open_unix_connection(unix_path, limit=SERVER_LINE_LIMIT)
+        return await asyncio.open_connection(host, port, limit=SERVER_LINE_LIMIT)
+
+    class Connection:
+        def __init__(self, reader, writer):
+            self.reader, self.writer = reader, writer
+            self.waiting = {}
+            self.next_id = 0
+            self.task = asyncio.create_task(self.read_loop())
+
+        async def read_loop(self):
+            while line := await self.reader.readline():
+                reply = json.loads(line)
+                self.waiting.pop(reply.get('id')).set_result(reply)
+
+        async def call(self, **request):
+            self.next_id += 1
+            future = self.waiting[self.next_id] = asyncio.get_running_loop().create_future()
+            self.writer.write((json.dumps(dict(request, id=self.next_id)) + "\n").encode())
+            await self.writer.drain()
+            return await future
+
+    async def play(conn, rng):
+        reply = await conn.call(op='new', side=rng.choice('wb'))
+        while not reply['ok']:  # Busy: retry like a real client would
+            await asyncio.sleep(0.5)
+            reply = await conn.call(op='new', side=rng.choice('wb'))
+        session, mirror = reply['session'], HeadlessGame.from_fen(reply['fen'])
+        for _ in range(plies):
+            if reply['result'] is not None: break
+            action = rng.choice(mirror.legal_actions())
+            t0 = time.perf_counter()
+            reply = await conn.call(op='move', session=session, move=format_move(action))
+            latencies.append(1000 * (time.perf_counter() - t0))
+            if not reply['ok']: raise RuntimeError(reply['error'])
+            mirror = HeadlessGame.from_fen(reply['fen'])
+        await conn.call(op='close', session=session)
+
+    latencies = []
+    conns = [Connection(*await connect()) for _ in range(connections)]
+    rng = random.Random(1)
+    await asyncio.gather(*(play(conns[i % connections], random.Random(rng.random())) for i in range(sessions)))
+    stats = await conns[0].call(op='stats')
+    for conn in conns:
+        conn.writer.close()
+        conn.task.cancel()
+    return latencies, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-session Duck Chess game server")
+    parser.add_argument('mode', choices=['serve', 'load'])
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--unix', default=None, help="Unix socket path instead of TCP")
+    parser.add_argument('--workers', type=int, default=None, help="AI worker processes (default: all cores)")
+    parser.add_argument('--engine', default=None, help="engine config as JSON (default: SERVER_ENGINE)")
+    parser.add_argument('--sessions', type=int, default=100, help="load: games played at once")
+    parser.add_argument('--plies', type=int, default=10, help="load: human moves per game")
+    args = parser.parse_args()
+
+    if args.mode == 'serve':
+        config = json.loads(args.engine) if args.engine else SERVER_ENGINE
+        try:
+            asyncio.run(GameServer(config, args.workers).serve(args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+    else:
+        t0 = time.perf_counter()
+        latencies, stats = asyncio.run(load_test(args.sessions, args.plies, args.host, args.port, args.unix))
+        elapsed = time.perf_counter() - t0
+        print(f"{len(latencies)} moves in {elapsed:.1f}s ({len(latencies) / elapsed:.1f}/s)")
+        print(f"client move latency ms: p50 {percentile(latencies, 50):.0f}  p99 {percentile(latencies, 99):.0f}")
+        print("server:", json.dumps(stats))
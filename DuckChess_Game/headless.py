@@ -0,0 +1,141 @@
+from settings import *
+from logic import GameLogicMixin
+
+
+# --- ACTION ENCODING (piece move + duck square packed into one int) ---
+def encode_action(action):
+    (sr, sc), (er, ec), (dr, dc) = action
+    return ((sr * 8 + sc) << 12) | ((er * 8 + ec) << 6) | (dr * 8 + dc)
+
+
+def decode_action(code):
+    s, e, d = code >> 12, (code >> 6) & 63, code & 63
+    return (s // 8, s % 8), (e // 8, e % 8), (d // 8, d % 8)
+
+
+def last_ply_action(game):
+    """(start, end, duck) of the ply just completed. A game-ending King capture has no duck: duck == end."""
+    start, end = game.last_move_arrow
+    # The turn only passes when the duck lands, so the mover still being on turn means no duck
+    mover_on_turn = game.board[end[0]][end[1]].color == game.turn
+    return start, end, end if mover_on_turn else game.duck_pos
+
+
+# Plain attributes that, with the board, rep_history, move_log and captured, make up a position's rule state
+RULE_STATE = ('duck_pos', 'prev_duck_pos', 'turn', 'phase', 'game_over', 'winner', 'en_passant_target',
+              'half_move_clock', 'last_move_arrow', 'turn_number', 'current_move_str',
+              'promotion_pending', 'promotion_coords', 'start_fen')
+
+
+class HeadlessGame(GameLogicMixin):
+    """Window-less game state driven by the same rules as DuckChess (search, replays, servers)."""
+
+    def __init__(self, game_mode=None):
+        self.game_mode = game_mode
+        self.reset_game_state()
+
+    def reset_game_state(self):
+        self.duck_pos = (-1, -1)
+        self.prev_duck_pos = (-1, -1)
+        self.turn = 'w'
+        self.phase = 'move_piece'
+        self.game_over = False
+        self.winner = None
+        self.en_passant_target = None
+        self.half_move_clock = 0
+        self.rep_history = {}
+
+        self.move_log = []
+        self.last_move_arrow = None
+        self.turn_number = 1
+        self.current_move_str = ""
+        self.history = []
+        self.view_index = -1
+
+        self.captured = {'w': [], 'b': []}
+        self.promotion_pending = False
+        self.promotion_coords = None
+        self.waiting_for_ai = False
+        self.start_fen = None
+
+        self.board = [[None] * 8 for _ in range(8)]
+        self.init_board()
+        self.save_snapshot()
+
+    @classmethod
+    def from_game(cls, game):
+        """Copies the rule-relevant state out of any GameLogicMixin host (e.g. the live DuckChess window)."""
+        state = cls.__new__(cls)
+        for attr in RULE_STATE: setattr(state, attr, getattr(game, attr))
+        state.game_mode = None
+        state.waiting_for_ai = False
+        state.board = [[p.copy() if p else None for p in row] for row in game.board]
+        state.rep_history = dict(game.rep_history)
+        state.move_log = list(game.move_log)
+        state.captured = {'w': list(game.captured['w']), 'b': list(game.captured['b'])}
+        state.history = [state.last_move_arrow]
+        state.view_index = 0
+        return state
+
+    def copy_state_to(self, game):
+        """Inverse of from_game: overwrites the rule state of another host with this position."""
+        for attr in RULE_STATE: setattr(game, attr, getattr(self, attr))
+        game.board = [[p.copy() if p else None for p in row] for row in self.board]
+        game.rep_history = dict(self.rep_history)
+        game.move_log = list(self.move_log)
+        game.captured = {'w': list(self.captured['w']), 'b': list(self.captured['b'])}
+
+    @classmethod
+    def from_fen(cls, fen, game_mode=None):
+        state = cls(game_mode)
+        state.load_fen(fen)
+        return state
+
+    def save_snapshot(self):
+        # No rendering, so only the ply boundaries are kept (one entry per snapshot)
+        self.history.append(self.last_move_arrow)
+        self.view_index = len(self.history) - 1
+
+    def clone(self):
+        """Independent copy of the position; cheap enough to call once per search leaf."""
+        other = HeadlessGame.__new__(HeadlessGame)
+        other.__dict__.update(self.__dict__)
+        other.board = [[p.copy() if p else None for p in row] for row in self.board]
+        other.rep_history = dict(self.rep_history)
+        other.move_log = list(self.move_log)
+        other.history = list(self.history)
+        other.captured = {'w': list(self.captured['w']), 'b': list(self.captured['b'])}
+        return other
+
+    # --- FULL-PLY ACTIONS (piece move + duck square) ---
+    def legal_actions(self):
+        """All (start, end, duck) actions for the side to move."""
+        actions = []
+        for start, end in self.get_all_legal_moves(self.turn):
+            for duck in self.get_duck_squares_after(start, end):
+                actions.append((start, end, duck))
+        return actions
+
+    def apply_action(self, action, promotion=QUEEN):
+        """Plays a whole ply. The duck is skipped when the piece move already ended the game."""
+        start, end, duck = action
+        self.execute_move(start, end, animated=False)
+        if self.promotion_pending: self.promote_pawn(promotion)
+        if not self.game_over: self.place_duck(duck, animated=False)
+
+    def apply_checked_action(self, action, promotion=QUEEN):
+        """
+        apply_action for untrusted input (journals, protocols). The whole ply is checked before the board
+        changes, so an illegal one raises ValueError and leaves this game exactly as it was.
+        """
+        start, end, duck = action
+        if self.game_over: raise ValueError("The game is over")
+        if end not in self.legal_move_map().get(start, []): raise ValueError("Illegal move")
+        target = self.board[end[0]][end[1]]
+        # Only a King capture ends the ply before the duck moves
+        if not (target and target.type == KING) and duck not in self.get_duck_squares_after(start, end):
+            raise ValueError("Illegal duck square")
+        self.apply_action(action, promotion if promotion in (QUEEN, ROOK, BISHOP, KNIGHT) else QUEEN)
+
+    def announce_game_end(self, reason):
+        self.end_reason = reason
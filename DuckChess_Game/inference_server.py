@@ -0,0 +1,197 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import tempfile
+import threading
+import importlib
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from settings import *
+from headless import HeadlessGame
+
+
+def default_address():
+    """Named pipe on Windows, Unix socket elsewhere."""
+    if sys.platform == 'win32': return r'\\.\pipe\duck_chess_eval'
+    return os.path.join(tempfile.gettempdir(), 'duck_chess_eval.sock')
+
+
+def key_directory():
+    """Per-user directory for key files: $XDG_RUNTIME_DIR/duck_chess, else ~/.cache/duck_chess (mode 0700)."""
+    base = os.environ.get('XDG_RUNTIME_DIR') or os.path.join(os.path.expanduser('~'), '.cache')
+    path = os.path.join(base, 'duck_chess')
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if hasattr(os, 'getuid'):
+        st = os.stat(path)
+        if st.st_uid != os.getuid(): raise PermissionError(f"{path} is not owned by the current user")
+        if st.st_mode & 0o077: os.chmod(path, 0o700)
+    return path
+
+
+def default_authkey(address):
+    """
+    INFERENCE_AUTHKEY, or a random key kept in a file only this user can read (created on first use).
+    Raises PermissionError rather than trust a key file another user owns or could read.
+    """
+    if INFERENCE_AUTHKEY: return INFERENCE_AUTHKEY
+    path = os.path.join(key_directory(), os.path.basename(address) + '.key')
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+        with os.fdopen(fd, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if hasattr(os, 'getuid') and (st.st_uid != os.getuid() or st.st_mode & 0o777 != 0o600):
+                raise PermissionError(f"{path} must be owned by the current user with mode 0600")
+            return f.read()
+    key = os.urandom(32)
+    with os.fdopen(fd, 'wb') as f: f.write(key)
+    return key
+
+
+def load_model(spec):
+    """'module:Factory' -> Factory(). Anything with evaluate_batch(states, actions) is a valid model."""
+    module_name, _, attr = spec.partition(':')
+    return getattr(importlib.import_module(module_name), attr or 'Model')()
+
+
+class InferenceServer:
+    """
+    Loads the evaluation model once and serves many search workers.
+    Requests from all connections are merged into one batch until INFERENCE_MAX_BATCH positions
+    are queued or INFERENCE_MAX_WAIT_MS has passed since the oldest one arrived.
+    """
+
+    def __init__(self, model, address=None, max_batch=INFERENCE_MAX_BATCH, max_wait_ms=INFERENCE_MAX_WAIT_MS,
+                 authkey=None):
+        self.model = model
+        self.address = address or default_address()
+        self.authkey = authkey or default_authkey(self.address)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = queue.Queue()
+        self.running = False
+        self.stats = {'requests': 0, 'positions': 0, 'batches': 0, 'model_time': 0.0}
+
+    def serve_forever(self):
+        if sys.platform != 'win32' and os.path.exists(self.address): os.unlink(self.address)
+        self.running = True
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"Inference server listening on {self.address}")
+            while self.running:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, OSError):
+                    continue  # Wrong key or a client that hung up during the handshake
+                threading.Thread(target=self._client_loop, args=(conn,), daemon=True).start()
+
+    def _client_loop(self, conn):
+        lock = threading.Lock()  # Replies are sent from the batch thread
+        try:
+            while True:
+                message = conn.recv()
+                kind, payload = message if isinstance(message, tuple) and len(message) == 2 else (None, None)
+                if kind == 'eval':
+                    # Parsed here, so a bad request is answered with its error and never reaches a batch
+                    try:
+                        states = [HeadlessGame.from_fen(fen) for fen in payload]
+                    except (ValueError, TypeError, AttributeError) as e:
+                        with lock: conn.send(ValueError(f"Bad evaluation request: {e}"))
+                        continue
+                    self.requests.put((conn, lock, states, time.perf_counter()))
+                elif kind == 'stats':
+                    with lock: conn.send(self.get_stats())
+                else:
+                    with lock: conn.send(ValueError(f"Bad request: {message!r:.100}"))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _batch_loop(self):
+        while self.running:
+            batch = [self.requests.get()]
+            size = len(batch[0][2])
+            deadline = batch[0][3] + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0: break
+                try:
+                    item = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[2])
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        states = [state for _, _, group, _ in batch for state in group]
+        t0 = time.perf_counter()
+        results = error = None
+        try:
+            results = self.model.evaluate_batch(states, [s.legal_actions() for s in states])
+        except Exception as e:  # Every client of the batch gets the error; the batch thread keeps serving
+            error = RuntimeError(f"Evaluation failed: {e!r}")
+        self.stats['model_time'] += time.perf_counter() - t0
+        self.stats['requests'] += len(batch)
+        self.stats['positions'] += len(states)
+        self.stats['batches'] += 1
+
+        i = 0
+        for conn, lock, group, _ in batch:
+            try:
+                with lock: conn.send(error or results[i:i + len(group)])
+            except OSError:
+                pass  # Worker went away; its share of the batch is dropped
+            i += len(group)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['avg_batch'] = stats['positions'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+
+class RemoteEvaluator:
+    """Drop-in evaluator for MCTSEngine that forwards batches to a running InferenceServer."""
+
+    def __init__(self, address=None, authkey=None):
+        self.address = address or default_address()
+        self.authkey = authkey
+        self.conn = None
+        self.pid = None
+
+    def _connection(self):
+        # Reconnect after fork so worker processes never share a socket
+        if self.conn is None or self.pid != os.getpid():
+            self.conn = Client(self.address, authkey=self.authkey or default_authkey(self.address))
+            self.pid = os.getpid()
+        return self.conn
+
+    def evaluate_batch(self, states, actions):
+        conn = self._connection()
+        conn.send(('eval', [s.generate_fen() for s in states]))
+        reply = conn.recv()
+        if isinstance(reply, Exception): raise reply
+        return reply
+
+    def server_stats(self):
+        conn = self._connection()
+        conn.send(('stats', None))
+        return conn.recv()
+
+    def close(self):
+        if self.conn is not None: self.conn.close()
+        self.conn = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared batched evaluation server for Duck Chess search workers")
+    parser.add_argument('--model', default='mcts:MaterialEvaluator', help="module:Factory of the evaluator")
+    parser.add_argument('--address', default=None)
+    parser.add_argument('--max-batch', type=int, default=INFERENCE_MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=INFERENCE_MAX_WAIT_MS)
+    args = parser.parse_args()
+    InferenceServer(load_model(args.model), args.address, args.max_batch, args.max_wait_ms).serve_forever()
@@ -0,0 +1,176 @@
+"""
+Crash-safe autosave of the live game: an append-only journal with one short line per ply.
+
+    #duck-journal {"fen": null, "mode": "pvp", "side": "w"}
+    c1c2d P 5230        <- encoded (start, end, duck) action, piece on the end square, ms spent
+    cut 12              <- the line was rewound to 12 plies (variation switch); later plies follow
+
+Lines are written and fsynced in batches by a background thread, so a ply costs the render loop one
+queue put. A torn last line from a crash is ignored on reading. When the next game starts, the old
+journal is compacted into the game-record archive (see game_record.py) and replaced.
+"""
+import os
+import json
+import time
+import queue
+import threading
+import contextlib
+from settings import *
+from headless import HeadlessGame, encode_action, decode_action
+from game_record import GameRecord, write_game
+
+MAGIC = "#duck-journal"
+
+
+def read_journal(path):
+    """(header, [(action, promotion, ms)]) of a journal file, or (None, []) when there is none."""
+    try:
+        with open(path, encoding='utf-8') as f: lines = f.read().split("\n")
+    except FileNotFoundError:
+        return None, []
+    first, _, data = lines[0].partition(" ")
+    if first != MAGIC: return None, []
+    try:
+        header = json.loads(data)
+    except ValueError:
+        return None, []
+
+    plies = []
+    for line in lines[1:-1]:  # The last element is either "" or a line torn by a crash
+        fields = line.split()
+        try:
+            if fields[0] == 'cut':
+                del plies[int(fields[1]):]
+            else:
+                plies.append((decode_action(int(fields[0], 16)), fields[1], int(fields[2])))
+        except (IndexError, ValueError):
+            break
+    return header, plies
+
+
+def replay_journal(header, plies):
+    """HeadlessGame at the end of a journal. Raises ValueError if a ply is illegal."""
+    game = HeadlessGame.from_fen(header['fen']) if header.get('fen') else HeadlessGame()
+    for ply, (action, promotion, _) in enumerate(plies, 1):
+        try:
+            game.apply_checked_action(action, promotion)
+        except ValueError as e:
+            raise ValueError(f"Journal ply {ply}: {e}") from None
+    return game
+
+
+def compact_journal(path, archive_path):
+    """Appends the journal's game to the archive as a game record, then deletes the journal."""
+    header, plies = read_journal(path)
+    if plies and archive_path:
+        try:
+            game = replay_journal(header, plies)
+        except ValueError:
+            game = None
+        if game is not None:
+            with open(archive_path, 'a', encoding='utf-8') as f:
+                write_game(f, GameRecord.from_game(game, {'Event': "Duck Chess (autosave)",
+                                                          'Mode': header.get('mode') or "?"}))
+    if os.path.exists(path): os.remove(path)
+
+
+class GameJournal:
+    """
+    Journal of one live game. begin() is lazy: nothing touches the disk until the new game's first
+    ply, so opening the app and quitting leaves the previous journal in place to be resumed.
+    With path None every method is a no-op (offscreen renderers, tests).
+    """
+
+    def __init__(self, path, archive_path=None, sync_ms=JOURNAL_SYNC_MS):
+        self.path = path
+        self.archive_path = archive_path
+        self.sync_interval = sync_ms / 1000.0
+        self.header = None
+        self.open = False  # True once the current game owns the file
+        self.records = queue.Queue()
+        self.thread = None
+
+    def begin(self, header):
+        """Starts a new game (header: 'fen', 'mode', 'side'); the old journal is compacted on the first ply."""
+        self.header = header
+        self.open = False
+
+    def attach(self, header):
+        """Continues the existing journal file (after resuming the game it describes)."""
+        self.header = header
+        self.open = True
+
+    def append(self, action, promotion, ms=0):
+        self._put(f"{encode_action(action):x} {promotion} {int(ms)}\n")
+
+    def cut(self, plies):
+        """Records that the line was rewound to its first `plies` plies."""
+        self._put(f"cut {plies}\n")
+
+    def compact(self):
+        """Archives and removes the journal on disk, in the background."""
+        if self.path is None: return
+        self._start()
+        self.records.put(('compact', None))
+
+    def _put(self, line):
+        if self.path is None or self.header is None: return
+        self._start()
+        if not self.open:
+            self.records.put(('rotate', f"{MAGIC} {json.dumps(self.header)}\n"))
+            self.open = True
+        self.records.put(('line', line))
+
+    def _start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+            self.thread.start()
+
+    def close(self, timeout=2.0):
+        """Flushes everything queued so far; called before the process exits."""
+        if self.thread is None: return
+        done = threading.Event()
+        self.records.put(('flush', done))
+        done.wait(timeout)
+
+    # --- WRITER THREAD ---
+    def _writer_loop(self):
+        f = None
+        while True:
+            batch = [self.records.get()]
+            deadline = time.perf_counter() + self.sync_interval
+            # Group commit: whatever arrives within the sync window shares one fsync
+            while batch[-1][0] == 'line':
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0: break
+                try:
+                    batch.append(self.records.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            flushed = [payload for kind, payload in batch if kind == 'flush']
+            try:
+                for kind, payload in batch:
+                    if kind in ('rotate', 'compact'):
+                        if f: f.close()
+                        f = None
+                        try:
+                            compact_journal(self.path, self.archive_path)
+                        except Exception as e:  # The old game misses the archive; the new one is still journaled
+                            print(f"Journal compaction failed: {e!r}")
+                        if kind == 'rotate':
+                            f = open(self.path, 'w', encoding='utf-8')
+                            f.write(payload)
+                    elif kind == 'line':
+                        if f is None: f = open(self.path, 'a', encoding='utf-8')
+                        f.write(payload)
+                if f:
+                    f.flush()
+                    os.fsync(f.fileno())
+            except Exception as e:  # This batch is lost, but the thread lives on to write the next ones
+                print(f"Journal write failed: {e!r}")
+                broken, f = f, None
+                if broken:
+                    with contextlib.suppress(OSError): broken.close()
+            finally:
+                for done in flushed: done.set()
@@ -1,6 +1,8 @@
 import pygame
 import random
 import copy
+import re
+from collections import OrderedDict
 from settings import *
 from pieces import Piece
 from ai import DuckAI
@@ -8,9 +10,33 @@ from ai import DuckAI
 
 class GameLogicMixin:
     """Handles Game Rules, Move Generation, and AI Integration"""
+    derived_cache_size = DERIVED_CACHE_SIZE  # Hosts holding many games (game_server.py) lower this per instance
 
     def init_ai(self):
+        self.notice = None  # (text, ticks) shown in the HUD for ENGINE_NOTICE_MS
+        if AI_ENGINE == 'mcts':
+            from mcts import MCTSEngine
+            self.ai = MCTSEngine(game=self)
+        elif AI_ENGINE == 'external':
+            from engine_protocol import RemoteEngine, EngineError
+            try:
+                self.ai = RemoteEngine(game=self)
+            except (EngineError, OSError) as e:
+                self.ai = None
+                self.engine_failed(e)
+        else:
+            self.ai = DuckAI(depth=2)
+
+    def engine_failed(self, error):
+        """An engine process failed: the built-in AI plays on instead of the side losing the game."""
+        if hasattr(self.ai, 'close'): self.ai.close()
         self.ai = DuckAI(depth=2)
+        self.notice = ("Engine failed - the built-in AI plays on", pygame.time.get_ticks())
+        print(f"Engine failed: {error}")
+
+    def current_notice(self):
+        notice = getattr(self, 'notice', None)
+        return notice[0] if notice and pygame.time.get_ticks() - notice[1] < ENGINE_NOTICE_MS else None
 
     def init_board(self):
         setup = [(ROOK, 0, 0), (KNIGHT, 0, 1), (BISHOP, 0, 2), (QUEEN, 0, 3), (KING, 0, 4), (BISHOP, 0, 5),
@@ -35,6 +61,65 @@ class GameLogicMixin:
                 if p: score += PIECE_VALUES[p.type] * (1 if p.color == 'w' else -1)
         return score
 
+    # --- DERIVED-STATE CACHE (computed once per position, shared by UI, rules, notation and AI) ---
+    def position_key(self, board=None, duck_pos=None):
+        """Pieces, duck, side to move, en passant and castling rights: everything the derived facts depend on."""
+        if board is None: board = self.board
+        if duck_pos is None: duck_pos = self.duck_pos
+        codes = tuple([p.color + p.type if p else None for row in board for p in row])
+        rights = tuple([bool(p and not p.has_moved)
+                        for p in (board[7][4], board[7][0], board[7][7], board[0][4], board[0][0], board[0][7])])
+        return codes, duck_pos, self.turn, self.en_passant_target, rights
+
+    def derived_state(self, board=None, duck_pos=None):
+        """Dict of lazily filled facts about a position ('moves', 'any_move', 'check', 'material'), kept in an LRU."""
+        cache = getattr(self, 'derived_cache', None)
+        if cache is None: cache = self.derived_cache = OrderedDict()
+        key = self.position_key(board, duck_pos)
+        info = cache.get(key)
+        if info is None:
+            info = cache[key] = {}
+            if len(cache) > self.derived_cache_size: cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return info
+
+    def legal_move_map(self):
+        """{square: destinations} for every piece of the side to move in the live position."""
+        info = self.derived_state()
+        if 'moves' not in info:
+            moves = {}
+            for r in range(8):
+                for c in range(8):
+                    p = self.board[r][c]
+                    if p and p.color == self.turn:
+                        dests = self.get_piece_legal_moves(r, c)
+                        if dests: moves[(r, c)] = dests
+            info['moves'] = moves
+        return info['moves']
+
+    def has_legal_move(self):
+        """Whether the side to move can move at all; stops at the first legal move unless the full map is known."""
+        info = self.derived_state()
+        if 'moves' in info: return bool(info['moves'])
+        if 'any_move' not in info:
+            info['any_move'] = any(p and p.color == self.turn and self.get_piece_legal_moves(r, c)
+                                   for r, row in enumerate(self.board) for c, p in enumerate(row))
+        return info['any_move']
+
+    def check_status(self, color, board=None, duck_pos=None):
+        info = self.derived_state(board, duck_pos)
+        checks = info.setdefault('check', {})
+        if color not in checks:
+            checks[color] = self.is_in_check(color, board, duck_pos)
+        return checks[color]
+
+    def material_score(self, board=None):
+        info = self.derived_state(board)
+        if 'material' not in info:
+            info['material'] = self.calculate_material_score(self.board if board is None else board)
+        return info['material']
+
     # --- STATE HASHING (For 3-Fold Repetition) ---
     def generate_fen_signature(self):
         """Generates a unique string representing the current board state + duck + turn."""
@@ -50,6 +135,104 @@ class GameLogicMixin:
         # We must include the Duck, En Passant, and Turn in the hash
         return f"{board_str}|{self.duck_pos}|{self.turn}|{self.en_passant_target}"
 
+    # --- DUCK FEN (Standard FEN with the Duck written as '*' on the board) ---
+    def generate_fen(self):
+        """Describes the position at the start of a ply (move_piece phase)."""
+        rows = []
+        for r in range(8):
+            row, empty = "", 0
+            for c in range(8):
+                p = self.board[r][c]
+                if not p and (r, c) != self.duck_pos:
+                    empty += 1
+                    continue
+                if empty: row, empty = row + str(empty), 0
+                row += '*' if not p else (p.type if p.color == 'w' else p.type.lower())
+            rows.append(row + (str(empty) if empty else ""))
+
+        castling = ""
+        for color, r, flags in (('w', 7, "KQ"), ('b', 0, "kq")):
+            king = self.board[r][4]
+            if not king or king.type != KING or king.color != color or king.has_moved: continue
+            for rc, flag in ((7, flags[0]), (0, flags[1])):
+                rook = self.board[r][rc]
+                if rook and rook.type == ROOK and rook.color == color and not rook.has_moved: castling += flag
+        ep = self.get_notation_coords(*self.en_passant_target) if self.en_passant_target else "-"
+        return f"{'/'.join(rows)} {self.turn} {castling or '-'} {ep} {self.half_move_clock} {self.turn_number}"
+
+    def load_fen(self, fen):
+        """Sets up the board from a Duck FEN. Raises ValueError on malformed input."""
+        fields = fen.split()
+        if not 2 <= len(fields) <= 6: raise ValueError(f"Invalid FEN: {fen!r}")
+        placement, turn = fields[0], fields[1]
+        castling = fields[2] if len(fields) > 2 else "-"
+        ep = fields[3] if len(fields) > 3 else "-"
+        ranks = placement.split('/')
+        if len(ranks) != 8: raise ValueError(f"Invalid FEN placement: {placement!r}")
+        if turn not in ('w', 'b'): raise ValueError(f"Invalid FEN side to move: {turn!r}")
+        if castling != "-" and not re.fullmatch(r"K?Q?k?q?", castling):
+            raise ValueError(f"Invalid FEN castling: {castling!r}")
+        ep_rank = '6' if turn == 'w' else '3'  # The square the pawn that just double-stepped skipped
+        if ep != "-" and not (len(ep) == 2 and ep[0] in "abcdefgh" and ep[1] == ep_rank):
+            raise ValueError(f"Invalid FEN en passant square: {ep!r}")
+        try:
+            half_move_clock = int(fields[4]) if len(fields) > 4 else 0
+            turn_number = int(fields[5]) if len(fields) > 5 else 1
+        except ValueError:
+            raise ValueError(f"Invalid FEN move counters: {fen!r}") from None
+        if half_move_clock < 0 or turn_number < 1: raise ValueError(f"Invalid FEN move counters: {fen!r}")
+
+        board = [[None] * 8 for _ in range(8)]
+        duck = (-1, -1)
+        for r, rank in enumerate(ranks):
+            c = 0
+            for ch in rank:
+                if ch in "12345678":
+                    c += int(ch)
+                    continue
+                if c >= 8: raise ValueError(f"Invalid FEN rank: {rank!r}")
+                if ch == '*':
+                    if duck != (-1, -1): raise ValueError(f"Invalid FEN: more than one duck in {placement!r}")
+                    duck = (r, c)
+                elif ch.upper() in PIECE_VALUES:
+                    if ch in "Pp" and r in (0, 7): raise ValueError(f"Invalid FEN: pawn on a back rank in {rank!r}")
+                    board[r][c] = Piece('w' if ch.isupper() else 'b', ch.upper())
+                    board[r][c].has_moved = True
+                else:
+                    raise ValueError(f"Invalid FEN piece: {ch!r}")
+                c += 1
+            if c != 8: raise ValueError(f"Invalid FEN rank: {rank!r}")
+        for color in ('w', 'b'):
+            kings = sum(1 for row in board for p in row if p and p.type == KING and p.color == color)
+            if kings != 1: raise ValueError(f"Invalid FEN: {kings} {color} kings in {placement!r}")
+
+        # Castling rights are stored as has_moved flags on the King and Rooks
+        for flag, (r, rc) in (('K', (7, 7)), ('Q', (7, 0)), ('k', (0, 7)), ('q', (0, 0))):
+            if flag not in castling: continue
+            color = 'w' if flag.isupper() else 'b'
+            king, rook = board[r][4], board[r][rc]
+            if not (king and king.type == KING and king.color == color and rook and rook.type == ROOK
+                    and rook.color == color):
+                raise ValueError(f"Invalid FEN castling: {flag!r} without its King and Rook at home")
+            king.has_moved = False
+            rook.has_moved = False
+
+        self.board = board
+        self.duck_pos = duck
+        self.prev_duck_pos = duck
+        self.turn = turn
+        self.en_passant_target = None if ep == "-" else ("87654321".index(ep[1]), "abcdefgh".index(ep[0]))
+        self.half_move_clock = half_move_clock
+        self.turn_number = turn_number
+        self.phase = 'move_piece'
+        self.game_over = False
+        self.winner = None
+        self.promotion_pending = False
+        self.promotion_coords = None
+        self.last_move_arrow = None
+        self.current_move_str = ""
+        self.start_fen = fen
+
     # --- MOVE GENERATION ---
     def get_piece_legal_moves(self, r, c):
         p = self.board[r][c]
@@ -138,9 +321,42 @@ class GameLogicMixin:
             if self.board[r][cl] or (r, cl) == self.duck_pos: return False
         return True
 
-    def is_in_check(self, color, board_state=None):
+    def get_all_legal_moves(self, color):
+        """Every (start, end) piece move available to `color` in the live position."""
+        if color == self.turn:
+            return [(start, dest) for start, dests in self.legal_move_map().items() for dest in dests]
+        moves = []
+        for r in range(8):
+            for c in range(8):
+                p = self.board[r][c]
+                if p and p.color == color:
+                    for dest in self.get_piece_legal_moves(r, c):
+                        moves.append(((r, c), dest))
+        return moves
+
+    def get_duck_squares_after(self, start, end):
+        """Squares the duck may land on once the piece move start -> end has been played."""
+        sr, sc = start
+        er, ec = end
+        p = self.board[sr][sc]
+        freed, filled = {start}, {end}
+        if p.type == PAWN and sc != ec and not self.board[er][ec]:
+            freed.add((sr, ec))  # En Passant victim
+        if p.type == KING and abs(sc - ec) == 2:
+            rc, nrc = (7, 5) if ec > sc else (0, 3)
+            freed.add((sr, rc))
+            filled.add((sr, nrc))
+        squares = []
+        for r in range(8):
+            for c in range(8):
+                if (r, c) in filled or (r, c) == self.duck_pos: continue
+                if not self.board[r][c] or (r, c) in freed: squares.append((r, c))
+        return squares
+
+    def is_in_check(self, color, board_state=None, duck_pos=None):
         """Checks if the King is under attack. Note: In Duck Chess, check is valid but not game-ending."""
         if board_state is None: board_state = self.board
+        if duck_pos is None: duck_pos = self.duck_pos
         king_pos = None
         for r in range(8):
             for c in range(8):
@@ -167,7 +383,7 @@ class GameLogicMixin:
             for i in range(1, 8):
                 nr, nc = kr + dr * i, kc + dc * i
                 if not (0 <= nr < 8 and 0 <= nc < 8): break
-                if (nr, nc) == self.duck_pos: break  # Duck blocks checks!
+                if (nr, nc) == duck_pos: break  # Duck blocks checks!
                 p = board_state[nr][nc]
                 if p:
                     if p.color == enemy:
@@ -203,7 +419,10 @@ class GameLogicMixin:
                 if (r, c) == start: continue
                 p = self.board[r][c]
                 if p and p.type == piece.type and p.color == piece.color:
-                    moves = self.get_piece_legal_moves(r, c)
+                    if piece.color == self.turn:
+                        moves = self.legal_move_map().get((r, c), [])
+                    else:
+                        moves = self.get_piece_legal_moves(r, c)
                     if end in moves: duplicates.append((r, c))
         if not duplicates: return ""
         files_differ = True
@@ -307,7 +526,7 @@ class GameLogicMixin:
                 # -----------------------------------------------------
 
                 if is_ai_turn:
-                    p.type = random.choice([QUEEN, ROOK, BISHOP, KNIGHT])
+                    p.type = self.ai_promotion()
                     self.current_move_str += f"={p.type}"
                     if hasattr(self, 'play_sound'): self.play_sound('promote')
                     self.prev_duck_pos = self.duck_pos
@@ -320,6 +539,12 @@ class GameLogicMixin:
                 self.prev_duck_pos = self.duck_pos
                 self.phase = 'move_duck'
 
+    def ai_promotion(self):
+        """The piece the AI promotes to: the one a search engine named (its search assumes a Queen otherwise)."""
+        ai = getattr(self, 'ai', None)
+        if hasattr(ai, 'search'): return getattr(ai, 'planned_promotion', None) or QUEEN
+        return random.choice([QUEEN, ROOK, BISHOP, KNIGHT])
+
     def promote_pawn(self, type_char):
         r, c = self.promotion_coords
         self.board[r][c].type = type_char
@@ -374,7 +599,7 @@ class GameLogicMixin:
         if self.half_move_clock >= 100:
             self.game_over = True
             self.winner = 'draw'
-            print("Game Over: 50-Move Rule")
+            self.announce_game_end("50-Move Rule")
             return
 
         # 2. 3-Fold Repetition
@@ -384,45 +609,58 @@ class GameLogicMixin:
         if self.rep_history[signature] >= 3:
             self.game_over = True
             self.winner = 'draw'
-            print("Game Over: 3-Fold Repetition")
+            self.announce_game_end("3-Fold Repetition")
             return
 
         # 3. Stalemate Logic (Player has no legal moves -> LOSS)
-        has_moves = False
-        for r in range(8):
-            for c in range(8):
-                p = self.board[r][c]
-                if p and p.color == self.turn:
-                    if self.get_piece_legal_moves(r, c):
-                        has_moves = True
-                        break
-            if has_moves: break
-
-        if not has_moves:
+        if not self.has_legal_move():
             self.game_over = True
             # Winner is the person who JUST moved (the previous turn)
             self.winner = 'b' if self.turn == 'w' else 'w'
-            print(f"Game Over: Stalemate (Win for {self.winner.upper()})")
+            self.announce_game_end(f"Stalemate (Win for {self.winner.upper()})")
+
+    def announce_game_end(self, reason):
+        print(f"Game Over: {reason}")
+
+    def ai_time_budget(self):
+        """(soft, hard) ms for the AI's next search, or None when untimed. Hosts with clocks override this."""
+        return None
 
     def ai_turn(self):
         if self.view_index != len(self.history) - 1: return
         if self.game_over: return
         if not self.waiting_for_ai: return
-        if pygame.time.get_ticks() - self.ai_wait_start < 400: return
+        budget = self.ai_time_budget()
+        # The pause that lets an AI move be followed would cost clock time, so timed games skip it
+        if budget is None and pygame.time.get_ticks() - self.ai_wait_start < AI_MOVE_DELAY_MS: return
 
         if self.phase == 'move_piece':
-            move = self.ai.get_piece_move(self.board, self.turn, self.get_piece_legal_moves)
-            if move:
+            if hasattr(self.ai, 'time_budget'): self.ai.time_budget = budget  # Engines that search against a clock
+            moves = self.legal_move_map()
+            try:
+                move = self.ai.get_piece_move(self.board, self.turn, lambda r, c: moves.get((r, c), []))
+            except RuntimeError as e:  # EngineError: the engine process died or stopped answering
+                self.engine_failed(e)
+                return
+            if move and move[1] in moves.get(move[0], []):
                 self.execute_move(move[0], move[1], animated=True)
             else:
-                # This should technically be caught by check_game_end_conditions,
-                # but we keep it as a fallback.
-                self.game_over = True
-                self.winner = 'b' if self.turn == 'w' else 'w'
+                # No move should technically be caught by check_game_end_conditions,
+                # but we keep it as a fallback. An illegal move from the engine forfeits.
+                self.ai_forfeit("an illegal move" if move else "no move")
 
         elif self.phase == 'move_duck':
             target = self.ai.get_duck_move(self.board, self.duck_pos, self.prev_duck_pos)
-            if target: self.place_duck(target, animated=True)
+            if target and (self.board[target[0]][target[1]] or target == self.prev_duck_pos):
+                self.ai_forfeit("an illegal duck square")
+            elif target:
+                self.place_duck(target, animated=True)
+
+    def ai_forfeit(self, what):
+        self.game_over = True
+        self.winner = 'b' if self.turn == 'w' else 'w'
+        self.waiting_for_ai = False
+        self.announce_game_end(f"{'White' if self.turn == 'w' else 'Black'} AI forfeits with {what}")
 
     def clear_board(self):
         """Removes all pieces from the board."""
@@ -430,7 +668,7 @@ class GameLogicMixin:
         self.duck_pos = (-1, -1)
         self.turn = 'w'
         self.move_log = []
-        self.history = []
+        self.history.clear()
 
     def set_piece(self, r, c, piece_type, color):
         """Manually places a piece."""
@@ -442,9 +680,10 @@ class GameLogicMixin:
             self.board[r][c] = Piece(color, piece_type)
 
     def validate_editor_board(self):
-        """Ensures the custom board is playable (Kings exist)."""
+        """Ensures the custom board is playable (one King each, no pawn on a back rank), as load_fen requires."""
         w_king = sum(1 for r in range(8) for c in range(8) if
                      self.board[r][c] and self.board[r][c].type == KING and self.board[r][c].color == 'w')
         b_king = sum(1 for r in range(8) for c in range(8) if
                      self.board[r][c] and self.board[r][c].type == KING and self.board[r][c].color == 'b')
-        return w_king == 1 and b_king == 1
\ No newline at end of file
+        back_pawn = any(p and p.type == PAWN for r in (0, 7) for p in self.board[r])
+        return w_king == 1 and b_king == 1 and not back_pawn
\ No newline at end of file
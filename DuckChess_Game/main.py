@@ -1,19 +1,34 @@
 import pygame
+import os
 import sys
-import copy
+import time
 import asyncio
+from collections import OrderedDict
+from contextlib import contextmanager
 from settings import *
 from logic import GameLogicMixin
 from rendering import RenderingMixin
 from pieces import Piece
+from game_history import GameHistory
+from analysis_tree import AnalysisTree
+from headless import HeadlessGame, last_ply_action
+from journal import GameJournal, read_journal, replay_journal
+from clock import ChessClock, TimeManager
+from analysis import BackgroundAnalysis
 
 
 class DuckChess(GameLogicMixin, RenderingMixin):
-    def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((DEFAULT_WIDTH, DEFAULT_HEIGHT), pygame.RESIZABLE)
-        pygame.display.set_caption("Duck Chess")
+    def __init__(self, profile_startup=False, autosave=True, time_control=TIME_CONTROL):
+        # Startup profile mode (--profile-startup): {step: ms}, printed after the first frame
+        self.startup_profile = {} if profile_startup else None
+        self.startup_t0 = time.perf_counter()
+
+        with self.profiled('display'):
+            pygame.init()
+            self.screen = pygame.display.set_mode((DEFAULT_WIDTH, DEFAULT_HEIGHT), pygame.RESIZABLE)
+            pygame.display.set_caption("Duck Chess")
         self.clock = pygame.time.Clock()
+        self.frame_dt = 0
 
         self.game_mode = None
         self.player_side = 'w'
@@ -48,18 +63,38 @@ class DuckChess(GameLogicMixin, RenderingMixin):
         self.editor_turn_btn = pygame.Rect(0, 0, 0, 0)
 
         # Assets
-        self.original_images = {}
+        self.atlas = None
+        self.atlas_rects = {}
+        self.sprite_sets = OrderedDict()  # square size -> {key: sprite}
         self.scaled_images = {}
         self.sounds = {}
-        self.load_assets()
+        with self.profiled('load_assets'):
+            self.load_assets()
+
+        # Font and text caches outlive resizes; resize events are debounced
+        self.font_paths = {}
+        self.fonts = OrderedDict()
+        self.text_cache = OrderedDict()
+        self.pending_resize = None
+        self.resize_due = 0
 
         # State Variables
         self.move_log = []
         self.current_move_str = ""
         self.turn_number = 1
-        self.history = []
+        self.history = GameHistory()
         self.view_index = -1
 
+        # Autosave journal (journal.py); an unfinished game from the last session is resumed below
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        self.journal = GameJournal(os.path.join(base_path, JOURNAL_PATH) if autosave and JOURNAL_PATH else None,
+                                   os.path.join(base_path, JOURNAL_ARCHIVE) if JOURNAL_ARCHIVE else None)
+        self.ply_started = 0
+
+        # Chess clock, restarted with every game (see clock.py for the time-control format)
+        self.time_control = time_control
+        self.game_clock = ChessClock()
+
         # Drag & Drop State
         self.dragging = False
         self.drag_piece = None
@@ -73,19 +108,203 @@ class DuckChess(GameLogicMixin, RenderingMixin):
         self.target_eval_score = 0
         self.current_eval_score = 0.0
 
-        self.resize_layout(DEFAULT_WIDTH, DEFAULT_HEIGHT)
+        # Active move tweens, advanced by the main loop
+        self.animations = []
+
+        # Dirty-Rectangle Rendering
+        self.frame_states = None
+        self.force_redraw = True
+        self.drawn_state = None
+
+        # Opening Explorer (needs an index built with position_index.py)
+        self.explorer = None
+        if EXPLORER_INDEX_DIR and os.path.isdir(EXPLORER_INDEX_DIR):
+            from position_index import PositionIndex
+            self.explorer = PositionIndex(EXPLORER_INDEX_DIR)
+        self.show_explorer = self.explorer is not None
+        self.explorer_cache = (None, [])
+
+        # Background Analysis (A key): worker process started on first use, see analysis.py
+        self.analysis = None
+        self.show_analysis = False
+        self.analysis_view = (None, None)  # (tree node, Duck FEN) of the position last handed to it
+
+        # Move List (rows rendered once per ply, see sync_history_cells)
+        self.history_cells = []
+        self.history_cells_log = None
+        self.history_scroll = 0
+        self.history_followed = None
+
+        with self.profiled('layout'):
+            self.resize_layout(DEFAULT_WIDTH, DEFAULT_HEIGHT)
         self.reset_game_state()
+        with self.profiled('resume'):
+            self.resume_journal()
+
+    @contextmanager
+    def profiled(self, step):
+        """Times a startup step in profile mode. Only the first run of each step is recorded."""
+        t0 = time.perf_counter()
+        yield
+        if self.startup_profile is not None and step not in self.startup_profile:
+            self.startup_profile[step] = 1000 * (time.perf_counter() - t0)
+
+    def report_startup_profile(self):
+        print("Startup profile (ms):")
+        for step, ms in self.startup_profile.items():
+            print(f"  {step:<12}{ms:8.1f}")
+        print(f"  {'total':<12}{1000 * (time.perf_counter() - self.startup_t0):8.1f}")
+        self.startup_profile = None
 
     def save_snapshot(self):
-        self.history.append({
-            'board': copy.deepcopy(self.board),
-            'duck_pos': self.duck_pos,
-            'prev_duck': self.prev_duck_pos,
-            'last_move': self.last_move_arrow,
-            'captured': copy.deepcopy(self.captured),
-            'log': list(self.move_log)
-        })
+        # self.line[i] is the tree node of history[i]; a fresh history starts a fresh tree
+        if not len(self.history):
+            self.tree = AnalysisTree()
+            self.line = [self.tree.root]
+            self.game_clock = ChessClock.parse(self.time_control)
+            self.journal.begin({'fen': self.start_fen, 'mode': self.game_mode, 'side': self.player_side,
+                                'clock': self.game_clock.spec})
+        else:
+            end = self.last_move_arrow[1]
+            piece = self.board[end[0]][end[1]]
+            node = self.tree.add(self.line[-1], last_ply_action(self), piece.type, self.move_log[-1])
+            self.line.append(node)
+            node.spent = self.thinking_ms()
+            self.game_clock.charge(piece.color, node.spent)
+            self.journal.append(node.action, node.promotion, node.spent)
+        self.history.append(self.board, self.duck_pos, self.turn, self.prev_duck_pos, self.last_move_arrow)
         self.view_index = len(self.history) - 1
+        self.ply_started = pygame.time.get_ticks()
+
+    def resume_journal(self):
+        """Continues the previous session's game if its journal is unfinished; a finished one is archived."""
+        if self.journal.path is None: return
+        header, plies = read_journal(self.journal.path)
+        if not plies: return
+        try:
+            over = replay_journal(header, plies).game_over
+        except ValueError:
+            over = True
+        if over:
+            self.journal.compact()
+            return
+
+        self.game_mode, self.player_side = header.get('mode') or 'pvp', header.get('side', 'w')
+        self.start_fen = header.get('fen')
+        self.game_clock = ChessClock.parse(header.get('clock'))
+        line = [self.tree.root]
+        for action, promotion, spent in plies:
+            line.append(self.tree.add(line[-1], action, promotion, ""))
+            line[-1].spent = spent
+        self.load_line(line, journal=False)
+        self.journal.attach(header)
+        self.ply_started = pygame.time.get_ticks()  # Time while the program was closed is not charged
+        self.state = 'game'
+
+    # --- CLOCKS ---
+    def thinking_ms(self):
+        """How long the side to move has been on the current ply."""
+        return pygame.time.get_ticks() - self.ply_started
+
+    def time_left(self, color):
+        """ms on color's clock right now, or None in an untimed game."""
+        return self.game_clock.time_left(color, self.thinking_ms() if color == self.turn else 0)
+
+    def update_clock(self):
+        """Ends the game when the side to move runs out of time."""
+        if self.game_over or not self.game_clock.timed or self.time_left(self.turn) > 0: return
+        self.game_over = True
+        self.winner = 'b' if self.turn == 'w' else 'w'
+        self.waiting_for_ai = False
+        self.announce_game_end(f"{'White' if self.turn == 'w' else 'Black'} lost on time")
+
+    def ai_time_budget(self):
+        left = self.time_left(self.turn)
+        if left is None: return None
+        choices = sum(map(len, self.legal_move_map().values())) if self.phase == 'move_piece' else 1
+        # DuckAI answers at once and has no TimeManager; its budget only tells ai_turn the game is timed
+        manager = getattr(self.ai, 'time_manager', None) or TimeManager()
+        return manager.budget(left, self.game_clock.increment, self.game_clock.move_limit, self.turn_number, choices)
+
+    # --- BACKGROUND ANALYSIS ---
+    def analysis_fen(self):
+        """Duck FEN of the viewed ply boundary (live or past), worked out once per viewed position."""
+        node = self.line[self.view_index]
+        if self.analysis_view[0] is not node:
+            if node is self.line[-1] and self.phase == 'move_piece' and not self.promotion_pending:
+                fen = self.generate_fen()
+            else:
+                game = HeadlessGame.from_fen(self.start_fen) if self.start_fen else HeadlessGame()
+                for step in self.tree.path(node)[1:]: game.apply_action(step.action, step.promotion)
+                fen = game.generate_fen()
+            self.analysis_view = (node, fen)
+        return self.analysis_view[1]
+
+    def update_analysis(self):
+        if not self.show_analysis: return
+        if self.game_over and self.view_index == len(self.history) - 1:
+            self.analysis.stop()
+        else:
+            self.analysis.follow(self.analysis_fen())
+        self.analysis.poll()
+
+    def idle_timeout(self):
+        """ms an idle frame may sleep: until the running clock's display next changes, at most IDLE_WAIT_MS."""
+        if self.show_analysis and self.analysis.searching: return ANALYSIS_POLL_MS
+        if self.state != 'game' or self.game_over or not self.game_clock.timed: return IDLE_WAIT_MS
+        left = max(0, self.time_left(self.turn))
+        step = 100 if left < 10000 else 1000  # Tenths are shown under ten seconds
+        return max(1, min(IDLE_WAIT_MS, int(left % step) + 1))
+
+    # --- VARIATIONS ---
+    def load_line(self, line, view_index=None, journal=True):
+        """Makes `line` (tree nodes from the root) the current game by replaying it headlessly, clock included."""
+        game = HeadlessGame.from_fen(self.start_fen) if self.start_fen else HeadlessGame()
+        history = GameHistory()
+        history.append(game.board, game.duck_pos, game.turn, game.prev_duck_pos, game.last_move_arrow)
+        clock = ChessClock.parse(self.game_clock.spec)
+        for node in line[1:]:
+            clock.charge(game.turn, node.spent)
+            game.apply_action(node.action, node.promotion)
+            if not node.label: node.label = game.move_log[-1]
+            history.append(game.board, game.duck_pos, game.turn, game.prev_duck_pos, game.last_move_arrow)
+
+        if journal:
+            # Journal the switch as a rewind to the shared prefix plus the plies after it
+            keep = 0
+            while keep < min(len(line), len(self.line)) and line[keep] is self.line[keep]: keep += 1
+            if keep < len(self.line): self.journal.cut(keep - 1)
+            for node in line[keep:]: self.journal.append(node.action, node.promotion, node.spent)
+
+        game.copy_state_to(self)
+        self.history, self.line, self.game_clock = history, list(line), clock
+        self.view_index = len(history) - 1 if view_index is None else view_index
+        self.selected_square, self.valid_moves, self.animations = None, [], []
+        self.waiting_for_ai = not self.game_over and self.is_ai_turn(self.turn)
+        self.ai_wait_start = pygame.time.get_ticks()
+
+    def is_ai_turn(self, color):
+        return (self.game_mode == 'white_ai' and color == 'b') or (self.game_mode == 'black_ai' and color == 'w')
+
+    def switch_variation(self, step):
+        """Cycles the viewed ply through its sibling variations (the rest of the line follows each one's main line)."""
+        node = self.line[self.view_index]
+        siblings = self.tree.siblings(node)
+        if len(siblings) < 2: return
+        other = siblings[(siblings.index(node) + step) % len(siblings)]
+        self.load_line(self.tree.line_through(other), self.view_index)
+
+    def remove_variation(self):
+        node = self.line[self.view_index]
+        if node.parent is None: return
+        self.tree.remove(node)
+        self.load_line(self.tree.line_through(node.parent), self.view_index - 1)
+
+    def variation_label(self):
+        """'var 2/3' when the viewed ply has alternatives, else ''."""
+        siblings = self.tree.siblings(self.line[self.view_index])
+        if len(siblings) < 2: return ""
+        return f"var {siblings.index(self.line[self.view_index]) + 1}/{len(siblings)}"
 
     def reset_game_state(self):
         # 1. Initialize Variables FIRST (Prevents AttributeErrors)
@@ -100,13 +319,17 @@ class DuckChess(GameLogicMixin, RenderingMixin):
         self.en_passant_target = None
         self.half_move_clock = 0
         self.rep_history = {}
+        self.start_fen = None
 
         self.move_log = []
         self.last_move_arrow = None
         self.turn_number = 1
         self.current_move_str = ""
-        self.history = []
+        self.history = GameHistory()
         self.view_index = -1
+        self.animations = []
+        self.history_scroll = 0
+        self.history_followed = None
 
         self.captured = {'w': [], 'b': []}
         self.promotion_pending = False
@@ -139,6 +362,8 @@ class DuckChess(GameLogicMixin, RenderingMixin):
         if self.nav_btns['next'].collidepoint(pos): self.view_index = min(len(self.history) - 1,
                                                                           self.view_index + 1); return
         if self.nav_btns['end'].collidepoint(pos): self.view_index = len(self.history) - 1; return
+        ply = self.history_ply_at(pos)
+        if ply is not None: self.view_index = min(len(self.history) - 1, ply + 1); return
 
         # Control Buttons
         if self.restart_btn_rect.collidepoint(pos):
@@ -153,12 +378,18 @@ class DuckChess(GameLogicMixin, RenderingMixin):
             self.player_side = 'b' if self.player_side == 'w' else 'w';
             return
 
-        is_live = (self.view_index == len(self.history) - 1)
-        if not is_live or self.game_over or self.waiting_for_ai: return
-
         r, c = self.get_board_pos(pos[0], pos[1])
         if r == -1: return
 
+        # Taking a piece of the side to move in a past position continues play from there as a variation
+        if self.view_index != len(self.history) - 1:
+            snap = self.history[self.view_index]
+            piece = snap['board'][r][c]
+            if not piece or piece.color != snap['turn'] or self.is_ai_turn(piece.color): return
+            self.load_line(self.line[:self.view_index + 1])
+
+        if self.game_over or self.waiting_for_ai: return
+
         if self.phase == 'move_piece':
             piece = self.board[r][c]
 
@@ -169,7 +400,7 @@ class DuckChess(GameLogicMixin, RenderingMixin):
                 px, py = self.get_screen_pos(r, c)
                 self.drag_offset = (pos[0] - px, pos[1] - py)
                 self.selected_square = (r, c)
-                self.valid_moves = self.get_piece_legal_moves(r, c)
+                self.valid_moves = self.legal_move_map().get((r, c), [])
 
             elif self.selected_square and (r, c) in self.valid_moves:
                 self.execute_move(self.selected_square, (r, c))
@@ -221,6 +452,19 @@ class DuckChess(GameLogicMixin, RenderingMixin):
             self.view_index = max(0, self.view_index - 1)
         elif event.key == pygame.K_RIGHT:
             self.view_index = min(len(self.history) - 1, self.view_index + 1)
+        elif event.key == pygame.K_e and self.explorer:
+            self.show_explorer = not self.show_explorer
+        elif event.key == pygame.K_a:
+            self.show_analysis = not self.show_analysis
+            if self.analysis is None: self.analysis = BackgroundAnalysis()
+            if not self.show_analysis: self.analysis.stop()
+            self.analysis_view = (None, None)
+        elif event.key in (pygame.K_UP, pygame.K_DOWN):
+            self.switch_variation(-1 if event.key == pygame.K_UP else 1)
+        elif event.key == pygame.K_p:
+            self.tree.promote(self.line[self.view_index])
+        elif event.key == pygame.K_DELETE:
+            self.remove_variation()
 
     def handle_editor_input(self, event):
         mx, my = pygame.mouse.get_pos()
@@ -237,6 +481,7 @@ class DuckChess(GameLogicMixin, RenderingMixin):
                     self.state = 'game'
                     self.game_mode = 'pvp'
                     self.phase = 'move_piece'
+                    self.start_fen = self.generate_fen()
                     self.save_snapshot()
                     return
 
@@ -306,17 +551,54 @@ class DuckChess(GameLogicMixin, RenderingMixin):
                 self.dragging = False
                 self.drag_piece = None
 
-    # --- ASYNC MAIN LOOP ---
+    # --- FRAME SCHEDULING ---
+    def is_busy(self):
+        """True while the screen changes without input: tweens, drags, eval-bar easing or a pending AI move."""
+        if self.force_redraw or self.dragging or self.pending_resize: return True
+        if self.state != 'game': return False
+        return bool(self.animations or self.current_eval_score != self.target_eval_score
+                    or (self.waiting_for_ai and not self.game_over))
+
+    async def wait_for_events(self):
+        """Ticks at FPS while busy. When idle, sleeps until input arrives instead of polling 60 times a second."""
+        if self.is_busy():
+            self.frame_dt = self.clock.tick(FPS)
+            await asyncio.sleep(0)
+            return pygame.event.get()
+
+        if len(asyncio.all_tasks()) > 1:
+            # Other coroutines share the loop, so wait on asyncio rather than blocking in SDL
+            waited, timeout = 0, self.idle_timeout()
+            while not pygame.event.peek() and waited < timeout:
+                await asyncio.sleep(IDLE_POLL_MS / 1000)
+                waited += IDLE_POLL_MS
+            events = pygame.event.get()
+        else:
+            event = pygame.event.wait(self.idle_timeout())
+            events = ([] if event.type == pygame.NOEVENT else [event]) + pygame.event.get()
+            await asyncio.sleep(0)
+
+        # Time spent asleep is not animation time
+        self.clock.tick()
+        self.frame_dt = 0
+        return events
+
     async def run(self):
         while True:
-            # 1. EVENT HANDLING
-            for event in pygame.event.get():
+            # 1. EVENT HANDLING (blocks while idle)
+            events = await self.wait_for_events()
+            frame_t0 = time.perf_counter()
+            had_events = bool(events)
+            for event in events:
                 if event.type == pygame.QUIT:
+                    self.journal.close()
+                    if self.analysis: self.analysis.close()
+                    if hasattr(self.ai, 'close'): self.ai.close()
                     pygame.quit()
                     sys.exit()
 
                 if event.type == pygame.VIDEORESIZE:
-                    self.resize_layout(event.w, event.h)
+                    self.request_resize(event.w, event.h)
 
                 if self.state == 'menu':
                     pass
@@ -339,22 +621,33 @@ class DuckChess(GameLogicMixin, RenderingMixin):
                     elif event.type == pygame.KEYDOWN:
                         self.handle_keyboard(event)
 
-            # 2. DRAWING & LOGIC
+                    elif event.type == pygame.MOUSEWHEEL:
+                        if pygame.mouse.get_pos()[0] >= self.screen_w - self.panel_width: self.scroll_history(-event.y)
+
+            # 2. DRAWING & LOGIC (only dirty regions are drawn and presented)
+            self.apply_pending_resize()
+            if self.state != self.drawn_state:
+                self.drawn_state = self.state
+                self.invalidate()
+
             if self.state == 'menu':
-                self.draw_menu()
+                self.render_static_frame(self.draw_menu, had_events)
 
             elif self.state == 'edit':
-                self.draw_editor()
+                self.render_static_frame(self.draw_editor, had_events)
 
             else:  # Game Mode
+                self.update_clock()
                 self.ai_turn()
-                self.draw_game()
+                self.update_analysis()
+                self.update_animations(self.frame_dt)
+                self.render_game_frame()
 
-            # 3. REFRESH
-            pygame.display.flip()
-            self.clock.tick(FPS)
-            await asyncio.sleep(0)
+            if self.startup_profile is not None:
+                self.startup_profile['first frame'] = 1000 * (time.perf_counter() - frame_t0)
+                self.report_startup_profile()
 
 
 if __name__ == "__main__":
-    asyncio.run(DuckChess().run())
\ No newline at end of file
+    time_control = sys.argv[sys.argv.index('--clock') + 1] if '--clock' in sys.argv[:-1] else TIME_CONTROL
+    asyncio.run(DuckChess(profile_startup='--profile-startup' in sys.argv, time_control=time_control).run())
\ No newline at end of file
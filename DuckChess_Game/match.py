@@ -0,0 +1,261 @@
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import json
+import math
+import time
+import argparse
+from multiprocessing import Pool
+from settings import *
+from ai import DuckAI
+from headless import HeadlessGame, last_ply_action
+from clock import ChessClock
+
+# Balanced starting points; every opening is played twice with colors swapped
+DEFAULT_OPENINGS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/4*3/PPPP1PPP/RNBQKBNR w KQkq e6 0 2",
+    "rnbqkbnr/ppp1pppp/8/3p4/3P4/3*4/PPP1PPPP/RNBQKBNR w KQkq d6 0 2",
+    "rnbqkb1r/pppppppp/5n2/8/5*2/5N2/PPPPPPPP/RNBQKB1R w KQkq - 2 2",
+    "rnbqkbnr/pppp1ppp/8/4p3/2P5/4*3/PP1PPPPP/RNBQKBNR w KQkq e6 0 2",
+    "rnbqkbnr/pp1ppppp/8/2p5/4P3/2*5/PPPP1PPP/RNBQKBNR w KQkq c6 0 2",
+    "rnbqkb1r/pppppppp/5n2/8/4P3/5*2/PPPP1PPP/RNBQKBNR w KQkq - 1 2",
+    "rnbqkbnr/ppp1pppp/8/3p4/3*4/1P6/P1PPPPPP/RNBQKBNR w KQkq d6 0 2",
+]
+
+
+def build_engine(config):
+    """
+    Engine from a plain dict, e.g. {"engine": "mcts", "move_time": 200, "batch_size": 32}
+    or {"engine": "duck_ai", "depth": 2}. Unknown keys are passed to the engine constructor.
+    """
+    options = dict(config)
+    kind = options.pop('engine', 'duck_ai')
+    options.pop('name', None)
+    if kind == 'mcts':
+        from mcts import MCTSEngine
+        evaluator = options.pop('evaluator', None)
+        if evaluator == 'remote':
+            from inference_server import RemoteEvaluator
+            options['evaluator'] = RemoteEvaluator(options.pop('address', None))
+        return MCTSEngine(**options)
+    if kind == 'duck_ai':
+        return DuckAI(**options)
+    if kind == 'external':
+        from engine_protocol import RemoteEngine
+        return RemoteEngine(**options)  # e.g. {"engine": "external", "command": "./my_engine", "move_time": 200}
+    raise ValueError(f"Unknown engine: {kind!r}")
+
+
+def forfeit(game, loser, reason):
+    """Ends `game` as a loss for `loser` ('w' or 'b'); reason is reported with the result."""
+    game.game_over = True
+    game.winner = 'b' if loser == 'w' else 'w'
+    game.end_reason = reason
+
+
+def play_ply(engine, game, budget=None):
+    """
+    Asks `engine` for one full ply on `game` ((soft, hard) ms budget when timed). Returns the search nodes used.
+    Search engines may be other processes, so their plies are checked; an illegal one forfeits the game.
+    """
+    if hasattr(engine, 'search'):
+        action = engine.search(game, budget=budget)
+        if not action:
+            if not game.game_over: forfeit(game, game.turn, 'no move')
+            return 0
+        try:
+            game.apply_checked_action(action, getattr(engine, 'planned_promotion', None) or QUEEN)
+        except ValueError:
+            forfeit(game, game.turn, 'illegal move')
+        return engine.last_info.get('iterations', 0)
+
+    move = engine.get_piece_move(game.board, game.turn, game.get_piece_legal_moves)
+    if not move:
+        forfeit(game, game.turn, 'no move')
+        return 0
+    game.execute_move(move[0], move[1], animated=False)
+    if game.promotion_pending: game.promote_pawn(QUEEN)
+    if not game.game_over:
+        target = engine.get_duck_move(game.board, game.duck_pos, game.prev_duck_pos)
+        if target: game.place_duck(target, animated=False)
+    return 0
+
+
+def choose_action(engine, game, move_time=None):
+    """(action, promotion) that `engine` would play in `game`, which is left unchanged; None if it has no move."""
+    if hasattr(engine, 'search'):
+        action = engine.search(game, move_time=move_time)
+        return (action, getattr(engine, 'planned_promotion', None)) if action else None
+    probe = game.clone()
+    before = probe.generate_fen()
+    play_ply(engine, probe)
+    if probe.last_move_arrow is None or probe.generate_fen() == before: return None
+    start, end, duck = last_ply_action(probe)
+    promoted = game.board[start[0]][start[1]].type == PAWN and end[0] in (0, 7)
+    return (start, end, duck), probe.board[end[0]][end[1]].type if promoted else None
+
+
+def play_game(job):
+    """Worker entry point. Returns the result from engine A's point of view plus per-side timing."""
+    from engine_protocol import EngineError
+    index, fen, config_a, config_b, a_is_white, max_plies, time_control = job
+    side_of = {'w': 'a' if a_is_white else 'b', 'b': 'b' if a_is_white else 'a'}
+    stats = {'a': {'moves': 0, 'time': 0.0, 'nodes': 0}, 'b': {'moves': 0, 'time': 0.0, 'nodes': 0}}
+
+    game = HeadlessGame.from_fen(fen)
+    clock = ChessClock.parse(time_control)
+    plies = 0
+    engines = {}
+    try:
+        # An engine that fails to start or dies mid-game loses this game; the match goes on
+        for color in ('w', 'b'):
+            engines[color] = build_engine(config_a if side_of[color] == 'a' else config_b)
+        while not game.game_over and plies < max_plies:
+            mover = game.turn
+            side = stats[side_of[mover]]
+            engine = engines[mover]
+            budget = None
+            if clock.timed and hasattr(engine, 'time_manager'):
+                budget = engine.time_manager.budget(clock.time_left(mover), clock.increment, clock.move_limit,
+                                                    game.turn_number, sum(map(len, game.legal_move_map().values())))
+            t0 = time.perf_counter()
+            side['nodes'] += play_ply(engine, game, budget)
+            spent = time.perf_counter() - t0
+            side['time'] += spent
+            side['moves'] += 1
+            plies += 1
+            left = clock.time_left(mover, 1000 * spent)
+            if left is not None and left < 0: forfeit(game, mover, 'time forfeit')
+            clock.charge(mover, 1000 * spent)
+    except EngineError:
+        # The engine that could not be started, or else the one that failed on its turn
+        forfeit(game, next((c for c in 'wb' if c not in engines), game.turn), 'engine failure')
+    finally:
+        for engine in engines.values():
+            if hasattr(engine, 'close'): engine.close()
+
+    if not game.game_over or game.winner == 'draw':
+        score = 0.5
+    else:
+        score = 1.0 if side_of[game.winner] == 'a' else 0.0
+    return {'index': index, 'score': score, 'plies': plies, 'stats': stats,
+            'reason': getattr(game, 'end_reason', None) or ('max plies' if not game.game_over else 'king capture')}
+
+
+# --- STATISTICS ---
+def elo_from_score(p):
+    p = min(max(p, 1e-6), 1 - 1e-6)
+    return -400.0 * math.log10(1.0 / p - 1.0)
+
+
+def elo_estimate(wins, draws, losses):
+    """Elo difference of A over B and its 95% error bar."""
+    n = wins + draws + losses
+    if n == 0: return 0.0, 0.0
+    mean = (wins + 0.5 * draws) / n
+    var = (wins * (1 - mean) ** 2 + draws * (0.5 - mean) ** 2 + losses * mean ** 2) / n
+    margin = 1.96 * math.sqrt(var / n)
+    elo = elo_from_score(mean)
+    return elo, (elo_from_score(mean + margin) - elo_from_score(mean - margin)) / 2
+
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    """Log-likelihood ratio of H1 (elo1) against H0 (elo0), normal approximation of the trinomial."""
+    n = wins + draws + losses
+    if n == 0 or wins + losses == 0: return 0.0
+    mean = (wins + 0.5 * draws) / n
+    var = (wins * (1 - mean) ** 2 + draws * (0.5 - mean) ** 2 + losses * mean ** 2) / n
+    if var <= 0: return 0.0
+    s0 = 1 / (1 + 10 ** (-elo0 / 400))
+    s1 = 1 / (1 + 10 ** (-elo1 / 400))
+    return n * (s1 - s0) * (2 * mean - s0 - s1) / (2 * var)
+
+
+class MatchRunner:
+    """Plays engine A against engine B in worker processes, optionally stopping early on SPRT."""
+
+    def __init__(self, config_a, config_b, games=100, workers=None, openings=None, max_plies=MATCH_MAX_PLIES,
+                 sprt=None, alpha=0.05, beta=0.05, time_control=None):
+        self.config_a = config_a
+        self.config_b = config_b
+        self.games = games
+        self.workers = workers or os.cpu_count()
+        self.openings = openings or DEFAULT_OPENINGS
+        self.max_plies = max_plies
+        self.sprt = sprt  # (elo0, elo1) or None
+        self.bounds = (math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha))
+        self.time_control = time_control  # e.g. "1+0.1"; engines then get budgets from their TimeManager
+
+    def jobs(self):
+        for i in range(self.games):
+            fen = self.openings[(i // 2) % len(self.openings)]
+            yield i, fen, self.config_a, self.config_b, i % 2 == 0, self.max_plies, self.time_control
+
+    def run(self, on_result=None):
+        wins = draws = losses = 0
+        totals = {'a': {'moves': 0, 'time': 0.0, 'nodes': 0}, 'b': {'moves': 0, 'time': 0.0, 'nodes': 0}}
+        verdict = None
+        with Pool(self.workers) as pool:
+            for result in pool.imap_unordered(play_game, self.jobs()):
+                if result['score'] == 1.0:
+                    wins += 1
+                elif result['score'] == 0.0:
+                    losses += 1
+                else:
+                    draws += 1
+                for side in totals:
+                    for key in totals[side]: totals[side][key] += result['stats'][side][key]
+                if on_result: on_result(result, (wins, draws, losses))
+
+                if self.sprt:
+                    llr = sprt_llr(wins, draws, losses, *self.sprt)
+                    if llr <= self.bounds[0] or llr >= self.bounds[1]:
+                        verdict = 'H1 accepted' if llr >= self.bounds[1] else 'H0 accepted'
+                        pool.terminate()
+                        break
+        return self.report(wins, draws, losses, totals, verdict)
+
+    def report(self, wins, draws, losses, totals, verdict):
+        elo, margin = elo_estimate(wins, draws, losses)
+        report = {'games': wins + draws + losses, 'wins': wins, 'draws': draws, 'losses': losses,
+                  'elo': elo, 'elo_error': margin, 'sprt': verdict}
+        if self.sprt:
+            report['llr'] = sprt_llr(wins, draws, losses, *self.sprt)
+            report['llr_bounds'] = self.bounds
+        for side in ('a', 'b'):
+            t = totals[side]
+            report[side] = {'avg_move_ms': 1000 * t['time'] / t['moves'] if t['moves'] else 0.0,
+                            'nps': t['nodes'] / t['time'] if t['time'] > 0 else 0.0}
+        return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Engine-vs-engine Duck Chess match")
+    parser.add_argument('--a', default='{"engine": "mcts", "move_time": 100}', help="JSON config of engine A")
+    parser.add_argument('--b', default='{"engine": "duck_ai"}', help="JSON config of engine B")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--openings', default=None, help="File with one Duck FEN per line")
+    parser.add_argument('--max-plies', type=int, default=MATCH_MAX_PLIES)
+    parser.add_argument('--sprt', type=float, nargs=2, metavar=('ELO0', 'ELO1'), default=None)
+    parser.add_argument('--tc', default=None, help="time control, e.g. '1+0.1' or '0.5/move'")
+    args = parser.parse_args()
+
+    openings = None
+    if args.openings:
+        with open(args.openings) as f:
+            openings = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    def progress(result, wdl):
+        print(f"Game {result['index'] + 1}: {result['score']} ({result['reason']}, {result['plies']} plies)"
+              f"  W/D/L {wdl[0]}/{wdl[1]}/{wdl[2]}")
+
+    runner = MatchRunner(json.loads(args.a), json.loads(args.b), args.games, args.workers, openings,
+                         args.max_plies, tuple(args.sprt) if args.sprt else None, time_control=args.tc)
+    r = runner.run(progress)
+    print(f"\nGames: {r['games']}  W/D/L: {r['wins']}/{r['draws']}/{r['losses']}")
+    print(f"Elo (A - B): {r['elo']:+.1f} +/- {r['elo_error']:.1f}")
+    if r['sprt']: print(f"SPRT: {r['sprt']} (LLR {r['llr']:.2f})")
+    for side in ('a', 'b'):
+        print(f"Engine {side.upper()}: {r[side]['avg_move_ms']:.1f} ms/move, {r[side]['nps']:.0f} nps")
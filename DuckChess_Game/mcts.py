@@ -0,0 +1,303 @@
+import math
+import time
+import random
+from array import array
+from settings import *
+from headless import HeadlessGame, encode_action, decode_action
+from clock import TimeManager
+
+
+class MaterialEvaluator:
+    """
+    Default evaluator. Any object with the same evaluate_batch signature can replace it.
+    Input: list of HeadlessGame states and, for each, the list of its legal actions
+    Output: list of (value for the side to move in [-1, 1], priors aligned with actions or None)
+    """
+
+    def evaluate_batch(self, states, actions):
+        results = []
+        for state, acts in zip(states, actions):
+            score = state.calculate_material_score(state.board)
+            if state.turn == 'b': score = -score
+            results.append((math.tanh(score / 5.0), self.capture_priors(state, acts)))
+        return results
+
+    def capture_priors(self, state, actions):
+        """Prefers captures by victim value (King captures end the game)."""
+        priors = []
+        for (start, (er, ec), duck) in actions:
+            target = state.board[er][ec]
+            if not target:
+                priors.append(1.0)
+            elif target.type == KING:
+                priors.append(1000.0)
+            else:
+                priors.append(1.0 + 4.0 * PIECE_VALUES[target.type])
+        return priors
+
+
+class MCTSTree:
+    """Array-backed node storage. Node 0 is the root; the children of a node are contiguous."""
+
+    def __init__(self, max_nodes=MCTS_MAX_NODES):
+        self.max_nodes = max_nodes
+        self.parent = array('i')
+        self.first_child = array('i')  # -1 while the node is unexpanded
+        self.num_children = array('i')
+        self.action = array('i')
+        self.visits = array('i')
+        self.value_sum = array('d')  # From the view of the player who made `action`
+        self.prior = array('f')
+        self.virtual = array('i')  # In-flight visits (virtual loss)
+        self.full = False
+        self.add_node(-1, 0, 1.0)
+
+    def __len__(self):
+        return len(self.parent)
+
+    def add_node(self, parent, code, prior):
+        self.parent.append(parent)
+        self.first_child.append(-1)
+        self.num_children.append(0)
+        self.action.append(code)
+        self.visits.append(0)
+        self.value_sum.append(0.0)
+        self.prior.append(prior)
+        self.virtual.append(0)
+        return len(self.parent) - 1
+
+    def expand(self, node, codes, priors):
+        """Creates all children at once. Returns False if the node budget would be exceeded."""
+        if len(self) + len(codes) > self.max_nodes:
+            self.full = True
+            return False
+        n = len(codes)
+        self.first_child[node] = len(self)
+        self.num_children[node] = n
+        self.parent.extend([node] * n)
+        self.first_child.extend([-1] * n)
+        self.num_children.extend([0] * n)
+        self.action.extend(codes)
+        self.visits.extend([0] * n)
+        self.value_sum.extend([0.0] * n)
+        self.prior.extend(priors)
+        self.virtual.extend([0] * n)
+        return True
+
+    def subtree(self, node):
+        """Copies the subtree under `node` into a fresh tree rooted at index 0 (used for tree reuse)."""
+        new = MCTSTree(self.max_nodes)
+        new.visits[0], new.value_sum[0] = self.visits[node], self.value_sum[node]
+        stack = [(node, 0)]
+        while stack:
+            old, nid = stack.pop()
+            fc, n = self.first_child[old], self.num_children[old]
+            if fc == -1: continue
+            new.first_child[nid], new.num_children[nid] = len(new), n
+            for i in range(n):
+                child = new.add_node(nid, self.action[fc + i], self.prior[fc + i])
+                new.visits[child], new.value_sum[child] = self.visits[fc + i], self.value_sum[fc + i]
+                stack.append((fc + i, child))
+        return new
+
+
+class MCTSEngine:
+    """
+    PUCT Monte Carlo Tree Search over full Duck Chess plies (piece move + duck square).
+    Leaves are collected with virtual loss so a whole batch goes to the evaluator in one call.
+    """
+
+    def __init__(self, game=None, evaluator=None, c_puct=MCTS_C_PUCT, batch_size=MCTS_BATCH_SIZE,
+                 virtual_loss=MCTS_VIRTUAL_LOSS, max_nodes=MCTS_MAX_NODES, move_time=MCTS_MOVE_TIME):
+        self.game = game
+        self.evaluator = evaluator or MaterialEvaluator()
+        self.c_puct = c_puct
+        self.batch_size = batch_size
+        self.virtual_loss = virtual_loss
+        self.max_nodes = max_nodes
+        self.move_time = move_time
+        self.time_manager = TimeManager()
+        self.time_budget = None  # (soft, hard) ms for the next get_piece_move, set by the game when clocks run
+
+        self.tree = None
+        self.root_state = None
+        self.last_choice = None
+        self.planned_duck = None
+        self.last_info = {}
+        self.stop_requested = False  # Set from another thread to end the running search (engine protocol 'stop')
+
+    # --- TREE REUSE ---
+    def _set_root(self, game):
+        state = game if isinstance(game, HeadlessGame) else HeadlessGame.from_game(game)
+        state = state.clone()
+        sig = state.generate_fen_signature()
+        reused = None
+        if self.tree is not None:
+            if self.root_state.generate_fen_signature() == sig:
+                # A full tree cannot grow, and its search would stop after one batch: start afresh instead
+                reused = None if self.tree.full else self.tree
+            elif game.last_move_arrow and game.duck_pos != (-1, -1):
+                target = encode_action((game.last_move_arrow[0], game.last_move_arrow[1], game.duck_pos))
+                for path in self._reuse_candidates(target):
+                    probe = self.root_state.clone()
+                    for node in path: probe.apply_action(decode_action(self.tree.action[node]))
+                    if probe.generate_fen_signature() == sig:
+                        reused = self.tree.subtree(path[-1])
+                        break
+        self.tree = reused if reused is not None else MCTSTree(self.max_nodes)
+        self.root_state = state
+        return reused is not None
+
+    def _reuse_candidates(self, target):
+        """Paths (from the old root) whose last action matches the opponent's reply."""
+        t = self.tree
+        parents = [[]]
+        if self.last_choice is not None: parents.append([self.last_choice])
+        for path in parents:
+            node = path[-1] if path else 0
+            fc = t.first_child[node]
+            if fc == -1: continue
+            for child in range(fc, fc + t.num_children[node]):
+                if t.action[child] == target: yield path + [child]
+
+    # --- SEARCH ---
+    def search(self, game, move_time=None, max_iterations=None, budget=None, on_info=None):
+        """
+        Returns the best (start, end, duck) action for the side to move, or None if the game is over.
+        budget: (soft, hard) ms from a TimeManager; replaces move_time and stops early once the best move is stable.
+        on_info(iterations, elapsed_ms) is called every MCTS_INFO_MS; returning True ends the search.
+        """
+        if game.game_over: return None
+        reused = self._set_root(game)
+        move_time = self.move_time if move_time is None else move_time
+        if budget is not None: move_time = budget[1]
+        t0 = time.perf_counter()
+        deadline = t0 + move_time / 1000.0 if move_time else None
+        iterations = evals = batches = 0
+        best, stable = None, 0
+        next_info = t0 + MCTS_INFO_MS / 1000.0
+
+        while True:
+            leaves = self._collect_leaves()
+            if not leaves: break
+            pending = [leaf for leaf in leaves if leaf[2] is None]
+            if pending:
+                actions = [state.legal_actions() for _, state, _ in pending]
+                results = self.evaluator.evaluate_batch([state for _, state, _ in pending], actions)
+                for (path, state, _), acts, (value, priors) in zip(pending, actions, results):
+                    self._expand(path[-1], acts, priors)
+                    self._backup(path, -value)
+                evals += len(pending)
+                batches += 1
+            for path, _, value in leaves:
+                if value is not None: self._backup(path, value)
+            iterations += len(leaves)
+
+            if max_iterations and iterations >= max_iterations: break
+            if deadline and time.perf_counter() >= deadline: break
+            if self.tree.full or self.stop_requested: break
+            if on_info and time.perf_counter() >= next_info:
+                next_info = time.perf_counter() + MCTS_INFO_MS / 1000.0
+                if on_info(iterations, 1000 * (time.perf_counter() - t0)): break
+            if budget is not None:
+                current = self._most_visited()
+                stable = stable + 1 if current == best else 0
+                best = current
+                elapsed = 1000 * (time.perf_counter() - t0)
+                if self.time_manager.should_stop(elapsed, budget[0], budget[1], stable): break
+
+        elapsed = time.perf_counter() - t0
+        self.last_info = {'iterations': iterations, 'evals': evals, 'batches': batches, 'nodes': len(self.tree),
+                          'reused': reused, 'time': elapsed, 'nps': iterations / elapsed if elapsed > 0 else 0}
+        return self._best_action()
+
+    def _collect_leaves(self):
+        """Selects up to batch_size leaves, applying virtual loss along each path."""
+        t = self.tree
+        leaves, seen = [], set()
+        root_turn = self.root_state.turn
+        for _ in range(self.batch_size):
+            node, path = 0, [0]
+            state = self.root_state.clone()
+            t.virtual[0] += 1
+            while t.first_child[node] != -1 and t.num_children[node] > 0:
+                node = self._select_child(node)
+                path.append(node)
+                t.virtual[node] += 1
+                state.apply_action(decode_action(t.action[node]))
+                if state.game_over: break
+
+            if state.game_over or t.first_child[node] != -1:
+                # Terminal (or expanded with no children): the value is known without the evaluator
+                mover = root_turn if len(path) % 2 == 0 else ('b' if root_turn == 'w' else 'w')
+                if not state.game_over:
+                    value = 1.0  # Side to move has no legal ply -> loses
+                elif state.winner == 'draw':
+                    value = 0.0
+                else:
+                    value = 1.0 if state.winner == mover else -1.0
+                leaves.append((path, state, value))
+            elif node in seen:
+                for n in path: t.virtual[n] -= 1
+                break
+            else:
+                seen.add(node)
+                leaves.append((path, state, None))
+        return leaves
+
+    def _select_child(self, node):
+        t = self.tree
+        vl = self.virtual_loss
+        fc = t.first_child[node]
+        sqrt_n = math.sqrt(t.visits[node] + t.virtual[node] + 1)
+        best, best_score = fc, -1e9
+        for child in range(fc, fc + t.num_children[node]):
+            n = t.visits[child] + t.virtual[child]
+            q = (t.value_sum[child] - vl * t.virtual[child]) / n if n else 0.0
+            score = q + self.c_puct * t.prior[child] * sqrt_n / (1 + n)
+            if score > best_score: best, best_score = child, score
+        return best
+
+    def _expand(self, node, actions, priors):
+        if not actions: return
+        if priors is None:
+            priors = [1.0 / len(actions)] * len(actions)
+        else:
+            total = sum(priors) or 1.0
+            priors = [p / total for p in priors]
+        self.tree.expand(node, [encode_action(a) for a in actions], priors)
+
+    def _backup(self, path, value):
+        """`value` is from the view of the player who made the last move on the path."""
+        t = self.tree
+        for node in reversed(path):
+            t.virtual[node] -= 1
+            t.visits[node] += 1
+            t.value_sum[node] += value
+            value = -value
+
+    def _most_visited(self):
+        """Root child the search currently prefers, or None before the root is expanded."""
+        t = self.tree
+        fc = t.first_child[0]
+        if fc == -1 or t.num_children[0] == 0: return None
+        children = range(fc, fc + t.num_children[0])
+        return max(children, key=lambda ch: (t.visits[ch], t.value_sum[ch] / t.visits[ch] if t.visits[ch] else -1))
+
+    def _best_action(self):
+        best = self._most_visited()
+        self.last_choice = best
+        return None if best is None else decode_action(self.tree.action[best])
+
+    # --- DuckAI-COMPATIBLE INTERFACE (used by GameLogicMixin.ai_turn) ---
+    def get_piece_move(self, board, turn_color, legal_moves_generator):
+        action = self.search(self.game, budget=self.time_budget)
+        if not action: return None
+        self.planned_duck = action[2]
+        return action[0], action[1]
+
+    def get_duck_move(self, board, current_duck_pos, prev_duck_pos):
+        duck, self.planned_duck = self.planned_duck, None
+        if duck and not board[duck[0]][duck[1]] and duck != prev_duck_pos: return duck
+        empties = [(r, c) for r in range(8) for c in range(8) if not board[r][c] and (r, c) != prev_duck_pos]
+        return random.choice(empties) if empties else None
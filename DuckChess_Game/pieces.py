@@ -2,4 +2,9 @@ class Piece:
     def __init__(self, color, type):
         self.color = color
         self.type = type
-        self.has_moved = False
\ No newline at end of file
+        self.has_moved = False
+
+    def copy(self):
+        p = Piece(self.color, self.type)
+        p.has_moved = self.has_moved
+        return p
@@ -0,0 +1,243 @@
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import copy
+import json
+import mmap
+import heapq
+import struct
+import hashlib
+import argparse
+from multiprocessing import Pool
+from settings import *
+from headless import HeadlessGame, encode_action, last_ply_action
+from game_record import parse_game, iter_replay, iter_raw_games, GameRecordError
+
+# hash, game id, ply, next move (encoded action), result (1 white, 0 draw, -1 black, 2 unknown)
+RECORD = struct.Struct('<QIHIbx')
+RESULT_CODES = {"1-0": 1, "1/2-1/2": 0, "0-1": -1}
+
+
+def position_hash(board, duck_pos, turn):
+    """64-bit hash of what the explorer shows: pieces, duck and side to move."""
+    key = "".join(f"{p.color}{p.type}" if p else "." for row in board for p in row)
+    digest = hashlib.blake2b(f"{key}|{duck_pos}|{turn}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def ply_code(game):
+    """Encodes the ply that was just played (see last_ply_action)."""
+    return encode_action(last_ply_action(game))
+
+
+class Segment:
+    """One immutable file of RECORDs sorted by hash, searched in place through mmap."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.path.getsize(path)
+        self.count = size // RECORD.size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def lookup(self, h):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if struct.unpack_from('<Q', self.map, mid * RECORD.size)[0] < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        out = []
+        while lo < self.count:
+            rec = RECORD.unpack_from(self.map, lo * RECORD.size)
+            if rec[0] != h: break
+            out.append(rec)
+            lo += 1
+        return out
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield RECORD.unpack_from(self.map, i * RECORD.size)
+
+    def close(self):
+        if self.map: self.map.close()
+        self.file.close()
+
+
+def segment_name(number):
+    return f"seg_{number:06d}.idx"
+
+
+def write_segment(path, records):
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        for rec in records: f.write(RECORD.pack(*rec))
+    os.replace(tmp, path)
+
+
+def _index_chunk(job):
+    """Worker: replays a chunk of games and writes them as one sorted segment."""
+    path, chunk = job
+    records, skipped = [], 0
+    for game_id, text in chunk:
+        rows = []
+        try:
+            record = parse_game(text)
+            result = RESULT_CODES.get(record.headers.get('Result'), 2)
+            start = HeadlessGame.from_fen(record.headers['FEN']) if 'FEN' in record.headers else HeadlessGame()
+            h = position_hash(start.board, start.duck_pos, start.turn)
+            for ply, game in iter_replay(record):
+                rows.append((h, game_id, ply - 1, ply_code(game), result))
+                h = position_hash(game.board, game.duck_pos, game.turn)
+        except (GameRecordError, ValueError):  # ValueError: a bad FEN header
+            skipped += 1
+            continue
+        records.extend(rows)
+    records.sort()
+    write_segment(path, records)
+    return path, len(records), skipped
+
+
+class PositionIndex:
+    """
+    On-disk map: position hash -> (game id, ply, next move, result).
+    New archives become new sorted segments; add_archives merges the smallest once there are too many.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.manifest = {'next_game_id': 0, 'next_segment': 0, 'segments': [], 'archives': []}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f: self.manifest = json.load(f)
+        self.segments = [Segment(os.path.join(directory, name)) for name in self.manifest['segments']]
+
+    def _save_manifest(self):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, 'w') as f: json.dump(self.manifest, f)
+        os.replace(tmp, self.manifest_path)
+
+    def _new_segment_name(self):
+        name = segment_name(self.manifest['next_segment'])
+        self.manifest['next_segment'] += 1
+        return name
+
+    # --- BUILD ---
+    def _jobs(self, paths, chunk_size):
+        chunk = []
+        for path in paths:
+            first = self.manifest['next_game_id']
+            with open(path, encoding='utf-8') as f:
+                for text in iter_raw_games(f):
+                    chunk.append((self.manifest['next_game_id'], text))
+                    self.manifest['next_game_id'] += 1
+                    if len(chunk) >= chunk_size:
+                        yield os.path.join(self.directory, self._new_segment_name()), chunk
+                        chunk = []
+            self.manifest['archives'].append({'path': os.path.abspath(path), 'first_game_id': first})
+        if chunk: yield os.path.join(self.directory, self._new_segment_name()), chunk
+
+    def add_archives(self, paths, workers=None, chunk_size=INDEX_CHUNK_GAMES):
+        """
+        Indexes game-record files in parallel. Returns (positions added, games skipped).
+        All or nothing: if any archive fails, its segments are deleted and the index is left as it was.
+        """
+        added = skipped = 0
+        before, kept = copy.deepcopy(self.manifest), len(self.segments)
+        try:
+            with Pool(workers or os.cpu_count()) as pool:
+                for path, n, bad in pool.imap(_index_chunk, self._jobs(paths, chunk_size)):
+                    self.manifest['segments'].append(os.path.basename(path))
+                    self.segments.append(Segment(path))
+                    added += n
+                    skipped += bad
+        except BaseException:
+            for seg in self.segments[kept:]: seg.close()
+            self.segments = self.segments[:kept]
+            for number in range(before['next_segment'], self.manifest['next_segment']):
+                base = os.path.join(self.directory, segment_name(number))
+                for path in (base, base + ".tmp"):
+                    if os.path.exists(path): os.remove(path)
+            self.manifest = before
+            raise
+        self._save_manifest()
+        if len(self.segments) > INDEX_MAX_SEGMENTS: self.merge()
+        return added, skipped
+
+    def merge(self, keep=INDEX_MAX_SEGMENTS):
+        """Streams the smallest segments into one, leaving at most `keep` segments (large ones untouched)."""
+        if len(self.segments) < 2: return
+        ordered = sorted(self.segments, key=lambda s: s.count)
+        victims = ordered[:max(2, len(ordered) - keep + 1)]
+        name = self._new_segment_name()
+        path = os.path.join(self.directory, name)
+        write_segment(path, heapq.merge(*victims))
+
+        for seg in victims:
+            seg.close()
+            self.manifest['segments'].remove(os.path.basename(seg.path))
+        self.segments = [s for s in self.segments if s not in victims] + [Segment(path)]
+        self.manifest['segments'].append(name)
+        self._save_manifest()
+        for seg in victims: os.remove(seg.path)
+
+    # --- QUERIES ---
+    def lookup(self, h):
+        out = []
+        for seg in self.segments: out.extend(seg.lookup(h))
+        return out
+
+    def move_stats(self, board, duck_pos, turn):
+        """[{'code', 'games', 'white', 'draws', 'black'}] for the moves played from this position, most popular first."""
+        stats = {}
+        for _, _, _, code, result in self.lookup(position_hash(board, duck_pos, turn)):
+            s = stats.setdefault(code, {'code': code, 'games': 0, 'white': 0, 'draws': 0, 'black': 0})
+            s['games'] += 1
+            if result == 1:
+                s['white'] += 1
+            elif result == 0:
+                s['draws'] += 1
+            elif result == -1:
+                s['black'] += 1
+        return sorted(stats.values(), key=lambda s: -s['games'])
+
+    def locate_game(self, game_id):
+        """(archive path, ordinal of the game inside it) for a game id."""
+        for archive in reversed(self.manifest['archives']):
+            if game_id >= archive['first_game_id']: return archive['path'], game_id - archive['first_game_id']
+        return None
+
+    def close(self):
+        for seg in self.segments: seg.close()
+        self.segments = []
+
+
+if __name__ == "__main__":
+    import time
+    parser = argparse.ArgumentParser(description="Position index over Duck Chess game archives")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('add')
+    build.add_argument('index')
+    build.add_argument('files', nargs='+')
+    build.add_argument('--workers', type=int, default=None)
+    query = sub.add_parser('query')
+    query.add_argument('index')
+    query.add_argument('fen')
+    sub.add_parser('merge').add_argument('index')
+    args = parser.parse_args()
+
+    index = PositionIndex(args.index)
+    if args.command == 'add':
+        added, skipped = index.add_archives(args.files, args.workers)
+        print(f"Indexed {added} positions ({skipped} invalid games skipped), {len(index.segments)} segments")
+    elif args.command == 'merge':
+        index.merge(keep=1)
+    else:
+        game = HeadlessGame.from_fen(args.fen)
+        t0 = time.perf_counter()
+        rows = index.move_stats(game.board, game.duck_pos, game.turn)
+        print(f"{len(rows)} moves in {1000 * (time.perf_counter() - t0):.2f} ms")
+        for s in rows: print(s)
+    index.close()
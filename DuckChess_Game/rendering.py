@@ -2,6 +2,41 @@ import pygame
 import os
 import math
 from settings import *
+from headless import decode_action
+from clock import format_clock
+
+
+def pack_atlas(images):
+    """Packs {key: Surface} side by side into one surface. Returns (atlas, {key: Rect})."""
+    w = sum(img.get_width() for img in images.values())
+    h = max((img.get_height() for img in images.values()), default=0)
+    atlas = pygame.Surface((max(w, 1), max(h, 1)), pygame.SRCALPHA).convert_alpha()
+    rects, x = {}, 0
+    for key, img in images.items():
+        rects[key] = pygame.Rect(x, 0, img.get_width(), img.get_height())
+        # MAX onto a cleared surface copies RGBA exactly (a normal blit would blend the alpha edges)
+        atlas.blit(img, rects[key], special_flags=pygame.BLEND_RGBA_MAX)
+        x += img.get_width()
+    return atlas, rects
+
+
+class Tween:
+    """A sprite sliding between two squares. Positions are resolved at draw time, so resizes and flips are safe."""
+
+    def __init__(self, key, start, end, duration=ANIMATION_SPEED):
+        self.key = key
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.elapsed = 0
+
+    @property
+    def done(self):
+        return self.elapsed >= self.duration
+
+    def progress(self):
+        p = min(1.0, self.elapsed / self.duration)
+        return 1 - math.pow(1 - p, 3)  # Cubic ease-out
 
 
 class RenderingMixin:
@@ -10,24 +45,11 @@ class RenderingMixin:
     def draw_editor(self):
         self.draw_menu_background()
 
-        # 1. Draw Board (Static)
-        pygame.draw.rect(self.screen, (20, 20, 20),
-                         (self.board_x - 2, self.board_y - 2, self.sq_size * 8 + 4, self.sq_size * 8 + 4), width=2)
-
-        font_coord = pygame.font.SysFont("Arial", 12, bold=True)
+        # 1. Draw Board (Static, cached)
+        self.screen.blit(self.get_board_layer(framed=False), (self.board_x - 20, self.board_y - 20))
         for r in range(8):
             for c in range(8):
                 x, y = self.get_screen_pos(r, c)
-                color = WHITE_COLOR if (r + c) % 2 == 0 else BLACK_SQ_COLOR
-                pygame.draw.rect(self.screen, color, (x, y, self.sq_size, self.sq_size))
-
-                # Coords
-                text_color = WHITE_COLOR if (r + c) % 2 != 0 else BLACK_SQ_COLOR
-                if r == 7:
-                    self.screen.blit(font_coord.render("abcdefgh"[c], True, text_color),
-                                     (x + self.sq_size - 12, y + self.sq_size - 14))
-                if c == 0:
-                    self.screen.blit(font_coord.render("87654321"[r], True, text_color), (x + 3, y + 2))
 
                 # Draw Pieces
                 if self.duck_pos == (r, c): self.draw_duck(r, c)
@@ -70,7 +92,7 @@ class RenderingMixin:
 
         trash_rect = pygame.Rect(palette_x + self.sq_size + 10, y_misc, self.sq_size, self.sq_size)
         pygame.draw.rect(self.screen, (200, 50, 50), trash_rect, border_radius=4)
-        trash_txt = self.font_ui.render("CLR", True, (255, 255, 255))
+        trash_txt = self.render_text(self.font_ui, "CLR", (255, 255, 255))
         self.screen.blit(trash_txt, trash_txt.get_rect(center=trash_rect.center))
 
         # 3. Floating Piece (Dragging)
@@ -89,7 +111,7 @@ class RenderingMixin:
         valid = self.validate_editor_board()
         status_txt = "EDITOR MODE" if not valid else "EDITOR MODE: Ready"
         col = (200, 50, 50) if not valid else (50, 200, 50)
-        self.screen.blit(self.font_status.render(status_txt, True, col), (40, self.screen_h - 50))
+        self.screen.blit(self.render_text(self.font_status, status_txt, col), (40, self.screen_h - 50))
 
         mouse = pygame.mouse.get_pos()
 
@@ -105,7 +127,7 @@ class RenderingMixin:
         # Draw Toggle
         pygame.draw.rect(self.screen, btn_col, self.editor_turn_btn, border_radius=6)
         pygame.draw.rect(self.screen, BTN_BORDER, self.editor_turn_btn, width=1, border_radius=6)
-        t_surf = self.font_ui.render(label, True, txt_col)
+        t_surf = self.render_text(self.font_ui, label, txt_col)
         self.screen.blit(t_surf, t_surf.get_rect(center=self.editor_turn_btn.center))
         # -------------------------------
 
@@ -119,6 +141,7 @@ class RenderingMixin:
         self.editor_play_btn = pygame.Rect(self.screen_w - 150, self.screen_h - 58, 120, 36)
         if valid:
             self.draw_styled_button(self.editor_play_btn, "PLAY", self.editor_play_btn.collidepoint(mouse))
+
     def load_assets(self):
         # 1. Paths
         base_path = os.path.dirname(os.path.abspath(__file__))
@@ -156,6 +179,7 @@ class RenderingMixin:
                         pass
 
         # 4. Load Pieces
+        images = {}
         name_map = {'K': 'king', 'Q': 'queen', 'R': 'rook', 'B': 'bishop', 'N': 'knight', 'P': 'pawn'}
         if os.path.exists(pieces_dir):
             for color in ['w', 'b']:
@@ -165,7 +189,7 @@ class RenderingMixin:
                     if os.path.exists(full_path):
                         try:
                             key = f"{color}{p_type}"
-                            self.original_images[key] = pygame.image.load(full_path).convert_alpha()
+                            images[key] = pygame.image.load(full_path).convert_alpha()
                         except:
                             pass
 
@@ -174,11 +198,34 @@ class RenderingMixin:
         for path in duck_paths:
             if os.path.exists(path):
                 try:
-                    self.original_images['duck'] = pygame.image.load(path).convert_alpha()
+                    images['duck'] = pygame.image.load(path).convert_alpha()
                     break
                 except:
                     pass
 
+        # 6. One atlas surface; per-size sprite sets are cut from it on demand
+        if images: self.atlas, self.atlas_rects = pack_atlas(images)
+        self.sprite_sets.clear()
+
+    def get_piece_sprites(self, sq_size):
+        """{key: Surface} for one square size, all subsurfaces of one scaled atlas. LRU over SPRITE_CACHE_SIZES sizes."""
+        if sq_size in self.sprite_sets:
+            self.sprite_sets.move_to_end(sq_size)
+            return self.sprite_sets[sq_size]
+
+        scaled = {}
+        for key, rect in self.atlas_rects.items():
+            sz = int(sq_size * 0.8) if key == 'duck' else sq_size
+            scaled[key] = pygame.transform.smoothscale(self.atlas.subsurface(rect), (sz, sz))
+        sprites = {}
+        if scaled:
+            sheet, rects = pack_atlas(scaled)
+            sprites = {key: sheet.subsurface(rect) for key, rect in rects.items()}
+
+        self.sprite_sets[sq_size] = sprites
+        if len(self.sprite_sets) > SPRITE_CACHE_SIZES: self.sprite_sets.popitem(last=False)
+        return sprites
+
     def play_sound(self, name):
         """Plays a sound if it exists"""
         if name in self.sounds:
@@ -186,47 +233,38 @@ class RenderingMixin:
 
     def animate_move_visual(self, start, end, piece, is_duck=False):
         """
-        Blocking animation loop.
-        Moves a sprite from start to end over ANIMATION_SPEED ms.
+        Schedules a sprite sliding from start to end over ANIMATION_SPEED ms.
+        Non-blocking: the main loop advances it (update_animations) and draw_game paints it.
         """
         if self.view_index != len(self.history) - 1:
             return
 
-        x1, y1 = self.get_screen_pos(start[0], start[1])
-        x2, y2 = self.get_screen_pos(end[0], end[1])
-
         key = 'duck' if is_duck else f"{piece.color}{piece.type}"
-        img = self.scaled_images.get(key)
-
-        if not img and not is_duck: return
-
-        start_time = pygame.time.get_ticks()
-        clock = pygame.time.Clock()
-
-        while True:
-            now = pygame.time.get_ticks()
-            elapsed = now - start_time
-            if elapsed >= ANIMATION_SPEED:
-                break
-
-            progress = elapsed / ANIMATION_SPEED
-            progress = 1 - math.pow(1 - progress, 3)  # Cubic ease-out
-
-            current_x = x1 + (x2 - x1) * progress
-            current_y = y1 + (y2 - y1) * progress
-
-            # Draw game with hidden start piece
-            self.draw_game(hidden_square=start)
-
-            # Draw Flying Piece
-            if img:
-                self.screen.blit(img, (current_x, current_y))
-
-            pygame.display.flip()
-            clock.tick(ANIMATION_FPS)
+        if key not in self.scaled_images: return
+
+        # A newer move onto the same square replaces the old tween
+        self.animations = [a for a in self.animations if a.end != end]
+        self.animations.append(Tween(key, start, end))
+
+    def update_animations(self, dt):
+        """Advances every active tween by dt milliseconds and drops the finished ones."""
+        for anim in self.animations: anim.elapsed += dt
+        self.animations = [a for a in self.animations if not a.done]
+
+    def draw_animations(self):
+        for anim in self.animations:
+            img = self.scaled_images.get(anim.key)
+            if not img: continue
+            t = anim.progress()
+            x1, y1 = self.get_screen_pos(*anim.start)
+            x2, y2 = self.get_screen_pos(*anim.end)
+            # The duck sprite is smaller than a square, so center it like draw_duck does
+            ox, oy = (self.sq_size - img.get_width()) // 2, (self.sq_size - img.get_height()) // 2
+            self.screen.blit(img, (x1 + (x2 - x1) * t + ox, y1 + (y2 - y1) * t + oy))
 
     def resize_layout(self, w, h):
         self.screen_w, self.screen_h = w, h
+        self.invalidate()
         bottom_hud_space = 90
         available_w = w - self.panel_width - self.side_margin * 2
         available_h = h - bottom_hud_space - self.side_margin
@@ -238,19 +276,23 @@ class RenderingMixin:
         self.board_x = self.eval_bar_x + self.eval_bar_width + self.side_margin
         self.board_y = self.side_margin + (available_h - (self.sq_size * 8)) // 2
 
-        self.font_large = pygame.font.SysFont("Segoe UI Symbol", int(self.sq_size * 0.8), bold=True)
-        self.font_ui = pygame.font.SysFont("Verdana", 14)
-        self.font_history = pygame.font.SysFont("Consolas", 14)
-        self.font_nav = pygame.font.SysFont("Arial", 20, bold=True)
-        self.font_menu_title = pygame.font.SysFont("Verdana", 60, bold=True)
-        self.font_menu_sub = pygame.font.SysFont("Verdana", 16, bold=True)
-        self.font_eval = pygame.font.SysFont("Arial", 16, bold=True)
-        self.font_status = pygame.font.SysFont("Verdana", 18, bold=True)
+        with self.profiled('fonts'):
+            self.font_large = self.get_font("Segoe UI Symbol", int(self.sq_size * 0.8), bold=True)
+            self.font_ui = self.get_font("Verdana", 14)
+            self.font_history = self.get_font("Consolas", 14)
+            self.font_nav = self.get_font("Arial", 20, bold=True)
+            self.font_menu_title = self.get_font("Verdana", 60, bold=True)
+            self.font_menu_sub = self.get_font("Verdana", 16, bold=True)
+            self.font_eval = self.get_font("Arial", 16, bold=True)
+            self.font_status = self.get_font("Verdana", 18, bold=True)
+            self.font_coord = self.get_font("Arial", 12, bold=True)
+
+        # Static layers are only rebuilt here (and once per board orientation)
+        self.build_background_layer()
+        self.board_layers = {}
+        self.build_overlay_cache()
 
-        self.scaled_images = {}
-        for key, img in self.original_images.items():
-            sz = int(self.sq_size * 0.8) if key == 'duck' else self.sq_size
-            self.scaled_images[key] = pygame.transform.smoothscale(img, (sz, sz))
+        self.scaled_images = self.get_piece_sprites(self.sq_size)
 
         px, by = w - self.panel_width, h - 60
         bw, bh = self.panel_width // 4 - 8, 35
@@ -259,13 +301,117 @@ class RenderingMixin:
         self.nav_btns['next'] = pygame.Rect(px + 10 + (bw + 5) * 2, by, bw, bh)
         self.nav_btns['end'] = pygame.Rect(px + 10 + (bw + 5) * 3, by, bw, bh)
 
-    def draw_menu_background(self):
+    def get_font(self, name, size, bold=False):
+        """
+        SysFont with both steps cached: name -> file (a fontconfig scan on Linux) and file+size -> Font.
+        Sizes follow the window, so the Fonts are an LRU of FONT_CACHE_SIZE.
+        """
+        key = (name, size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            if (name, bold) not in self.font_paths:
+                self.font_paths[(name, bold)] = pygame.font.match_font(name, bold=bold)
+            path = self.font_paths[(name, bold)]
+            if path:
+                font = pygame.font.Font(path, size)
+            else:
+                font = pygame.font.SysFont(name, size, bold=bold)  # pygame's default font
+            self.fonts[key] = font
+            if len(self.fonts) > FONT_CACHE_SIZE: self.fonts.popitem(last=False)
+        else:
+            self.fonts.move_to_end(key)
+        return font
+
+    def request_resize(self, w, h):
+        """VIDEORESIZE handler: the layout is rebuilt once the window edge stops moving (see apply_pending_resize)."""
+        self.pending_resize = (w, h)
+        self.resize_due = pygame.time.get_ticks() + RESIZE_DEBOUNCE_MS
+
+    def apply_pending_resize(self):
+        if self.pending_resize and pygame.time.get_ticks() >= self.resize_due:
+            self.resize_layout(*self.pending_resize)
+            self.pending_resize = None
+
+    def build_background_layer(self):
         tile_size = 100
+        self.bg_layer = pygame.Surface((self.screen_w, self.screen_h)).convert()
         cols, rows = self.screen_w // tile_size + 1, self.screen_h // tile_size + 1
         for r in range(rows):
             for c in range(cols):
                 color = MENU_BG_DARK if (r + c) % 2 == 0 else MENU_BG_LIGHT
-                pygame.draw.rect(self.screen, color, (c * tile_size, r * tile_size, tile_size, tile_size))
+                pygame.draw.rect(self.bg_layer, color, (c * tile_size, r * tile_size, tile_size, tile_size))
+
+    def build_overlay_cache(self):
+        """One pre-filled surface per square overlay, reused by every draw_game."""
+        sz = self.sq_size
+
+        def tint(rgb, alpha):
+            s = pygame.Surface((sz, sz))
+            s.set_alpha(alpha)
+            s.fill(rgb)
+            return s
+
+        def circle(color, radius, width=0):
+            s = pygame.Surface((sz, sz), pygame.SRCALPHA)
+            pygame.draw.circle(s, color, (sz // 2, sz // 2), radius, width)
+            return s
+
+        self.overlays = {
+            'last_move': tint(LAST_MOVE_COLOR[:3], LAST_MOVE_COLOR[3]),
+            'check': tint((235, 60, 60), 180),
+            'capture': circle((100, 255, 100, 180), sz // 2 - 2, 6),  # Thick ring around the victim
+            'quiet': circle((100, 255, 100, 150), sz // 6),  # Small dot
+            'duck_hint': circle((255, 215, 0, 100), sz // 5),
+        }
+
+    def draw_menu_background(self):
+        self.screen.blit(self.bg_layer, (0, 0))
+
+    def get_board_layer(self, framed=True):
+        """Border, squares and coordinates pre-rendered for the current orientation."""
+        key = (self.player_side, framed)
+        if key not in self.board_layers:
+            self.board_layers[key] = self.build_board_layer(framed)
+        return self.board_layers[key]
+
+    def build_board_layer(self, framed):
+        # Layer origin is (board_x - 20, board_y - 20) so the outer border fits
+        size = self.sq_size * 8
+        layer = pygame.Surface((size + 40, size + 40), pygame.SRCALPHA)
+        if framed:
+            pygame.draw.rect(layer, BTN_BORDER, (0, 0, size + 40, size + 40), width=0, border_radius=4)
+        pygame.draw.rect(layer, (20, 20, 20), (18, 18, size + 4, size + 4), width=2)
+
+        for r in range(8):
+            for c in range(8):
+                x, y = self.get_screen_pos(r, c)
+                x, y = x - self.board_x + 20, y - self.board_y + 20
+                color = WHITE_COLOR if (r + c) % 2 == 0 else BLACK_SQ_COLOR
+                pygame.draw.rect(layer, color, (x, y, self.sq_size, self.sq_size))
+
+                # Coords
+                text_color = WHITE_COLOR if (r + c) % 2 != 0 else BLACK_SQ_COLOR
+                is_bottom_row = (r == 7) if self.player_side == 'w' else (r == 0)
+                if is_bottom_row:
+                    txt = self.render_text(self.font_coord, "abcdefgh"[c], text_color)
+                    layer.blit(txt, (x + self.sq_size - 12, y + self.sq_size - 14))
+                is_left_col = (c == 0) if self.player_side == 'w' else (c == 7)
+                if is_left_col:
+                    txt = self.render_text(self.font_coord, "87654321"[r], text_color)
+                    layer.blit(txt, (x + 3, y + 2))
+        return layer.convert_alpha()
+
+    def render_text(self, font, text, color, antialias=True):
+        """font.render with an LRU cache; nearly all UI text is identical from frame to frame."""
+        key = (font, text, color, antialias)
+        surf = self.text_cache.get(key)
+        if surf is None:
+            surf = font.render(text, antialias, color)
+            self.text_cache[key] = surf
+            if len(self.text_cache) > TEXT_CACHE_SIZE: self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        return surf
 
     def draw_glass_panel(self, rect):
         s = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
@@ -283,7 +429,7 @@ class RenderingMixin:
         pygame.draw.rect(self.screen, color, rect, border_radius=6)
         pygame.draw.rect(self.screen, border_col, rect, width=1, border_radius=6)
         txt_col = MENU_ACCENT if hover else BTN_TEXT
-        txt_surf = font.render(text, True, txt_col)
+        txt_surf = self.render_text(font, text, txt_col)
         self.screen.blit(txt_surf, txt_surf.get_rect(center=rect.center))
 
     def draw_eval_bar(self, current_board):
@@ -294,7 +440,12 @@ class RenderingMixin:
             else:
                 self.target_eval_score = 20 if self.winner == 'w' else -20
         else:
-            self.target_eval_score = self.calculate_material_score(current_board)
+            # Engine score of the viewed position once the background analysis has one, material until then
+            info = self.analysis.info() if self.show_analysis else None
+            if info and info['lines']:
+                self.target_eval_score = info['lines'][0][0]
+            else:
+                self.target_eval_score = self.material_score(current_board)
 
         # 2. Smoothing Animation (Existing Logic)
         diff = self.target_eval_score - self.current_eval_score
@@ -303,7 +454,8 @@ class RenderingMixin:
         else:
             self.current_eval_score += diff * 0.1
 
-        # 3. Drawing Logic (Existing Logic)
+        # 3. Drawing Logic (Existing Logic), skipped when render_game_frame clips to other regions
+        if not self.screen.get_clip().colliderect(self.eval_bar_rect()): return
         max_adv = 20
         normalized = (max(-max_adv, min(max_adv, self.current_eval_score)) + max_adv) / (2 * max_adv)
         bar_h, bar_y, bar_x, bar_w = self.sq_size * 8, self.board_y, self.eval_bar_x, self.eval_bar_width
@@ -325,74 +477,48 @@ class RenderingMixin:
             pygame.draw.rect(self.screen, color, (bar_x, bar_y, bar_w, bar_h))
 
         score_txt = f"{abs(int(round(self.current_eval_score)))}"
-        txt_surf = self.font_eval.render(score_txt, True, TEXT_COLOR if normalized > 0.95 else EVAL_WHITE)
+        txt_surf = self.render_text(self.font_eval, score_txt, TEXT_COLOR if normalized > 0.95 else EVAL_WHITE)
         self.screen.blit(txt_surf, txt_surf.get_rect(center=(bar_x + bar_w // 2, bar_y + 15)))
+
+    def eval_bar_rect(self):
+        return pygame.Rect(self.eval_bar_x - 2, self.board_y - 2, self.eval_bar_width + 4, self.sq_size * 8 + 4)
+
     def draw_history_panel(self):
         # 1. Background & Title
         self.draw_glass_panel(pygame.Rect(self.screen_w - self.panel_width, 0, self.panel_width, self.screen_h))
-        title = self.font_status.render("Move History", True, MENU_ACCENT)
+        title = self.render_text(self.font_status, "Move History", MENU_ACCENT)
         self.screen.blit(title, (self.screen_w - self.panel_width + 15, 15))
 
         # Turn Counter
-        counter = self.font_ui.render(f"{self.view_index} / {len(self.history) - 1}", True, (150, 150, 150))
+        counter = self.render_text(self.font_ui, f"{self.view_index} / {len(self.history) - 1}", (150, 150, 150))
         self.screen.blit(counter, (self.screen_w - 90, 18))
+        variation = self.variation_label()
+        if variation:
+            self.screen.blit(self.render_text(self.font_ui, variation, MENU_ACCENT), (self.screen_w - 170, 18))
         pygame.draw.line(self.screen, BTN_BORDER, (self.screen_w - self.panel_width + 10, 45), (self.screen_w - 10, 45))
-
-        # 2. Setup Dimensions
-        full_log = self.history[-1]['log']
-        start_y = 55
-        line_height = 24
-        col_white_x = self.screen_w - self.panel_width + 10
-        col_black_x = self.screen_w - self.panel_width + 155  # Adjusted spacing
-
-        available_height = self.nav_btns['start'].top - start_y - 10
-        max_rows = available_height // line_height
-        total_rows = (len(full_log) + 1) // 2
-
-        # Scroll Calculation
-        current_ply_idx = self.view_index - 1
-        current_row_idx = current_ply_idx // 2
-        scroll_row = max(0, current_row_idx - (max_rows - 2)) if current_row_idx > max_rows - 2 else 0
-
-        # 3. Draw Loop
-        for row in range(scroll_row, min(total_rows, scroll_row + max_rows)):
-            y_pos = start_y + (row - scroll_row) * line_height
-
-            # --- White's Move (Left) ---
-            w_idx = row * 2
-            if w_idx < len(full_log):
-                move_str = full_log[w_idx]
-                is_active = (w_idx == current_ply_idx)
-
-                if is_active:
-                    bg_rect = pygame.Rect(col_white_x - 2, y_pos, 140, line_height)
-                    pygame.draw.rect(self.screen, BTN_NORMAL, bg_rect, border_radius=4)
-
-                color = MENU_ACCENT if is_active else (220, 220, 220)
-                self.screen.blit(self.font_history.render(move_str, True, color), (col_white_x, y_pos + 4))
-
-            # --- Black's Move (Right) ---
-            b_idx = row * 2 + 1
-            if b_idx < len(full_log):
-                raw_str = full_log[b_idx]
-
-                # --- FIX: ROBUST STRING CLEANING ---
-                # Safely remove "1... " prefix by splitting on space and taking the last part(s)
-                # If split fails, it defaults to printing the raw string.
-                if "..." in raw_str:
-                    parts = raw_str.split(' ', 1)
-                    clean_str = parts[1] if len(parts) > 1 else raw_str
-                else:
-                    clean_str = raw_str
-                # -----------------------------------
-
-                is_active = (b_idx == current_ply_idx)
-                if is_active:
-                    bg_rect = pygame.Rect(col_black_x - 2, y_pos, 140, line_height)
-                    pygame.draw.rect(self.screen, BTN_NORMAL, bg_rect, border_radius=4)
-
-                color = MENU_ACCENT if is_active else (220, 220, 220)
-                self.screen.blit(self.font_history.render(clean_str, True, color), (col_black_x, y_pos + 4))
+        if self.game_clock.timed: self.draw_clocks()
+        if self.screen.get_clip().bottom <= self.history_layout()[0].top: return  # A clock tick: nothing below changed
+
+        # 2. Move List: only the visible rows, blitted from pre-rendered cells
+        bottom = self.nav_btns['start'].top - 10
+        if self.show_explorer:
+            explorer_h = (EXPLORER_ROWS + 1) * 22 + 16
+            bottom -= explorer_h
+            self.draw_explorer_panel(bottom, explorer_h)
+        if self.show_analysis:
+            analysis_h = (ANALYSIS_MULTIPV + 1) * 22 + 16
+            self.draw_analysis_panel(bottom - analysis_h, analysis_h)
+
+        self.sync_history_cells()
+        rect, line_height, max_rows = self.history_layout()
+        col_x = (rect.x + 10, rect.x + 155)
+        active_ply = self.view_index - 1
+        first = self.history_scroll * 2
+        for ply in range(first, min(len(self.history_cells), first + max_rows * 2)):
+            x, y = col_x[ply % 2], rect.y + (ply // 2 - self.history_scroll) * line_height
+            if ply == active_ply:
+                pygame.draw.rect(self.screen, BTN_NORMAL, (x - 2, y, 140, line_height), border_radius=4)
+            self.screen.blit(self.history_cells[ply][ply == active_ply], (x, y + 4))
 
         # 4. Draw Navigation Buttons
         mouse = pygame.mouse.get_pos()
@@ -400,7 +526,114 @@ class RenderingMixin:
         for lbl, key in labels:
             self.draw_styled_button(self.nav_btns[key], lbl, self.nav_btns[key].collidepoint(mouse), self.font_nav)    # --- NEW: GRAVEYARD METHOD ---
 
+    # --- CLOCKS ---
+    def clock_rects(self):
+        """{color: rect} of the two clocks, above the White and Black columns of the move list."""
+        x = self.screen_w - self.panel_width
+        return {'w': pygame.Rect(x + 10, 53, 135, 32), 'b': pygame.Rect(x + 155, 53, 135, 32)}
+
+    def draw_clocks(self):
+        for color, rect in self.clock_rects().items():
+            running = color == self.turn and not self.game_over
+            pygame.draw.rect(self.screen, MENU_ACCENT if running else BTN_NORMAL, rect, border_radius=4)
+            label = f"{'White' if color == 'w' else 'Black'}  {format_clock(self.time_left(color))}"
+            text = self.render_text(self.font_status, label, TEXT_COLOR if running else BTN_TEXT)
+            self.screen.blit(text, text.get_rect(center=rect.center))
+
+    # --- MOVE LIST ---
+    def history_layout(self):
+        """(list rect, row height, visible rows) of the move list inside the history panel."""
+        top, line_height = 95 if self.game_clock.timed else 55, 24
+        bottom = self.nav_btns['start'].top - 10
+        if self.show_explorer: bottom -= (EXPLORER_ROWS + 1) * 22 + 16
+        if self.show_analysis: bottom -= (ANALYSIS_MULTIPV + 1) * 22 + 16
+        rect = pygame.Rect(self.screen_w - self.panel_width, top, self.panel_width, max(0, bottom - top))
+        return rect, line_height, rect.height // line_height
+
+    def sync_history_cells(self):
+        """Renders only the plies logged since the last call: a (normal, active) surface pair per ply."""
+        if self.history_cells_log is not self.move_log or len(self.history_cells) > len(self.move_log):
+            self.history_cells_log, self.history_cells = self.move_log, []
+        for entry in self.move_log[len(self.history_cells):]:
+            # Black's plies sit in their own column, so drop the "1... " prefix
+            number, _, rest = entry.partition(' ')
+            text = rest if "..." in number and rest else entry
+            self.history_cells.append((self.font_history.render(text, True, (220, 220, 220)),
+                                       self.font_history.render(text, True, MENU_ACCENT)))
+
+    def follow_view_index(self):
+        """Scrolls the move list so the viewed ply stays visible whenever view_index changes."""
+        if self.view_index == self.history_followed: return
+        self.history_followed = self.view_index
+        _, _, max_rows = self.history_layout()
+        row = (self.view_index - 1) // 2
+        if row < self.history_scroll:
+            self.history_scroll = max(0, row)
+        elif row > self.history_scroll + max_rows - 2:
+            self.history_scroll = max(0, row - (max_rows - 2))
+
+    def scroll_history(self, rows):
+        _, _, max_rows = self.history_layout()
+        last = max(0, (len(self.move_log) + 1) // 2 - max_rows)
+        self.history_scroll = max(0, min(last, self.history_scroll + rows))
+
+    def history_ply_at(self, pos):
+        """Index into move_log of the move-list cell under pos, or None."""
+        rect, line_height, max_rows = self.history_layout()
+        if not rect.collidepoint(pos) or (pos[1] - rect.y) // line_height >= max_rows: return None
+        row = self.history_scroll + (pos[1] - rect.y) // line_height
+        ply = row * 2 + (pos[0] >= rect.x + 153)
+        return ply if ply < len(self.move_log) else None
+
+    def draw_explorer_panel(self, top, height):
+        """Moves played from the viewed position in the indexed archive (PositionIndex)."""
+        if self.view_index == len(self.history) - 1:
+            board, d_pos, turn = self.board, self.duck_pos, self.turn
+        else:
+            snap = self.history[self.view_index]
+            board, d_pos, turn = snap['board'], snap['duck_pos'], snap['turn']
+
+        key = self.position_key(board, d_pos)[:2] + (turn,)  # Pieces and duck: the same as the index's position_hash
+        if self.explorer_cache[0] != key:
+            rows = []
+            for s in self.explorer.move_stats(board, d_pos, turn)[:EXPLORER_ROWS]:
+                (sr, sc), end, duck = decode_action(s['code'])
+                p = board[sr][sc]
+                label = f"{p.type if p and p.type != PAWN else ''}" \
+                        f"{self.get_notation_coords(sr, sc)}-{self.get_notation_coords(*end)}"
+                if duck != end: label += f" @ {self.get_notation_coords(*duck)}"
+                score = (s['white'] + 0.5 * s['draws']) / s['games'] * 100
+                rows.append((label, s['games'], score))
+            self.explorer_cache = (key, rows)
+
+        x = self.screen_w - self.panel_width + 10
+        pygame.draw.line(self.screen, BTN_BORDER, (x, top), (self.screen_w - 10, top))
+        self.screen.blit(self.render_text(self.font_ui, "Explorer", MENU_ACCENT), (x, top + 6))
+        rows = self.explorer_cache[1]
+        if not rows:
+            self.screen.blit(self.render_text(self.font_history, "No games", (150, 150, 150)), (x, top + 28))
+        for i, (label, games, score) in enumerate(rows):
+            y = top + 28 + i * 22
+            self.screen.blit(self.render_text(self.font_history, label, (220, 220, 220)), (x, y))
+            self.screen.blit(self.render_text(self.font_history, f"{games:>6} {score:3.0f}%", (150, 150, 150)),
+                             (self.screen_w - 120, y))
+
+    def draw_analysis_panel(self, top, height):
+        x = self.screen_w - self.panel_width + 10
+        pygame.draw.line(self.screen, BTN_BORDER, (x, top), (self.screen_w - 10, top))
+        info = self.analysis.info()
+        header = f"Analysis  depth {info['depth']}  {info['nodes'] // 1000}k nodes" if info else "Analysis ..."
+        self.screen.blit(self.render_text(self.font_ui, header, MENU_ACCENT), (x, top + 6))
+        if not info: return
+        for i, (score, text) in enumerate(info['lines']):
+            y = top + 28 + i * 22
+            self.screen.blit(self.render_text(self.font_history, f"{score:+5.1f}", (150, 150, 150)), (x, y))
+            self.screen.blit(self.render_text(self.font_history, text[:ANALYSIS_LINE_CHARS], (220, 220, 220)),
+                             (x + 55, y))
+
     def draw_game(self, hidden_square=None):
+        # render_game_frame clips to the changed regions; squares and panels outside the clip are skipped
+        area = self.screen.get_clip()
         self.draw_menu_background()
 
         is_live = (self.view_index == len(self.history) - 1)
@@ -410,51 +643,27 @@ class RenderingMixin:
             snap = self.history[self.view_index]
             board, d_pos, last_mv, prev_d = snap['board'], snap['duck_pos'], snap['last_move'], snap['prev_duck']
 
-        # Dragging visual logic
-        hide_pos = hidden_square
+        # Squares whose piece is drawn elsewhere (being dragged or still sliding in)
+        hidden = {hidden_square} if hidden_square else set()
         if hasattr(self, 'dragging') and self.dragging and self.drag_start and is_live:
-            hide_pos = self.drag_start
+            hidden.add(self.drag_start)
+        if is_live: hidden.update(a.end for a in self.animations)
 
-        # Board Border
-        border_rect = pygame.Rect(self.board_x - 20, self.board_y - 20, self.sq_size * 8 + 40, self.sq_size * 8 + 40)
-        pygame.draw.rect(self.screen, BTN_BORDER, border_rect, width=0, border_radius=4)
-        pygame.draw.rect(self.screen, (20, 20, 20),
-                         (self.board_x - 2, self.board_y - 2, self.sq_size * 8 + 4, self.sq_size * 8 + 4), width=2)
-
-        font_coord = pygame.font.SysFont("Arial", 12, bold=True)
+        # Board Border, Squares & Coords (cached layer)
+        self.screen.blit(self.get_board_layer(), (self.board_x - 20, self.board_y - 20))
 
         for r in range(8):
             for c in range(8):
                 x, y = self.get_screen_pos(r, c)
-                color = WHITE_COLOR if (r + c) % 2 == 0 else BLACK_SQ_COLOR
-                pygame.draw.rect(self.screen, color, (x, y, self.sq_size, self.sq_size))
-
-                # Coords
-                text_color = WHITE_COLOR if (r + c) % 2 != 0 else BLACK_SQ_COLOR
-                is_bottom_row = (r == 7) if self.player_side == 'w' else (r == 0)
-                if is_bottom_row:
-                    file_char = "abcdefgh"[c]
-                    txt = font_coord.render(file_char, True, text_color)
-                    self.screen.blit(txt, (x + self.sq_size - 12, y + self.sq_size - 14))
-                is_left_col = (c == 0) if self.player_side == 'w' else (c == 7)
-                if is_left_col:
-                    rank_char = "87654321"[r]
-                    txt = font_coord.render(rank_char, True, text_color)
-                    self.screen.blit(txt, (x + 3, y + 2))
+                if not area.colliderect(x, y, self.sq_size, self.sq_size): continue
 
                 # Highlights: Last Move
                 if last_mv and ((r, c) == last_mv[0] or (r, c) == last_mv[1]):
-                    s = pygame.Surface((self.sq_size, self.sq_size))
-                    s.set_alpha(LAST_MOVE_COLOR[3])
-                    s.fill(LAST_MOVE_COLOR[:3])
-                    self.screen.blit(s, (x, y))
+                    self.screen.blit(self.overlays['last_move'], (x, y))
 
                 # Highlight: Previous Duck Position (Cannot place here)
                 if prev_d and (r, c) == prev_d:
-                    s = pygame.Surface((self.sq_size, self.sq_size))
-                    s.set_alpha(LAST_MOVE_COLOR[3])
-                    s.fill(LAST_MOVE_COLOR[:3])
-                    self.screen.blit(s, (x, y))
+                    self.screen.blit(self.overlays['last_move'], (x, y))
                     # Optional: Draw a small 'X' to show it's forbidden
                     # pygame.draw.line(self.screen, (200,50,50), (x+10, y+10), (x+self.sq_size-10, y+self.sq_size-10), 2)
                     # pygame.draw.line(self.screen, (200,50,50), (x+self.sq_size-10, y+10), (x+10, y+self.sq_size-10), 2)
@@ -467,44 +676,23 @@ class RenderingMixin:
                             pygame.draw.rect(self.screen, HIGHLIGHT, (x, y, self.sq_size, self.sq_size))
 
                         if (r, c) in self.valid_moves:
-                            s = pygame.Surface((self.sq_size, self.sq_size), pygame.SRCALPHA)
-
-                            # CHECK: Is this a capture? (Is there a piece on the target square?)
-                            if board[r][c]:
-                                # --- CAPTURE VISUAL (Thick Ring) ---
-                                # We draw a large hollow ring so it's visible AROUND the piece sprite
-                                color = (100, 255, 100, 180)  # Semi-transparent Green
-                                radius = self.sq_size // 2 - 2
-                                thickness = 6
-                                pygame.draw.circle(s, color, (self.sq_size // 2, self.sq_size // 2), radius, thickness)
-                            else:
-                                # --- QUIET MOVE VISUAL (Small Dot) ---
-                                color = (100, 255, 100, 150)
-                                radius = self.sq_size // 6
-                                pygame.draw.circle(s, color, (self.sq_size // 2, self.sq_size // 2), radius)
-
-                            self.screen.blit(s, (x, y))
-
-                    # 2. Duck Placement Highlights (No changes needed here)
+                            # Capture (ring visible AROUND the piece sprite) or quiet move (dot)
+                            self.screen.blit(self.overlays['capture' if board[r][c] else 'quiet'], (x, y))
+
+                    # 2. Duck Placement Highlights
                     elif self.phase == 'move_duck':
                         if board[r][c] is None and (r, c) != prev_d:
-                            s = pygame.Surface((self.sq_size, self.sq_size), pygame.SRCALPHA)
-                            pygame.draw.circle(s, (255, 215, 0, 100), (self.sq_size // 2, self.sq_size // 2),
-                                               self.sq_size // 5)
-                            self.screen.blit(s, (x, y))
+                            self.screen.blit(self.overlays['duck_hint'], (x, y))
 
                 # Draw Pieces
-                if hide_pos and (r, c) == hide_pos: continue
+                if (r, c) in hidden: continue
                 if d_pos == (r, c): self.draw_duck(r, c)
 
                 p = board[r][c]
                 if p:
                     # Check Highlight
-                    if p.type == 'K' and self.is_in_check(p.color, board):
-                        s = pygame.Surface((self.sq_size, self.sq_size))
-                        s.set_alpha(180)
-                        s.fill((235, 60, 60))
-                        self.screen.blit(s, (x, y))
+                    if p.type == 'K' and self.check_status(p.color, board, d_pos):
+                        self.screen.blit(self.overlays['check'], (x, y))
 
                     key = f"{p.color}{p.type}"
                     if key in self.scaled_images:
@@ -513,13 +701,15 @@ class RenderingMixin:
                         # Fallback for missing images
                         txt = UNICODE_PIECES[p.color][p.type]
                         tc = (0, 0, 0) if p.color == 'b' else (255, 255, 255)
-                        sf = self.font_large.render(txt, True, tc)
+                        sf = self.render_text(self.font_large, txt, tc)
                         rc = sf.get_rect(center=(x + self.sq_size // 2, y + self.sq_size // 2))
                         if p.color == 'w':
-                            ol = self.font_large.render(txt, True, (0, 0, 0))
+                            ol = self.render_text(self.font_large, txt, (0, 0, 0))
                             self.screen.blit(ol, ol.get_rect(center=(rc.centerx + 2, rc.centery + 2)))
                         self.screen.blit(sf, rc)
 
+        if is_live: self.draw_animations()
+
         # Dragging Render
         if hasattr(self, 'dragging') and self.dragging and self.drag_piece and is_live:
             mx, my = pygame.mouse.get_pos()
@@ -529,11 +719,15 @@ class RenderingMixin:
 
         if self.show_eval:
             self.draw_eval_bar(board)
-        self.draw_history_panel()
+        if area.colliderect(self.screen_w - self.panel_width, 0, self.panel_width, self.screen_h):
+            self.draw_history_panel()
 
-        # HUD Rendering
-        hud_w = self.screen_w - self.panel_width - 40
-        hud_rect = pygame.Rect(20, self.screen_h - 70, hud_w, 60)
+        hud_rect = pygame.Rect(20, self.screen_h - 70, self.screen_w - self.panel_width - 40, 60)
+        if area.colliderect(hud_rect): self.draw_hud(hud_rect, is_live)
+        if self.promotion_pending and is_live: self.draw_promotion_ui()
+
+    def draw_hud(self, hud_rect, is_live):
+        """Status line and the buttons under the board."""
         self.draw_glass_panel(hud_rect)
 
         if self.game_over:
@@ -548,8 +742,10 @@ class RenderingMixin:
         else:
             status, status_col = f"{'WHITE' if self.turn == 'w' else 'BLACK'} TO {'MOVE PIECE' if self.phase == 'move_piece' else 'PLACE DUCK'}", (
             220, 220, 220)
+        notice = self.current_notice()
+        if notice and not self.game_over: status, status_col = notice.upper(), MENU_ACCENT
 
-        self.screen.blit(self.font_status.render(status, True, status_col), (40, self.screen_h - 50))
+        self.screen.blit(self.render_text(self.font_status, status, status_col), (40, self.screen_h - 50))
 
         # Bottom Buttons
         mouse = pygame.mouse.get_pos()
@@ -569,15 +765,101 @@ class RenderingMixin:
             r.width, r.height, r.x, r.centery = 100, 36, start_x + i * 110, hud_rect.centery
             self.draw_styled_button(r, lbl, r.collidepoint(mouse))
 
-        if self.promotion_pending and is_live: self.draw_promotion_ui()
+    # --- DIRTY-RECTANGLE RENDERING ---
+    def invalidate(self):
+        """Forces a full redraw on the next frame."""
+        self.force_redraw = True
+
+    def game_frame_states(self):
+        """{region key: (screen rect, state tuple)}. A region is redrawn only when its tuple changes."""
+        is_live = (self.view_index == len(self.history) - 1)
+        if is_live:
+            board, d_pos, last_mv, prev_d = self.board, self.duck_pos, self.last_move_arrow, self.prev_duck_pos
+        else:
+            snap = self.history[self.view_index]
+            board, d_pos, last_mv, prev_d = snap['board'], snap['duck_pos'], snap['last_move'], snap['prev_duck']
+        interactive = is_live and not self.promotion_pending
+        mouse = pygame.mouse.get_pos()
+        states = {}
+
+        for r in range(8):
+            for c in range(8):
+                p = board[r][c]
+                sq = (r, c)
+                states[sq] = (pygame.Rect(*self.get_screen_pos(r, c), self.sq_size, self.sq_size),
+                              (p.color + p.type if p else None, d_pos == sq, bool(last_mv) and sq in last_mv,
+                               prev_d == sq, interactive and self.phase, interactive and self.selected_square == sq,
+                               interactive and sq in self.valid_moves))
+
+        # Things that float above the board are rare; they just repaint everything
+        if self.dragging or (self.promotion_pending and is_live) or (self.animations and is_live):
+            states['overlay'] = (self.screen.get_rect(), (mouse, self.promotion_pending,
+                                                          tuple(a.elapsed for a in self.animations)))
+
+        if self.show_eval:
+            states['eval'] = (self.eval_bar_rect(), (self.current_eval_score, self.game_over, self.winner))
+
+        self.follow_view_index()
+        analysis = self.show_analysis and (self.analysis.fen, (self.analysis.info() or {}).get('nodes'))
+        panel = pygame.Rect(self.screen_w - self.panel_width, 0, self.panel_width, self.screen_h)
+        states['history'] = (panel, (self.view_index, id(self.history), len(self.history), len(self.move_log),
+                                     self.history_scroll, self.variation_label(), self.show_explorer,
+                                     analysis,
+                                     tuple(b.collidepoint(mouse) for b in self.nav_btns.values())))
+
+        if self.game_clock.timed:
+            rects = self.clock_rects()
+            states['clocks'] = (rects['w'].union(rects['b']),
+                                (format_clock(self.time_left('w')), format_clock(self.time_left('b')),
+                                 self.turn, self.game_over))
+
+        hud_btns = (self.menu_btn_rect, self.eval_btn_rect, self.flip_btn_rect, self.restart_btn_rect)
+        states['hud'] = (pygame.Rect(20, self.screen_h - 70, self.screen_w - self.panel_width - 40, 60),
+                         (is_live, self.game_over, self.winner, self.promotion_pending, self.turn, self.phase,
+                          self.show_eval, self.current_notice(), tuple(b.collidepoint(mouse) for b in hud_btns)))
+
+        states['layout'] = (self.screen.get_rect(), (self.player_side, self.sq_size, self.game_mode))
+        return states
+
+    def render_game_frame(self):
+        """Draws and presents only the regions whose state changed. Returns False on idle frames."""
+        states = self.game_frame_states()
+        prev, self.frame_states = self.frame_states, states
+        if self.force_redraw or prev is None or prev.keys() != states.keys():
+            dirty_keys = ['layout']
+        else:
+            dirty_keys = [key for key, (rect, state) in states.items() if prev[key][1] != state]
+        self.force_redraw = False
+        if not dirty_keys: return False
+
+        # A moved piece can change the check tint on either King's square (square keys are (r, c))
+        if any(isinstance(key, tuple) for key in dirty_keys):
+            dirty_keys += [key for key, (rect, state) in states.items()
+                           if isinstance(key, tuple) and state[0] in ('wK', 'bK')]
+        dirty = [states[key][0] for key in dirty_keys]
+
+        self.screen.set_clip(dirty[0].unionall(dirty[1:]))
+        self.draw_game()
+        self.screen.set_clip(None)
+        pygame.display.update(dirty)
+        return True
+
+    def render_static_frame(self, draw, had_events):
+        """Menu and editor only change on input, so without events nothing is drawn."""
+        if not had_events and not self.force_redraw: return False
+        self.force_redraw = False
+        self.frame_states = None
+        draw()
+        pygame.display.flip()
+        return True
 
     def draw_menu(self):
         self.draw_menu_background()
 
         # Title
-        t_shadow = self.font_menu_title.render("DUCK CHESS", True, (0, 0, 0))
+        t_shadow = self.render_text(self.font_menu_title, "DUCK CHESS", (0, 0, 0))
         self.screen.blit(t_shadow, t_shadow.get_rect(center=(self.screen_w // 2 + 3, self.screen_h * 0.2 + 3)))
-        t_main = self.font_menu_title.render("DUCK CHESS", True, MENU_ACCENT)
+        t_main = self.render_text(self.font_menu_title, "DUCK CHESS", MENU_ACCENT)
         self.screen.blit(t_main, t_main.get_rect(center=(self.screen_w // 2, self.screen_h * 0.2)))
 
         # Menu Panel
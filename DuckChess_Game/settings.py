@@ -2,6 +2,10 @@
 DEFAULT_WIDTH = 1050
 DEFAULT_HEIGHT = 650
 FPS = 60
+# Idle frames: with nothing moving, the loop sleeps until input arrives (waking at least this often)
+IDLE_WAIT_MS = 1000
+IDLE_POLL_MS = 20  # Event polling interval while other asyncio tasks share the loop
+RESIZE_DEBOUNCE_MS = 120  # The layout is rebuilt once the window size has been stable this long
 
 # --- COLORS ---
 WHITE_COLOR = (235, 236, 208)
@@ -55,7 +59,128 @@ BTN_TEXT = (240, 240, 240)
 
 # --- ANIMATION & SOUND ---
 ANIMATION_SPEED = 150  # Duration in milliseconds (Lower = Faster)
-ANIMATION_FPS = 60
+
+# Rendered text surfaces kept by RenderingMixin.render_text (LRU)
+TEXT_CACHE_SIZE = 512
+# Scaled piece sets kept by RenderingMixin.get_piece_sprites, one per square size (LRU)
+SPRITE_CACHE_SIZES = 4
+# Fonts kept by RenderingMixin.get_font, keyed by size; a window layout uses 9 (LRU)
+FONT_CACHE_SIZE = 32
 
 # Default Volume (0.0 to 1.0)
-SOUND_VOLUME = 0.6
\ No newline at end of file
+SOUND_VOLUME = 0.6
+
+# --- GAME HISTORY ---
+HISTORY_KEYFRAME_INTERVAL = 32  # Full board every N plies, square deltas in between
+HISTORY_CACHE_SIZE = 16  # Rebuilt past positions kept for browsing (LRU)
+
+# --- DERIVED POSITION FACTS ---
+DERIVED_CACHE_SIZE = 256  # Positions whose legal moves / check / material are kept (LRU)
+
+# --- CLOCKS / TIME MANAGEMENT ---
+TIME_CONTROL = None  # e.g. "5+3" (minutes + increment in seconds) or "10/move"; None plays untimed
+AI_MOVE_DELAY_MS = 400  # Untimed games only: pause before an AI move so it can be followed
+TM_SAFETY_MS = 150  # Never budgeted: covers frames, animation and the last search batch overshooting
+TM_MOVES_TO_GO = 40  # Moves the remaining clock is spread over at the start of a game
+TM_MIN_MOVES_TO_GO = 12
+TM_INCREMENT_SHARE = 0.8  # Part of the increment spent on the move that earns it
+TM_MAX_STRETCH = 3.0  # Hard budget: at most this multiple of the soft one...
+TM_MAX_SHARE = 0.25  # ...and at most this share of the clock (plus the increment)
+TM_MOVE_LIMIT_SHARE = 0.5  # Per-move limits: soft target as a share of the limit
+TM_FORCED_MS = 50  # Budget when there is a single legal piece move
+TM_STABLE_CHECKS = 8  # Search progress checks with an unchanged best move before it counts as stable
+TM_STABLE_SCALE = 0.6  # Stable best move: stop at this share of the soft budget
+TM_UNSTABLE_SCALE = 1.5  # Best move still changing: allow this multiple of soft (capped by hard)
+
+# --- BACKGROUND ANALYSIS (A key) ---
+ANALYSIS_MULTIPV = 3  # Lines shown in the analysis panel
+ANALYSIS_FIRST_ROUND = 16  # Search iterations in the first round; every round doubles it
+ANALYSIS_MAX_NODES = 1000000  # Tree size at which a position counts as fully analysed
+ANALYSIS_PV_LENGTH = 8  # Plies per shown line
+ANALYSIS_LINE_CHARS = 30  # Line text is cut to fit the panel
+ANALYSIS_CACHE_SIZE = 256  # Analysed positions kept for browsing back and forth (LRU)
+ANALYSIS_NICE = 10  # Worker process priority (POSIX nice increment); the window always comes first
+ANALYSIS_POLL_MS = 100  # Longest an idle frame sleeps while results are still coming in
+
+# --- AI / SEARCH ---
+AI_ENGINE = 'duck_ai'  # 'duck_ai' (in-process DuckAI), 'mcts' or 'external' (engine process, see ENGINE_*)
+MCTS_C_PUCT = 1.5
+MCTS_BATCH_SIZE = 16  # Leaves sent to the evaluator per call
+MCTS_VIRTUAL_LOSS = 1.0
+MCTS_MAX_NODES = 300000
+MCTS_MOVE_TIME = 1000  # ms per move when no other limit is given
+MCTS_INFO_MS = 250  # Progress callback interval (engine protocol 'info' lines)
+
+# --- ENGINE PROCESS (engine_protocol.py, AI_ENGINE = 'external') ---
+ENGINE_COMMAND = None  # Engine command line (string or list); None runs engine_protocol.py with ENGINE_CONFIG
+ENGINE_CONFIG = {'engine': 'mcts'}  # match.build_engine config for the built-in engine server
+ENGINE_NICE = 5  # POSIX nice increment of the engine process
+ENGINE_CORES = None  # CPU numbers the engine may run on (e.g. {1, 2, 3}); None = all
+ENGINE_START_TIMEOUT_MS = 10000  # Longest wait for uciok / readyok, and for bestmove after 'stop'
+ENGINE_GRACE_MS = 2000  # Extra wait for bestmove beyond the move time before sending 'stop'
+ENGINE_NOTICE_MS = 6000  # How long the HUD shows that a failed engine was replaced by the built-in AI
+
+# --- SHARED INFERENCE SERVER ---
+INFERENCE_MAX_BATCH = 256  # Positions per model call
+INFERENCE_MAX_WAIT_MS = 2  # Longest a request waits for the batch to fill
+INFERENCE_AUTHKEY = None  # Shared connection secret (bytes); None uses a key file in $XDG_RUNTIME_DIR or ~/.cache
+
+# --- GAME SERVER (game_server.py) ---
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8765
+SERVER_ENGINE = {'engine': 'mcts', 'max_nodes': 50000}  # match.build_engine config of the AI workers
+SERVER_AI_MOVE_MS = 100  # Search time per AI ply while the job queue is short
+SERVER_AI_MIN_MS = 10  # Search time floor when the queue is long
+SERVER_WORKER_NICE = 5  # AI workers yield to the event loop process
+SERVER_MAX_SESSIONS = 10000  # 'new' is refused beyond this
+SERVER_MAX_QUEUE = 16  # Queued AI plies per worker beyond which 'new' is refused (busy)
+SERVER_LATENCY_TARGET_MS = 1000  # 'new' is also refused while AI replies average more than this
+SERVER_MAX_PLIES = 400  # Longer games are drawn, which bounds a session's memory
+SERVER_IDLE_TIMEOUT_S = 1800  # Sessions without requests for this long are dropped
+SERVER_MAX_INFLIGHT = 1024  # Unanswered requests per connection before the server stops reading it
+SERVER_LINE_LIMIT = 65536  # Longest request line in bytes
+SERVER_LATENCY_WINDOW = 10000  # Recent moves the p50/p99 figures are taken over
+SERVER_DERIVED_CACHE_SIZE = 4  # Per-session derived-state cache (the window uses DERIVED_CACHE_SIZE)
+
+# --- ENGINE MATCHES ---
+MATCH_MAX_PLIES = 400  # Adjudicated as a draw beyond this
+
+# --- BENCHMARKS (bench.py) ---
+BENCH_SAMPLES = 15  # Timed samples per benchmark and position set
+BENCH_MIN_SAMPLE_MS = 20  # Calls are repeated until one sample takes about this long
+BENCH_TOLERANCE = 0.10  # Slowdown against the baseline that counts as a regression (beyond the noise)
+BENCH_BASELINE = "bench_baseline.json"  # Relative to the game folder; written with --save-baseline
+BENCH_SEARCH_ITERATIONS = 64  # MCTS iterations per timed search
+
+# --- SOAK TEST (soak.py) ---
+SOAK_PLIES = 5000  # Plies per run
+SOAK_GAME_PLIES = 200  # A game is restarted after this many plies (or when it ends)
+SOAK_SAMPLE_PLIES = 100  # Plies between timeline samples
+SOAK_WARMUP_PLIES = 1000  # Growth and drift are measured from here on (the LRU caches fill up first)
+SOAK_STUCK_FRAMES = 600  # Frames without a ply before the game is restarted anyway
+SOAK_TRACE_FRAMES = 1  # tracemalloc traceback depth
+SOAK_TOP_ALLOCATORS = 15  # Allocation sites listed in the report
+SOAK_MAX_RSS_GROWTH_MB = 20
+SOAK_MAX_HEAP_GROWTH_MB = 5
+SOAK_MAX_LEAK_KB_PER_KPLY = 64  # Growth of the heap measured straight after restarts
+SOAK_MIN_RESTARTS = 4  # Restarts after the warm-up needed to fit that growth; fewer skip the check
+SOAK_MAX_FRAME_DRIFT = 0.25  # Allowed slowdown of the median frame, last quarter of the run against the first
+SOAK_MAX_PLY_DRIFT = 0.25
+SOAK_REPORT = "soak_report.json"  # Relative to the game folder
+
+# --- GAME RECORDS ---
+RECORD_CHUNK_SIZE = 200  # Games handed to a validation worker at a time
+
+# --- POSITION INDEX / OPENING EXPLORER ---
+INDEX_CHUNK_GAMES = 5000  # Games per freshly built segment
+INDEX_MAX_SEGMENTS = 8  # Smallest segments are merged beyond this
+EXPLORER_INDEX_DIR = None  # Directory of a PositionIndex; enables the explorer panel
+EXPLORER_ROWS = 5
+
+# --- DIAGRAMS ---
+DIAGRAM_SQUARE_SIZE = 64  # Pixels per square in diagram.py output
+
+# --- AUTOSAVE JOURNAL ---
+JOURNAL_PATH = "autosave.journal"  # Relative to the game folder; None disables autosave and resume
+JOURNAL_ARCHIVE = "autosave_games.pgn"  # Finished journals are compacted into this game-record file
+JOURNAL_SYNC_MS = 250  # Plies written within this window share one fsync
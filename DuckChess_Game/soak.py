@@ -0,0 +1,222 @@
+"""
+Soak test: drives the real DuckChess window off screen through thousands of AI-vs-AI plies,
+restarting games as a kiosk would, and watches memory and timing for slow growth.
+
+    python soak.py --plies 5000 --game-plies 200 --report soak_report.json
+
+Every SOAK_SAMPLE_PLIES plies the harness records RSS, the tracemalloc heap, and the median frame
+and ply time since the previous sample. The heap is also recorded straight after every restart,
+when a game's structures should all be gone. At the end it writes a JSON report with the timeline,
+the allocators that grew most, and pass/fail checks against the SOAK_* limits. A failed check
+makes the exit status 1; a check the run was too short for is reported as skipped.
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import gc
+import sys
+import json
+import time
+import argparse
+import statistics
+import tracemalloc
+from settings import *
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def rss_mb():
+    """Resident set size of this process (peak RSS where /proc is missing)."""
+    try:
+        with open('/proc/self/statm') as f: pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def slope(xs, ys):
+    """Least-squares slope of ys over xs (0.0 with fewer than two points)."""
+    if len(xs) < 2: return 0.0
+    mx, my = statistics.fmean(xs), statistics.fmean(ys)
+    var = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var if var else 0.0
+
+
+def window_median(values):
+    return statistics.median(values) if values else 0.0
+
+
+class SoakRun:
+    """One soak session on a DuckChess window; run() plays, report() judges."""
+
+    def __init__(self, plies, game_plies=SOAK_GAME_PLIES, sample_plies=SOAK_SAMPLE_PLIES,
+                 warmup_plies=SOAK_WARMUP_PLIES, trace=True):
+        from main import DuckChess
+        self.plies = plies
+        self.game_plies = game_plies
+        self.sample_plies = sample_plies
+        self.warmup_plies = warmup_plies
+        self.trace = trace
+        self.game = DuckChess(autosave=False)
+        self.game.state, self.game.game_mode = 'game', 'pvp'
+        self.samples = []  # Timeline, one dict per SOAK_SAMPLE_PLIES plies
+        self.restart_heap = []  # (ply, heap MB) straight after each restart
+        self.frame_ms, self.ply_ms = [], []  # Since the last sample
+        self.base_snapshot = None
+        self.games = 0
+
+    def heap_mb(self):
+        return tracemalloc.get_traced_memory()[0] / 2 ** 20 if self.trace else 0.0
+
+    def frame(self):
+        """One main-loop game frame. Returns (logic ms, render ms or None when nothing was drawn)."""
+        g = self.game
+        # Both sides are the AI, and the human-pacing delay is skipped
+        g.waiting_for_ai = not g.game_over
+        g.ai_wait_start = -AI_MOVE_DELAY_MS
+        t0 = time.perf_counter()
+        g.update_clock()
+        g.ai_turn()
+        if g.promotion_pending: g.promote_pawn(QUEEN)
+        g.update_analysis()
+        g.update_animations(g.frame_dt)
+        t1 = time.perf_counter()
+        drawn = g.render_game_frame()
+        t2 = time.perf_counter()
+        return 1000 * (t1 - t0), 1000 * (t2 - t1) if drawn else None
+
+    def restart(self):
+        self.game.reset_game_state()
+        self.games += 1
+        gc.collect()
+        if self.trace: self.restart_heap.append((self.total_plies, self.heap_mb()))
+
+    def run(self, progress=None):
+        g = self.game
+        g.frame_dt = 1000 // FPS  # Simulated frame time, so tweens finish in a few frames
+        if self.trace: tracemalloc.start(SOAK_TRACE_FRAMES)
+        self.total_plies = game_start = 0
+        pending, idle = 0.0, 0  # Logic ms and frames since the last completed ply
+        t_start = time.perf_counter()
+        while self.total_plies < self.plies:
+            if g.game_over or len(g.history) - 1 >= self.game_plies or idle > SOAK_STUCK_FRAMES:
+                self.restart()
+                pending, idle = 0.0, 0
+                game_start = self.total_plies
+
+            before = len(g.history)
+            logic, render = self.frame()
+            if render is not None: self.frame_ms.append(render)
+            pending += logic
+            if len(g.history) == before:
+                idle += 1
+                continue
+
+            self.ply_ms.append(pending)
+            pending, idle = 0.0, 0
+            self.total_plies += 1
+            if self.total_plies == self.warmup_plies:
+                gc.collect()
+                if self.trace: self.base_snapshot = tracemalloc.take_snapshot()
+            if self.total_plies % self.sample_plies == 0:
+                self.samples.append({'ply': self.total_plies, 'time_s': time.perf_counter() - t_start,
+                                     'games': self.games, 'game_ply': self.total_plies - game_start,
+                                     'rss_mb': rss_mb(), 'heap_mb': self.heap_mb(),
+                                     'frame_ms': window_median(self.frame_ms), 'ply_ms': window_median(self.ply_ms),
+                                     'frames': len(self.frame_ms)})
+                self.frame_ms, self.ply_ms = [], []
+                if progress: progress(self.samples[-1])
+
+        top = []
+        if self.trace:
+            gc.collect()
+            snapshot = tracemalloc.take_snapshot()
+            if self.base_snapshot is not None:
+                for stat in snapshot.compare_to(self.base_snapshot, 'lineno')[:SOAK_TOP_ALLOCATORS]:
+                    top.append({'where': str(stat.traceback), 'size_kb': stat.size / 1024,
+                                'growth_kb': stat.size_diff / 1024, 'count_growth': stat.count_diff})
+            tracemalloc.stop()
+        return self.report(top)
+
+    def report(self, top):
+        """Timeline, top allocators and the checks (each with value, limit, ok, and why it was skipped if it was)."""
+        steady = [s for s in self.samples if s['ply'] > self.warmup_plies]
+        checks = []
+
+        def check(name, value, limit, unit):
+            checks.append({'check': name, 'value': round(value, 3), 'limit': limit, 'unit': unit,
+                           'ok': value <= limit, 'skipped': None})
+
+        def skip(name, limit, unit, why):
+            # Too short a run proves nothing either way: reported, but it cannot fail the run
+            checks.append({'check': name, 'value': None, 'limit': limit, 'unit': unit, 'ok': True, 'skipped': why})
+
+        if len(steady) < 2:
+            why = f"{len(steady)} samples after the warm-up, 2 needed"
+            skip('rss_growth', SOAK_MAX_RSS_GROWTH_MB, 'MB', why)
+            skip('frame_ms_drift', SOAK_MAX_FRAME_DRIFT, 'ratio', why)
+            skip('ply_ms_drift', SOAK_MAX_PLY_DRIFT, 'ratio', why)
+        else:
+            first, last = steady[0], steady[-1]
+            check('rss_growth', last['rss_mb'] - first['rss_mb'], SOAK_MAX_RSS_GROWTH_MB, 'MB')
+            # Compare the first and last quarter of the run, so one slow sample cannot fail it
+            k = max(1, len(steady) // 4)
+            for key, limit in (('frame_ms', SOAK_MAX_FRAME_DRIFT), ('ply_ms', SOAK_MAX_PLY_DRIFT)):
+                early = window_median([s[key] for s in steady[:k]])
+                late = window_median([s[key] for s in steady[-k:]])
+                check(f'{key}_drift', late / early - 1 if early else 0.0, limit, 'ratio')
+        # The fit starts at the first restart after the warm-up, when the caches are already full
+        restarts = [(ply, mb) for ply, mb in self.restart_heap if ply >= self.warmup_plies]
+        unit = 'KB per 1000 plies'
+        if self.trace and len(restarts) >= SOAK_MIN_RESTARTS:
+            # The heap after a restart should not depend on how many games came before
+            per_kply = 1000 * 1024 * slope([p for p, _ in restarts], [mb for _, mb in restarts])
+            check('heap_leak_after_restart', per_kply, SOAK_MAX_LEAK_KB_PER_KPLY, unit)
+        elif self.trace:
+            skip('heap_leak_after_restart', SOAK_MAX_LEAK_KB_PER_KPLY, unit,
+                 f"{len(restarts)} restarts after the warm-up, {SOAK_MIN_RESTARTS} needed")
+        if self.trace and len(steady) >= 2:
+            check('heap_growth', steady[-1]['heap_mb'] - steady[0]['heap_mb'], SOAK_MAX_HEAP_GROWTH_MB, 'MB')
+        elif self.trace:
+            skip('heap_growth', SOAK_MAX_HEAP_GROWTH_MB, 'MB', f"{len(steady)} samples after the warm-up, 2 needed")
+
+        return {'plies': self.total_plies, 'games': self.games, 'tracemalloc': self.trace,
+                'samples': self.samples, 'restart_heap_mb': self.restart_heap, 'top_allocators': top,
+                'checks': checks, 'passed': all(c['ok'] for c in checks)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Duck Chess long-session soak test")
+    parser.add_argument('--plies', type=int, default=SOAK_PLIES, help="total plies to play")
+    parser.add_argument('--game-plies', type=int, default=SOAK_GAME_PLIES, help="restart a game after this many")
+    parser.add_argument('--sample', type=int, default=SOAK_SAMPLE_PLIES, help="plies between samples")
+    parser.add_argument('--warmup', type=int, default=SOAK_WARMUP_PLIES, help="plies before the baseline")
+    parser.add_argument('--no-tracemalloc', action='store_true', help="faster and undistorted timings, no heap data")
+    parser.add_argument('--report', default=os.path.join(HERE, SOAK_REPORT))
+    args = parser.parse_args()
+
+    def progress(s):
+        print(f"ply {s['ply']:>6}  games {s['games']:>4}  rss {s['rss_mb']:7.1f} MB  heap {s['heap_mb']:7.2f} MB  "
+              f"frame {s['frame_ms']:6.2f} ms  ply {s['ply_ms']:6.2f} ms")
+
+    run = SoakRun(args.plies, args.game_plies, args.sample, args.warmup, trace=not args.no_tracemalloc)
+    report = run.run(progress)
+    with open(args.report, 'w', encoding='utf-8') as f: json.dump(report, f, indent=1)
+
+    for entry in report['top_allocators'][:5]:
+        print(f"  {entry['growth_kb']:+9.1f} KB  {entry['where']}")
+    for c in report['checks']:
+        if c['skipped']:
+            print(f"skip {c['check']:<24}{'-':>10} ({c['skipped']})")
+        else:
+            print(f"{'ok  ' if c['ok'] else 'FAIL'} {c['check']:<24}{c['value']:>10} (limit {c['limit']} {c['unit']})")
+    print(f"Report written to {args.report}")
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Background analysis survives its worker process dying."""
+import time
+
+from analysis import BackgroundAnalysis
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+OTHER = "rnbqkbnr/pppp1ppp/8/4p3/4P3/4*3/PPPP1PPP/RNBQKBNR w KQkq e6 0 2"
+
+
+def wait_for_info(analysis, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        analysis.poll()
+        if analysis.info(): return analysis.info()
+        time.sleep(0.05)
+    return None
+
+
+def test_follow_and_stop_after_the_worker_died():
+    analysis = BackgroundAnalysis(max_nodes=2000)
+    try:
+        analysis.follow(START)
+        assert wait_for_info(analysis)
+        analysis.process.kill()
+        analysis.process.join()
+
+        analysis.stop()
+        assert analysis.fen is None
+        analysis.follow(OTHER)
+        assert analysis.process is not None and analysis.process.is_alive()
+        assert wait_for_info(analysis)['nodes'] > 0
+    finally:
+        analysis.close()
@@ -0,0 +1,49 @@
+"""AnalysisTree variations, and the window's game and clock following a switch between them."""
+from analysis_tree import AnalysisTree
+from clock import ChessClock
+from main import DuckChess
+
+E4 = ((6, 4), (4, 4), (2, 2))
+D4 = ((6, 3), (4, 3), (2, 2))
+E5 = ((1, 4), (3, 4), (5, 4))
+
+
+def test_add_reuses_moves_and_branches_new_ones():
+    tree = AnalysisTree()
+    e4 = tree.add(tree.root, E4, 'P', "e4")
+    assert tree.add(tree.root, E4, 'P', "again") is e4 and e4.label == "e4"
+    d4 = tree.add(tree.root, D4, 'P', "d4")
+    e5 = tree.add(e4, E5, 'P', "e5")
+    assert tree.size == 4 and tree.siblings(d4) == [e4, d4] and tree.siblings(tree.root) == [tree.root]
+    assert tree.path(e5) == [tree.root, e4, e5] and tree.line_through(tree.root) == [tree.root, e4, e5]
+
+
+def test_promote_and_remove():
+    tree = AnalysisTree()
+    e4 = tree.add(tree.root, E4, 'P', "e4")
+    d4 = tree.add(tree.root, D4, 'P', "d4")
+    d4e5 = tree.add(d4, E5, 'P', "e5")
+    tree.promote(d4e5)
+    assert tree.line_through(tree.root) == [tree.root, d4, d4e5]
+    tree.remove(d4)
+    assert tree.size == 2 and tree.root.children == [e4]
+    tree.remove(tree.root)
+    assert tree.size == 2
+
+
+def test_switching_variation_rebuilds_the_clock():
+    window = DuckChess(autosave=False)
+    window.game_clock = ChessClock.parse("1+0")
+    tree = window.tree
+    e4 = tree.add(tree.root, E4, 'P', "")
+    e4.spent = 1000
+    tree.add(e4, E5, 'P', "").spent = 3000
+    d4 = tree.add(tree.root, D4, 'P', "")
+    d4.spent = 5000
+    tree.add(d4, E5, 'P', "").spent = 7000
+    window.load_line(tree.line_through(e4), journal=False)
+    assert window.game_clock.time_left('w') == 59000 and window.game_clock.time_left('b') == 57000
+    window.view_index = 1
+    window.switch_variation(1)
+    assert window.line[1] is d4 and window.game_clock.spec == "1+0"
+    assert window.game_clock.time_left('w') == 55000 and window.game_clock.time_left('b') == 53000
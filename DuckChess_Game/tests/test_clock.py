@@ -0,0 +1,56 @@
+"""Clocks and the search budgets TimeManager derives from them."""
+import pytest
+
+from clock import ChessClock, TimeManager, format_clock
+from settings import TM_FORCED_MS, TM_SAFETY_MS
+
+
+@pytest.mark.parametrize('time_left, increment, move_number', [
+    (250, 3000, 1), (1000, 2000, 30), (60000, 0, 1), (5000, 5000, 80), (100, 0, 10), (0, 1000, 5),
+])
+def test_budget_never_passes_the_time_left(time_left, increment, move_number):
+    soft, hard = TimeManager().budget(time_left, increment, move_number=move_number, choices=20)
+    assert 0 <= soft <= hard <= max(0, time_left - TM_SAFETY_MS)
+
+
+def test_large_increment_with_little_time_left():
+    assert TimeManager().budget(250, 3000) == (100, 100)
+
+
+def test_budget_grows_with_the_clock_and_the_increment():
+    tm = TimeManager()
+    assert tm.budget(60000)[0] < tm.budget(120000)[0]
+    assert tm.budget(60000)[0] < tm.budget(60000, increment=2000)[0]
+    soft, hard = tm.budget(60000, increment=2000)
+    assert soft < hard
+
+
+def test_move_limit_and_forced_moves():
+    tm = TimeManager()
+    soft, hard = tm.budget(10000, move_limit=10000)
+    assert hard == 10000 - TM_SAFETY_MS and soft < hard
+    assert tm.budget(60000, choices=1) == (TM_FORCED_MS, TM_FORCED_MS)
+    assert tm.budget(100, choices=1) == (0, 0)
+
+
+def test_should_stop_never_passes_hard():
+    tm = TimeManager()
+    assert tm.should_stop(500, 100, 500, 0)
+    assert not tm.should_stop(120, 100, 500, 0)  # Best move still changing: may run past soft
+    assert tm.should_stop(90, 100, 500, 100)  # Stable: stops before soft
+
+
+def test_clock_parse_and_charge():
+    clock = ChessClock.parse("1+2")
+    assert clock.timed and clock.spec == "1+2"
+    clock.charge('w', 5000)
+    assert clock.time_left('w') == 57000 and clock.time_left('b', 1000) == 59000
+    per_move = ChessClock.parse("3/move")
+    per_move.charge('b', 2500)
+    assert per_move.time_left('b') == 3000
+    assert not ChessClock.parse(None).timed and ChessClock.parse("").time_left('w') is None
+    with pytest.raises(ValueError): ChessClock.parse("fast")
+
+
+def test_format_clock():
+    assert format_clock(245000) == "4:05" and format_clock(8300) == "8.3" and format_clock(-5) == "0.0"
@@ -0,0 +1,40 @@
+"""Derived-state cache: cached moves, check and material always match a fresh computation."""
+import random
+
+from headless import HeadlessGame
+
+
+def fresh_moves(game):
+    return {(r, c): moves for r in range(8) for c in range(8)
+            if game.board[r][c] and game.board[r][c].color == game.turn
+            for moves in [game.get_piece_legal_moves(r, c)] if moves}
+
+
+def test_cached_facts_match_a_fresh_computation():
+    rng = random.Random(3)
+    for _ in range(5):
+        game = HeadlessGame()
+        game.derived_cache_size = 8
+        while not game.game_over and len(game.history) < 120:
+            assert game.legal_move_map() == fresh_moves(game)
+            assert game.has_legal_move() == bool(fresh_moves(game))
+            for color in ('w', 'b'): assert game.check_status(color) == game.is_in_check(color)
+            assert game.material_score() == game.calculate_material_score(game.board)
+            game.apply_action(rng.choice(game.legal_actions()))
+        assert len(game.derived_cache) <= 8
+
+
+def test_castling_rights_are_part_of_the_key():
+    game = HeadlessGame.from_fen("4k3/8/8/8/8/8/8/4K2R w K - 0 1")
+    assert (7, 6) in game.legal_move_map()[(7, 4)]
+    moved = HeadlessGame.from_fen("4k3/8/8/8/8/8/8/4K2R w - - 0 1")
+    moved.derived_cache = game.derived_cache  # Same pieces, duck and side to move; only the rights differ
+    assert (7, 6) not in moved.legal_move_map()[(7, 4)]
+
+
+def test_hypothetical_boards_do_not_touch_the_live_position():
+    game = HeadlessGame.from_fen("4k3/8/8/8/8/8/8/4K2R w K - 0 1")
+    board = [row[:] for row in game.board]
+    board[0][7], board[7][7] = board[7][7], None
+    assert game.check_status('b', board) and not game.check_status('b')
+    assert game.material_score(board) == game.material_score()
@@ -0,0 +1,16 @@
+"""Batch diagram rendering: a failing job is reported and the rest of the batch is still written."""
+from diagram import render_jobs
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+def test_bad_jobs_are_reported_and_the_batch_keeps_going(tmp_path):
+    good = tmp_path / "good.png"
+    jobs = [('fen', START.replace(" - ", " e "), str(tmp_path / "bad_ep.png")),
+            ('fen', START, str(tmp_path / "missing" / "dir.png")),
+            ('game', '[Event "Duck Chess"]\n\n1. e5@e6 *\n', str(tmp_path / "illegal")),
+            ('fen', START, str(good))]
+    images, errors = render_jobs(jobs, workers=1)
+    assert images == 1 and good.exists()
+    assert sorted(err.split(":")[0] for err in errors) == sorted(str(tmp_path / name)
+                                                                for name in ("bad_ep.png", "missing/dir.png", "illegal"))
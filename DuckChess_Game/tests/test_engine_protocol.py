@@ -0,0 +1,100 @@
+"""Engine protocol replies for bad input, and how matches treat engines that misbehave."""
+import io
+import sys
+
+import pytest
+
+from engine_protocol import EngineClient, EngineServer, RemoteEngine, default_command
+from headless import HeadlessGame
+from match import choose_action, play_game, play_ply
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+def scripted_engine(on_go):
+    """Command line of a minimal protocol engine that runs `on_go` (Python source) when told to go."""
+    source = ("import sys\n"
+              "for line in sys.stdin:\n"
+              "    cmd = line.split()[0] if line.split() else ''\n"
+              "    if cmd == 'uci': print('uciok', flush=True)\n"
+              "    elif cmd == 'isready': print('readyok', flush=True)\n"
+              "    elif cmd == 'quit': break\n"
+              f"    elif cmd == 'go': {on_go}\n")
+    return [sys.executable, '-c', source]
+
+
+def match_job(config_a, config_b={'engine': 'duck_ai', 'depth': 1}):
+    return 0, START, config_a, config_b, True, 20, None
+
+
+class FixedEngine:
+    def __init__(self, action):
+        self.action = action
+        self.last_info = {}
+
+    def search(self, game, budget=None):
+        return self.action
+
+
+def test_go_after_a_rejected_position_has_no_move():
+    out = io.StringIO()
+    server = EngineServer(FixedEngine(None), out)
+    server.handle("position startpos moves e2e4@e6")
+    server.handle("position startpos moves e2e5@e6")
+    server.handle("go movetime 10")
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith("info string e2e5@e6")
+    assert lines[-1] == "bestmove (none)"
+
+
+def test_illegal_search_move_forfeits_and_leaves_the_position():
+    game = HeadlessGame()
+    play_ply(FixedEngine(((7, 4), (4, 4), (3, 3))), game)
+    assert game.game_over and game.winner == 'b' and game.end_reason == 'illegal move'
+    assert game.generate_fen() == START
+
+
+def test_illegal_bestmove_from_an_engine_process_forfeits():
+    result = play_game(match_job({'engine': 'external', 'command': scripted_engine(
+        "print('bestmove a8a3@d5', flush=True)")}))
+    assert result['score'] == 0.0 and result['reason'] == 'illegal move'
+
+
+def test_engine_that_dies_mid_game_loses():
+    result = play_game(match_job({'engine': 'duck_ai', 'depth': 1},
+                                 {'engine': 'external', 'command': scripted_engine("sys.exit(1)")}))
+    assert result['score'] == 1.0 and result['reason'] == 'engine failure' and result['plies'] == 1
+
+
+def test_engine_that_fails_to_start_loses():
+    result = play_game(match_job({'engine': 'external', 'command': [sys.executable, '-c', 'pass']}))
+    assert result['score'] == 0.0 and result['reason'] == 'engine failure' and result['plies'] == 0
+
+
+def test_promotion_named_by_an_engine_process_is_played():
+    engine = RemoteEngine(command=scripted_engine("print('bestmove e7e8n@a3', flush=True)"), move_time=10)
+    try:
+        game = HeadlessGame.from_fen("7k/4P3/8/8/8/8/8/K7 w - - 0 1")
+        assert choose_action(engine, game) == (((1, 4), (0, 4), (5, 0)), 'N')
+        play_ply(engine, game)
+        assert game.board[0][4].type == 'N' and game.duck_pos == (5, 0)
+    finally:
+        engine.close()
+
+
+def test_engine_process_answers_a_bad_fen_without_a_move():
+    client = EngineClient(default_command({'engine': 'duck_ai', 'depth': 1}))
+    try:
+        assert client.go("position fen garbage", {'movetime': 10}, 5000) is None
+        action, promotion = client.go("position startpos", {'movetime': 10}, 5000)
+        assert HeadlessGame().legal_move_map().get(action[0]) and promotion is None
+    finally:
+        client.close()
+
+
+def test_position_fen_is_split_at_moves():
+    short = EngineServer.parse_position(["fen", *START.split()[:4], "moves", "e2e4@e6"])
+    full = EngineServer.parse_position(["fen", *START.split(), "moves", "e2e4@e6"])
+    assert short.generate_fen() == full.generate_fen()
+    assert full.generate_fen().startswith("rnbqkbnr/pppppppp/4*3/8/4P3/8/PPPP1PPP/RNBQKBNR b")
+    with pytest.raises(ValueError): EngineServer.parse_position(["fen", *START.split(), "0", "moves", "e2e4@e6"])
@@ -0,0 +1,40 @@
+"""GameHistory: positions rebuilt from deltas and keyframes match the boards that were appended."""
+import random
+
+import pytest
+
+from game_history import GameHistory
+from headless import HeadlessGame
+
+
+def snapshot(game):
+    return [[p.color + p.type if p else None for p in row] for row in game.board], game.duck_pos, game.turn
+
+
+@pytest.mark.parametrize('interval', [1, 3, 16])
+def test_every_ply_rebuilds_the_appended_position(interval):
+    history = GameHistory(keyframe_interval=interval, cache_size=4)
+    rng, game = random.Random(7), HeadlessGame()
+    expected = []
+    for _ in range(60):
+        history.append(game.board, game.duck_pos, game.turn, game.prev_duck_pos, game.last_move_arrow)
+        expected.append(snapshot(game))
+        if game.game_over: break
+        game.apply_action(rng.choice(game.legal_actions()))
+    assert len(history) == len(expected)
+    for ply in list(range(len(expected))) + [5, 0, len(expected) - 1]:  # Cold, then cached
+        snap = history[ply]
+        codes = [[p.color + p.type if p else None for p in row] for row in snap['board']]
+        assert (codes, snap['duck_pos'], snap['turn']) == expected[ply]
+    assert history[-1] is history[len(expected) - 1]
+    assert len(history.cache) <= 4 and len(history.keyframes) == -(-len(expected) // interval)
+
+
+def test_out_of_range_and_clear():
+    history = GameHistory()
+    game = HeadlessGame()
+    history.append(game.board, game.duck_pos, game.turn, game.prev_duck_pos, game.last_move_arrow)
+    with pytest.raises(IndexError): history[1]
+    history.clear()
+    assert len(history) == 0 and not history.keyframes
+    with pytest.raises(IndexError): history[0]
@@ -0,0 +1,28 @@
+"""Replaying records: every kind of bad input is reported as a GameRecordError."""
+import pytest
+
+from game_record import GameRecordError, _validate_chunk, parse_game, replay
+
+GOOD = '[Event "Duck Chess"]\n\n1. e4@c6 e5@d3 *\n'
+BAD_EP = '[FEN "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e 0 1"]\n\n1. e4@e5 *\n'
+
+
+def test_good_record_replays():
+    game = replay(parse_game(GOOD))
+    assert game.generate_fen().startswith("rnbqkbnr/pppp1ppp/8/4p3/4P3/3*4/PPPP1PPP/RNBQKBNR w")
+
+
+@pytest.mark.parametrize('text, error', [
+    ('[FEN "garbage"]\n\n1. e4@e5 *\n', "Bad FEN header"),
+    (BAD_EP, "Bad FEN header"),
+    ('[Event "Duck Chess"]\n\n1. e5@e6 *\n', "Illegal move"),
+    ('[Event "Duck Chess"]\n\n1. e4@e4 *\n', "illegal duck square"),
+])
+def test_bad_record_raises(text, error):
+    with pytest.raises(GameRecordError, match=error): replay(parse_game(text))
+
+
+def test_validation_reports_a_bad_fen_and_keeps_going():
+    games, plies, errors = _validate_chunk([(0, '[FEN "garbage"]\n\n1. e4@e5 *\n'), (1, BAD_EP), (2, GOOD)])
+    assert (games, plies) == (3, 2)
+    assert [index for index, _ in errors] == [0, 1]
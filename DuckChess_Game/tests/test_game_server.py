@@ -0,0 +1,101 @@
+"""Request/reply paths of game_server over a real Unix socket, with the AI pool replaced by a thread."""
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import game_server
+from game_server import GameServer
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class StubEngine:
+    """Answers every search with a fixed action, or raises when given an exception."""
+
+    def __init__(self, answer):
+        self.answer = answer
+
+    def search(self, game, move_time=None):
+        if isinstance(self.answer, Exception): raise self.answer
+        return self.answer
+
+
+def exchange(tmp_path, engine, requests):
+    """Serves on a Unix socket, sends the requests one at a time and returns the replies."""
+    path = str(tmp_path / "server.sock")
+    server = GameServer(workers=1)
+    server._start_pool = lambda: setattr(server, 'pool', ThreadPoolExecutor(1))
+    game_server._engine = engine
+
+    async def run():
+        ready = asyncio.Event()
+        task = asyncio.create_task(server.serve(unix_path=path, ready=ready))
+        await ready.wait()
+        reader, writer = await asyncio.open_unix_connection(path)
+        replies = []
+        try:
+            for request in requests:
+                if 'session' in request and request['session'] is None: request['session'] = replies[0]['session']
+                writer.write((json.dumps(request) + "\n").encode())
+                await writer.drain()
+                replies.append(json.loads(await asyncio.wait_for(reader.readline(), 10)))
+        finally:
+            writer.close()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError): await task
+        return replies
+
+    return asyncio.run(run())
+
+
+def test_rejected_move_leaves_the_position_unchanged(tmp_path):
+    new, bad_duck, bad_move, state = exchange(tmp_path, StubEngine(None), [
+        {'op': 'new', 'side': 'w'},
+        {'op': 'move', 'session': None, 'move': 'e2e4@e4'},
+        {'op': 'move', 'session': None, 'move': 'e2e5@e6'},
+        {'op': 'state', 'session': None}])
+    assert new['ok'] and new['fen'] == START
+    assert not bad_duck['ok'] and bad_duck['error'] == "Illegal duck square"
+    assert not bad_move['ok'] and bad_move['error'] == "Illegal move"
+    assert state['fen'] == START and state['result'] is None
+
+
+def test_illegal_engine_reply_forfeits(tmp_path):
+    rook_through_pawns = ((0, 0), (5, 0), (3, 3))
+    new, move, state = exchange(tmp_path, StubEngine(rook_through_pawns), [
+        {'op': 'new', 'side': 'w'},
+        {'op': 'move', 'session': None, 'move': 'e2e4@e6'},
+        {'op': 'state', 'session': None}])
+    assert move['ok'] and move['reply'] is None and move['result'] == 'w'
+    assert state['fen'].startswith("rnbqkbnr/pppppppp/4*3/8/4P3/8/PPPP1PPP/RNBQKBNR b")
+
+
+def test_engine_failure_is_an_error_reply(tmp_path):
+    new, move, stats = exchange(tmp_path, StubEngine(RuntimeError("engine died")), [
+        {'op': 'new', 'side': 'w'},
+        {'op': 'move', 'session': None, 'move': 'e2e4@e6', 'id': 7},
+        {'op': 'stats'}])
+    assert not move['ok'] and "engine died" in move['error'] and move['id'] == 7
+    assert stats['ok'] and stats['busy'] == 0
+
+
+def test_bad_fen_is_an_error_reply(tmp_path):
+    bad, = exchange(tmp_path, StubEngine(None), [{'op': 'new', 'side': 'w', 'fen': 'garbage'}])
+    assert not bad['ok'] and "FEN" in bad['error']
+
+
+def test_bad_en_passant_field_is_an_error_reply(tmp_path):
+    bad, new = exchange(tmp_path, StubEngine(None), [
+        {'op': 'new', 'side': 'w', 'fen': START.replace(" - ", " e "), 'id': 1},
+        {'op': 'new', 'side': 'w'}])
+    assert not bad['ok'] and "en passant" in bad['error'] and bad['id'] == 1
+    assert new['ok'] and new['fen'] == START
+
+
+def test_unexpected_failure_is_an_error_reply(tmp_path, monkeypatch):
+    def broken_stats(self): raise ZeroDivisionError()
+    monkeypatch.setattr(GameServer, 'stats', broken_stats)
+    stats, = exchange(tmp_path, StubEngine(None), [{'op': 'stats', 'id': 'x'}])
+    assert not stats['ok'] and stats['error'] == "ZeroDivisionError" and stats['id'] == 'x'
@@ -0,0 +1,70 @@
+"""HeadlessGame: FEN loading, and apply_checked_action rejecting an illegal ply before anything changes."""
+import pytest
+
+from headless import HeadlessGame
+
+
+@pytest.mark.parametrize('fen, action, error', [
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", ((6, 4), (4, 4), (4, 4)), "Illegal duck square"),
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", ((6, 4), (4, 4), (1, 0)), "Illegal duck square"),
+    ("rnbqkbnr/pppp1ppp/8/4p3/4P3/4*3/PPPP1PPP/RNBQKBNR w KQkq e6 0 2", ((6, 3), (4, 3), (5, 4)),
+     "Illegal duck square"),  # The duck may not stay where it is
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", ((6, 4), (3, 4), (4, 4)), "Illegal move"),
+])
+def test_illegal_ply_leaves_the_game_unchanged(fen, action, error):
+    game = HeadlessGame.from_fen(fen)
+    with pytest.raises(ValueError, match=error): game.apply_checked_action(action)
+    assert game.generate_fen() == fen and len(game.history) == 1
+
+
+def test_freed_squares_take_the_duck():
+    # En passant: the captured pawn's square is free for the duck
+    game = HeadlessGame.from_fen("4k3/8/*7/3pP3/8/8/8/4K3 w - d6 0 2")
+    game.apply_checked_action(((3, 4), (2, 3), (3, 3)))
+    assert game.duck_pos == (3, 3) and game.board[3][3] is None
+    # Castling: the Rook's old square is free, its new one is not
+    game = HeadlessGame.from_fen("4k3/8/8/8/8/8/8/*3K2R w K - 0 1")
+    with pytest.raises(ValueError): game.apply_checked_action(((7, 4), (7, 6), (7, 5)))
+    game.apply_checked_action(((7, 4), (7, 6), (7, 7)))
+    assert game.duck_pos == (7, 7)
+
+
+def test_king_capture_ignores_the_duck_square():
+    game = HeadlessGame.from_fen("4k3/8/8/8/8/8/8/4R1K1 w - - 0 1")
+    game.apply_checked_action(((7, 4), (0, 4), (0, 4)))
+    assert game.game_over and game.winner == 'w'
+
+
+@pytest.mark.parametrize('fen', [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR",  # No side to move
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1 extra",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1",
+    "rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNRR w KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNX w KQkq - 0 1",
+    "rnbqkbnr/pppppppp/*7/8/8/7*/PPPPPPPP/RNBQKBNR w KQkq - 0 1",  # Two ducks
+    "rnbq1bnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQ - 0 1",  # No black King
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBKKBNR w kq - 0 1",
+    "Pnbqkbnr/1ppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQk - 0 1",  # Pawn on the last rank
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KX - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w kqKQ - 0 1",
+    "4k3/8/8/8/8/8/8/4K3 w K - 0 1",  # Castling flag without its Rook
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq i6 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e3 0 1",  # Wrong rank for white to move
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - -1 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 0",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - x 1",
+])
+def test_malformed_fen_raises_value_error(fen):
+    with pytest.raises(ValueError): HeadlessGame.from_fen(fen)
+
+
+@pytest.mark.parametrize('fen', [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/4*3/PPPP1PPP/RNBQKBNR w Kq e6 3 12",
+    "4k3/8/8/8/8/8/8/4K3 b - - 0 1",
+])
+def test_fen_round_trip(fen):
+    assert HeadlessGame.from_fen(fen).generate_fen() == fen
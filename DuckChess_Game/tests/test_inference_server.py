@@ -0,0 +1,81 @@
+"""Request/reply paths of the shared inference server over a real connection."""
+import os
+import time
+import threading
+
+import pytest
+
+from headless import HeadlessGame
+from inference_server import InferenceServer, RemoteEvaluator, default_authkey
+
+KEY = b'test key'
+
+
+class CountingModel:
+    """One (value, {}) per position; positions whose FEN has a lone king fail the batch."""
+
+    def evaluate_batch(self, states, actions):
+        if any(s.generate_fen().startswith("7k/8/8/8/8/8/8/4K3") for s in states): raise RuntimeError("model crashed")
+        return [(0.0, {}) for _ in states]
+
+
+@pytest.fixture
+def address(tmp_path):
+    address = str(tmp_path / "eval.sock")
+    server = InferenceServer(CountingModel(), address, max_wait_ms=1, authkey=KEY)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for _ in range(500):
+        try:
+            RemoteEvaluator(address, KEY).server_stats()
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            time.sleep(0.01)
+    else:
+        pytest.fail("The inference server did not start")
+    return address
+
+
+def test_bad_fen_is_answered_and_the_server_keeps_serving(address):
+    client, other = RemoteEvaluator(address, KEY), RemoteEvaluator(address, KEY)
+    bad = HeadlessGame()
+    bad.generate_fen = lambda: 'garbage'
+    with pytest.raises(ValueError, match="Bad evaluation request"): client.evaluate_batch([bad], None)
+    assert client.evaluate_batch([HeadlessGame()], None) == [(0.0, {})]
+    assert other.evaluate_batch([HeadlessGame(), HeadlessGame()], None) == [(0.0, {})] * 2
+
+
+def test_model_failure_is_answered_and_the_server_keeps_serving(address):
+    client = RemoteEvaluator(address, KEY)
+    with pytest.raises(RuntimeError, match="model crashed"):
+        client.evaluate_batch([HeadlessGame.from_fen("7k/8/8/8/8/8/8/4K3 w - - 0 1")], None)
+    assert client.evaluate_batch([HeadlessGame()], None) == [(0.0, {})]
+    assert client.server_stats()['batches'] == 2
+
+
+def test_wrong_authkey_is_refused(address):
+    from multiprocessing import AuthenticationError
+    with pytest.raises(AuthenticationError): RemoteEvaluator(address, b'wrong').server_stats()
+    assert RemoteEvaluator(address, KEY).evaluate_batch([HeadlessGame()], None) == [(0.0, {})]
+
+
+def test_malformed_message_is_answered_and_the_connection_keeps_serving(address):
+    from multiprocessing.connection import Client
+    with Client(address, authkey=KEY) as conn:
+        for message in ("junk", ('eval',), ('eval', [], 'extra'), ('shutdown', None)):
+            conn.send(message)
+            reply = conn.recv()
+            assert isinstance(reply, ValueError) and "Bad request" in str(reply)
+        conn.send(('stats', None))
+        assert conn.recv()['batches'] == 0
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason="Unix file modes")
+def test_key_file_is_private_to_the_user(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    key = default_authkey("/tmp/eval.sock")
+    assert len(key) == 32 and default_authkey("/tmp/eval.sock") == key
+    assert os.stat(tmp_path / "duck_chess").st_mode & 0o777 == 0o700
+    path = tmp_path / "duck_chess" / "eval.sock.key"
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    os.chmod(path, 0o644)
+    with pytest.raises(PermissionError): default_authkey("/tmp/eval.sock")
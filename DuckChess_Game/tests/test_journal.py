@@ -0,0 +1,98 @@
+"""Autosave journal: reading torn and rewound files, replaying them, resuming, and a writer that survives failures."""
+import json
+
+from game_record import iter_raw_games
+from headless import HeadlessGame, encode_action
+from journal import MAGIC, GameJournal, read_journal, replay_journal
+from main import DuckChess
+
+E4 = ((6, 4), (4, 4), (2, 2))
+E5 = ((1, 4), (3, 4), (5, 4))
+D4 = ((6, 3), (4, 3), (2, 3))
+
+
+def journal_text(header, *lines):
+    return f"{MAGIC} {json.dumps(header)}\n" + "".join(line + "\n" for line in lines)
+
+
+def ply(action, piece='P', ms=100):
+    return f"{encode_action(action):x} {piece} {ms}"
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = tmp_path / "game.journal"
+    path.write_text(journal_text({'fen': None}, ply(E4), ply(E5)) + ply(D4)[:3])
+    header, plies = read_journal(str(path))
+    assert header == {'fen': None} and plies == [(E4, 'P', 100), (E5, 'P', 100)]
+    path.write_text(journal_text({'fen': None}, ply(E4), "c1c2", ply(E5)))  # A torn line mid-file ends the game
+    assert read_journal(str(path))[1] == [(E4, 'P', 100)]
+    assert read_journal(str(tmp_path / "missing.journal")) == (None, [])
+    path.write_text("not a journal\n")
+    assert read_journal(str(path)) == (None, [])
+
+
+def test_cut_rewinds_the_line(tmp_path):
+    path = tmp_path / "game.journal"
+    path.write_text(journal_text({'fen': None}, ply(E4), ply(E5, ms=7), "cut 0", ply(D4, ms=9), ply(E5, ms=3)))
+    header, plies = read_journal(str(path))
+    assert plies == [(D4, 'P', 9), (E5, 'P', 3)]
+    assert replay_journal(header, plies).generate_fen().startswith("rnbqkbnr/pppp1ppp/8/4p3/3P4/4*3/PPP1PPPP/")
+
+
+def test_promotion_round_trips_through_the_writer(tmp_path):
+    path = str(tmp_path / "game.journal")
+    fen = "7k/4P3/8/8/8/8/8/K7 w - - 0 1"
+    journal = GameJournal(path)
+    journal.begin({'fen': fen, 'mode': 'pvp', 'side': 'w'})
+    journal.append(((1, 4), (0, 4), (5, 0)), 'N', 1500)
+    journal.close()
+    header, plies = read_journal(path)
+    assert header['fen'] == fen and plies == [(((1, 4), (0, 4), (5, 0)), 'N', 1500)]
+    game = replay_journal(header, plies)
+    assert game.board[0][4].type == 'N' and game.duck_pos == (5, 0)
+
+
+def test_illegal_ply_fails_the_replay(tmp_path):
+    try:
+        replay_journal({'fen': None}, [(E4, 'P', 0), (E4, 'P', 0)])
+    except ValueError as e:
+        assert str(e).startswith("Journal ply 2")
+    else:
+        raise AssertionError("An illegal ply was replayed")
+
+
+def test_new_game_archives_the_old_journal(tmp_path):
+    path, archive = tmp_path / "game.journal", tmp_path / "archive.pgn"
+    path.write_text(journal_text({'fen': None, 'mode': 'pvp'}, ply(E4), ply(E5)))
+    journal = GameJournal(str(path), str(archive))
+    journal.begin({'fen': None, 'mode': 'pvp'})
+    journal.append(D4, 'P', 5)
+    journal.close()
+    assert read_journal(str(path))[1] == [(D4, 'P', 5)]
+    assert len(list(iter_raw_games(str(archive)))) == 1
+
+
+def test_failed_compaction_does_not_stop_the_writer(tmp_path, capsys):
+    path, archive = tmp_path / "game.journal", tmp_path / "archive_is_a_directory"
+    archive.mkdir()
+    path.write_text(journal_text({'fen': None}, ply(E4), ply(E5)))
+    journal = GameJournal(str(path), str(archive))
+    journal.begin({'fen': None, 'mode': 'pvp'})
+    journal.append(D4, 'P', 5)
+    journal.close()
+    assert "Journal compaction failed" in capsys.readouterr().out
+    journal.append(E5, 'P', 6)
+    journal.close()
+    assert journal.thread.is_alive() and read_journal(str(path))[1] == [(D4, 'P', 5), (E5, 'P', 6)]
+
+
+def test_resume_continues_the_game_and_its_clock(tmp_path):
+    path = tmp_path / "game.journal"
+    path.write_text(journal_text({'fen': None, 'mode': 'pvp', 'side': 'w', 'clock': "1+0"},
+                                 ply(E4, ms=2000), ply(E5, ms=5000)))
+    window = DuckChess(autosave=False)
+    window.journal = GameJournal(str(path))
+    window.resume_journal()
+    assert window.state == 'game' and len(window.history) == 3 and window.turn == 'w'
+    assert window.game_clock.time_left('w') == 58000 and window.game_clock.time_left('b') == 55000
+    assert window.generate_fen() == replay_journal(*read_journal(str(path))).generate_fen()
@@ -0,0 +1,22 @@
+"""Tree reuse between searches."""
+from headless import HeadlessGame
+from mcts import MCTSEngine
+
+
+def test_search_after_a_full_tree_starts_afresh():
+    engine = MCTSEngine(max_nodes=20000, batch_size=8)
+    game = HeadlessGame()
+    engine.search(game, move_time=0, max_iterations=5000)
+    first = engine.last_info
+    assert engine.tree.full and first['iterations'] > engine.batch_size
+
+    engine.search(game, move_time=0, max_iterations=5000)
+    assert not engine.last_info['reused'] and engine.last_info['iterations'] == first['iterations']
+
+
+def test_search_of_the_same_position_reuses_a_tree_with_room():
+    engine = MCTSEngine(max_nodes=200000, batch_size=8)
+    game = HeadlessGame()
+    engine.search(game, move_time=0, max_iterations=16)
+    engine.search(game, move_time=0, max_iterations=16)
+    assert engine.last_info['reused'] and engine.tree.visits[0] >= 32
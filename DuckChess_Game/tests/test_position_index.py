@@ -0,0 +1,45 @@
+"""Building the position index: bad games are skipped, a failed build leaves the index unchanged."""
+import os
+import copy
+
+import pytest
+
+from headless import HeadlessGame
+from position_index import PositionIndex
+
+GOOD = '[Event "Duck Chess"]\n[Result "1-0"]\n\n1. e4@c6 e5@d3 1-0\n\n'
+BAD_FEN = '[Event "Duck Chess"]\n[FEN "garbage"]\n\n1. e4@e5 *\n\n'
+BAD_EP = '[Event "Duck Chess"]\n[FEN "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e 0 1"]\n\n1. e4@e5 *\n\n'
+ILLEGAL = '[Event "Duck Chess"]\n\n1. e5@e6 *\n\n'
+
+
+def test_games_with_bad_fens_or_moves_are_skipped(tmp_path):
+    archive = tmp_path / "games.pgn"
+    archive.write_text(GOOD + BAD_FEN + BAD_EP + ILLEGAL + GOOD)
+    index = PositionIndex(str(tmp_path / "index"))
+    try:
+        assert index.add_archives([str(archive)], workers=1) == (4, 3)
+        start = HeadlessGame()
+        [stats] = index.move_stats(start.board, start.duck_pos, start.turn)
+        assert stats['games'] == 2 and stats['white'] == 2
+    finally:
+        index.close()
+
+
+def test_failed_build_leaves_the_index_unchanged(tmp_path):
+    archive = tmp_path / "games.pgn"
+    archive.write_text(GOOD * 6)
+    directory = tmp_path / "index"
+    index = PositionIndex(str(directory))
+    index.add_archives([str(archive)], workers=1)
+    index.close()
+    files = sorted(os.listdir(directory))
+
+    index = PositionIndex(str(directory))
+    manifest = copy.deepcopy(index.manifest)
+    with pytest.raises(FileNotFoundError):
+        index.add_archives([str(archive), str(tmp_path / "missing.pgn")], workers=1, chunk_size=2)
+    assert index.manifest == manifest and len(index.segments) == 1
+    index.close()
+    assert sorted(os.listdir(directory)) == files
+    assert PositionIndex(str(directory)).manifest == manifest
@@ -0,0 +1,36 @@
+"""Caches of the off-screen window: bounded while it is resized, and keyed on what they show."""
+from headless import encode_action
+from main import DuckChess
+from settings import FONT_CACHE_SIZE
+
+
+def test_font_cache_is_bounded_across_resizes():
+    window = DuckChess(autosave=False)
+    for step in range(40):
+        window.resize_layout(800 + 10 * step, 600 + 10 * step)
+    assert len(window.fonts) <= FONT_CACHE_SIZE
+    # The fonts of the current layout are the most recent entries, so they are kept
+    assert window.get_font("Verdana", 18, bold=True) is window.font_status
+
+
+class BoardExplorer:
+    """Reports as many games as the file of White's first advanced pawn, so e4 and d4 get different stats."""
+
+    def move_stats(self, board, duck_pos, turn):
+        games = next(c for c in range(8) if board[6][c] is None) + 1
+        return [{'code': encode_action(((1, 0), (2, 0), (3, 3))), 'games': games, 'white': 0, 'draws': 0, 'black': 0}]
+
+
+def test_explorer_follows_a_switch_to_a_variation_of_the_same_length():
+    window = DuckChess(autosave=False)
+    window.explorer = BoardExplorer()
+    e4 = window.tree.add(window.tree.root, ((6, 4), (4, 4), (2, 2)), None, "")
+    window.tree.add(e4, ((1, 0), (2, 0), (3, 3)), None, "")
+    d4 = window.tree.add(window.tree.root, ((6, 3), (4, 3), (2, 2)), None, "")
+    window.tree.add(d4, ((1, 0), (2, 0), (3, 3)), None, "")
+    window.load_line(window.tree.line_through(e4), 1, journal=False)
+    window.draw_explorer_panel(0, 200)
+    assert window.explorer_cache[1][0][1] == 5
+    window.switch_variation(1)  # Same length and view index, a different position
+    window.draw_explorer_panel(0, 200)
+    assert window.line[1] is d4 and window.explorer_cache[1][0][1] == 4